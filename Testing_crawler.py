@@ -1,46 +1,56 @@
-import time
 import json
-import random
 import re 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import Select 
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.options import Options
+import sys
 from urllib.parse import urlencode, urljoin, urlparse
+from zillow_busqueda import construir_filter_state, construir_url_busqueda, extraer_list_results, filtros_reflejados, links_desde_resultados, cosechar_busqueda_completa, descargar_pagina_busqueda, filtrar_probables_duenos, cargar_json, JS_PROYECTAR_BUSQUEDA, CAMPOS_RESULTADO, SORT_NEWEST
+from zillow_http import ClienteHTTP, NIVELES_PROXY, construir_url_scrapeops, opciones_proxy_desde_config, timeout_proxy_ms, SCRAPEOPS_ENDPOINT
+from zillow_cache import cache_desde_config
+from zillow_indice import indice_desde_config
+from zillow_ritmo import ritmo_desde_config
+from zillow_metricas import METRICAS
+from zillow_estrategias import aplicar_primera_estrategia, registro_estrategias_desde_config
+from zillow_esperas import esperando_resultados, esperar_resultados_estables
+from zillow_navegador import chromedriver_desde_config, lanzar_chrome, modulos_selenium, perfil_desde_config
+from zillow_config import ConfiguracionIncompleta, api_key_desde_config, una_sola_vez
 
 # --- Configuración Global y Funciones Auxiliares ---
+# Se cargan de config.json en inicializar(), la primera vez que se usan (importar el módulo no lee nada)
 API_KEY = "" 
-try:
-    with open("config.json", "r") as config_file:
-        config = json.load(config_file)
-        API_KEY = config.get("api_key", "")
-        if API_KEY: print(f"API Key cargada.")
-        else: print("Advertencia: 'api_key' no encontrada o vacía en config.json.")
-except FileNotFoundError: print("Advertencia: El archivo config.json no fue encontrado."); exit() if not API_KEY else None
-except KeyError: print("Advertencia: 'api_key' no encontrada en config.json."); exit() if not API_KEY else None
-if not API_KEY: print("Error crítico: API_KEY de ScrapeOps no está configurada. El script se detendrá."); exit()
+CACHE_RESPUESTAS = None
+INDICE_LISTADOS = None
+RITMO = None
+ESTRATEGIAS = None
+OPCIONES_PROXY = {}
+PERFIL_NAVEGADOR = "ligero"
+CHROMEDRIVER = {}
+
+@una_sola_vez
+def inicializar(config):
+    """Carga config.json (o `config`) en los globales del módulo, una sola vez. Lanza ConfiguracionIncompleta sin api_key."""
+    global API_KEY, SCRAPEOPS_ENDPOINT, CACHE_RESPUESTAS, INDICE_LISTADOS, RITMO, ESTRATEGIAS, OPCIONES_PROXY, PERFIL_NAVEGADOR, CHROMEDRIVER
+    API_KEY = api_key_desde_config(config)
+    SCRAPEOPS_ENDPOINT = config.get("scrapeops_endpoint", SCRAPEOPS_ENDPOINT)
+    CACHE_RESPUESTAS = cache_desde_config(config)
+    INDICE_LISTADOS = indice_desde_config(config)
+    RITMO = ritmo_desde_config(config)
+    ESTRATEGIAS = registro_estrategias_desde_config(config)
+    OPCIONES_PROXY = opciones_proxy_desde_config(config)
+    PERFIL_NAVEGADOR = perfil_desde_config(config, "crawler")
+    CHROMEDRIVER = chromedriver_desde_config(config)
+    print(f"API Key cargada.")
 
 def get_scrapeops_url(target_url, residential=True, render_js=True, country="us"):
-    if not API_KEY: print("ADVERTENCIA: API_KEY de ScrapeOps no está configurada. Accediendo a la URL directamente."); return target_url
-    payload = { "api_key": API_KEY, "url": target_url, "country": country, "residential": residential, "render_js": render_js, "timeout": 180000 }
-    return "https://proxy.scrapeops.io/v1/?" + urlencode(payload)
+    inicializar()
+    return construir_url_scrapeops(target_url, API_KEY, residential=residential, render_js=render_js, country=country, endpoint=SCRAPEOPS_ENDPOINT,
+                                   timeout_ms=timeout_proxy_ms(OPCIONES_PROXY.get("presupuesto_s", 60)))
 
-def configurar_driver():
-    options = Options()
-    # options.add_argument("--headless") 
-    options.add_argument("--no-sandbox"); options.add_argument("--disable-dev-shm-usage"); options.add_argument("--disable-gpu")
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36")
-    options.add_argument("--start-maximized")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"]); options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument('--disable-blink-features=AutomationControlled')
+def configurar_driver(perfil=None):
+    """Lanza Chrome con el perfil de la etapa (config "navegador"); perfil="completo" muestra la ventana."""
+    inicializar()
+    perfil = perfil or PERFIL_NAVEGADOR
     try:
-        driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=options)
-        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined});"})
-        print("Driver de Selenium configurado.")
+        driver = lanzar_chrome(perfil, OPCIONES_PROXY.get("presupuesto_s", 60), CHROMEDRIVER)
+        print(f"Driver de Selenium configurado (perfil: {perfil}).")
         return driver
     except Exception as e: print(f"Error al configurar el driver de Selenium: {e}"); return None
 
@@ -55,43 +65,47 @@ def formatear_ubicacion_zillow(ubicacion_str):
 
 # --- Funciones para Aplicar Filtros (VISTA MÓVIL) ---
 def aplicar_filtro_sort_mobile(driver):
+    WebDriverWait, EC, By = modulos_selenium()
     try:
         print(f"  [Mobile] Aplicando filtro de orden: 'Newest'...")
         sort_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[aria-label="Sort Properties"]')))
-        sort_button.click(); time.sleep(random.uniform(1.5, 2.5))
+        sort_button.click()
         newest_option = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[data-key="days"]')))
-        newest_option.click(); time.sleep(random.uniform(4, 6))
+        with esperando_resultados(driver, {"sort": {"value": SORT_NEWEST}}): newest_option.click()
         print("  [Mobile] Filtro 'Newest' aplicado.")
         return True
     except Exception: print(f"    ERROR [Mobile]: No se pudo aplicar el filtro de orden 'Newest'."); return False
 
 def aplicar_filtro_precio_mobile(driver, min_price):
+    WebDriverWait, EC, By = modulos_selenium()
     try:
         print(f"  [Mobile] Aplicando filtro de precio mínimo: ${min_price}")
         price_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.XPATH, "//button[.//span[text()='Price']]")))
-        price_button.click(); time.sleep(random.uniform(1.5, 2.5))
+        price_button.click()
         min_price_input = WebDriverWait(driver, 15).until(EC.visibility_of_element_located((By.CSS_SELECTOR, 'input[placeholder="No Min"]')))
-        min_price_input.clear(); min_price_input.send_keys(str(min_price)); time.sleep(random.uniform(0.5, 1))
+        min_price_input.clear(); min_price_input.send_keys(str(min_price))
         apply_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'See') and contains(text(), 'rentals')]")))
-        apply_button.click(); time.sleep(random.uniform(4, 6))
+        with esperando_resultados(driver, {"mp": {"min": int(min_price)}}): apply_button.click()
         print("  [Mobile] Filtro de precio aplicado.")
         return True
     except Exception: print(f"    ERROR [Mobile]: No se pudo aplicar el filtro de precio."); return False
 
 def aplicar_filtro_dias_mobile(driver, days):
+    WebDriverWait, EC, By = modulos_selenium()
+    from selenium.webdriver.support.ui import Select
     try:
         print(f"  [Mobile] Aplicando filtro 'Days on Zillow': {days} day(s)")
         more_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[data-test="more-filters-button"]')))
-        more_button.click(); time.sleep(random.uniform(1.5, 2.5))
+        more_button.click()
         days_dropdown_element = WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, 'select#doz')))
         Select(days_dropdown_element).select_by_value(str(days))
-        time.sleep(random.uniform(0.5, 1))
         apply_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[data-test="close-filters-button"]')))
-        apply_button.click(); time.sleep(random.uniform(4, 6))
+        with esperando_resultados(driver, {"doz": {"value": str(days)}}): apply_button.click()
         print("  [Mobile] Filtro 'Days on Zillow' aplicado.")
         return True
     except Exception: print(f"    ERROR [Mobile]: No se pudo aplicar el filtro 'Days on Zillow'."); return False
 
+@METRICAS.medir("crawler.filtros_movil")
 def aplicar_filtros_vista_mobile(driver, sort_by_newest, min_price, days_on_zillow):
     if sort_by_newest:
         if not aplicar_filtro_sort_mobile(driver): return False
@@ -104,43 +118,47 @@ def aplicar_filtros_vista_mobile(driver, sort_by_newest, min_price, days_on_zill
 
 # --- Funciones para Aplicar Filtros (VISTA WEB) ---
 def aplicar_filtro_sort_web(driver):
+    WebDriverWait, EC, By = modulos_selenium()
     try:
         print(f"  [Web] Aplicando filtro de orden: 'Newest'...")
         sort_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button#sort-popover')))
-        sort_button.click(); time.sleep(random.uniform(1.5, 2.5))
+        sort_button.click()
         newest_option = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[data-value="days"]')))
-        newest_option.click(); time.sleep(random.uniform(4, 6))
+        with esperando_resultados(driver, {"sort": {"value": SORT_NEWEST}}): newest_option.click()
         print("  [Web] Filtro 'Newest' aplicado.")
         return True
     except Exception as e: print(f"    ERROR [Web]: No se pudo aplicar el filtro de orden 'Newest'. Causa: {e}"); return False
 
 def aplicar_filtro_precio_web(driver, min_price):
+    WebDriverWait, EC, By = modulos_selenium()
     try:
         print(f"  [Web] Aplicando filtro de precio mínimo: ${min_price}")
         price_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[data-test="price-filters-button"]')))
-        price_button.click(); time.sleep(random.uniform(1.5, 2.5))
+        price_button.click()
         min_price_input = WebDriverWait(driver, 15).until(EC.visibility_of_element_located((By.CSS_SELECTOR, 'input[aria-label="Price min"]')))
-        min_price_input.clear(); min_price_input.send_keys(str(min_price)); time.sleep(random.uniform(0.5, 1))
+        min_price_input.clear(); min_price_input.send_keys(str(min_price))
         apply_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[data-test="close-filters-button"]')))
-        apply_button.click(); time.sleep(random.uniform(4, 6))
+        with esperando_resultados(driver, {"mp": {"min": int(min_price)}}): apply_button.click()
         print("  [Web] Filtro de precio aplicado.")
         return True
     except Exception as e: print(f"    ERROR [Web]: No se pudo aplicar el filtro de precio. Causa: {e}"); return False
 
 def aplicar_filtro_dias_web(driver, days):
+    WebDriverWait, EC, By = modulos_selenium()
+    from selenium.webdriver.support.ui import Select
     try:
         print(f"  [Web] Aplicando filtro 'Days on Zillow': {days} day(s)")
         more_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[data-test="more-filters-button"]')))
-        more_button.click(); time.sleep(random.uniform(1.5, 2.5))
+        more_button.click()
         days_dropdown_element = WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, 'select#doz')))
         Select(days_dropdown_element).select_by_value(str(days))
-        time.sleep(random.uniform(0.5, 1))
         apply_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[data-test="close-filters-button"]')))
-        apply_button.click(); time.sleep(random.uniform(4, 6))
+        with esperando_resultados(driver, {"doz": {"value": str(days)}}): apply_button.click()
         print("  [Web] Filtro 'Days on Zillow' aplicado.")
         return True
     except Exception as e: print(f"    ERROR [Web]: No se pudo aplicar el filtro 'Days on Zillow'. Causa: {e}"); return False
 
+@METRICAS.medir("crawler.filtros_web")
 def aplicar_filtros_vista_web(driver, sort_by_newest, min_price, days_on_zillow):
     """Agrupa y ejecuta la secuencia de filtros para la vista web."""
     if sort_by_newest:
@@ -153,57 +171,112 @@ def aplicar_filtros_vista_web(driver, sort_by_newest, min_price, days_on_zillow)
     return True
 
 # --- Función Principal del Scraper ---
-def extraer_links_propiedades_zillow(driver, ciudad_estado_param, tipo_listado="rentals", sort_by_newest=True, min_price=None, days_on_zillow=None):
-    print(f"Iniciando extracción para: {ciudad_estado_param} (Tipo: {tipo_listado})")
+def leer_next_data(driver, timeout=30):
+    """Espera __NEXT_DATA__ y trae solo la proyección de la búsqueda, evaluada dentro de la página; el JSON completo queda como fallback."""
+    WebDriverWait, EC, By = modulos_selenium()
+    with METRICAS.etapa("crawler.espera_next_data"):
+        next_data_script_element = WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, 'script[id="__NEXT_DATA__"]')))
+    with METRICAS.etapa("crawler.proyeccion_json"): data_next = driver.execute_script(JS_PROYECTAR_BUSQUEDA, CAMPOS_RESULTADO)
+    if data_next: return data_next
+    json_content_str = next_data_script_element.get_attribute('innerHTML')
+    with METRICAS.etapa("crawler.parseo_json"): return cargar_json(json_content_str) if json_content_str else {}
+
+def extraer_links_propiedades_zillow(driver, ciudad_estado_param, tipo_listado="rentals", sort_by_newest=True, min_price=None, days_on_zillow=None, max_price=None, modo_filtros="url", paginar=True, mosaicos=True, trabajadores_paginas=4, solo_duenos=True):
+    """
+    modo_filtros="url": carga la búsqueda ya filtrada (searchQueryState: orden, precio, días, tipo)
+    en un solo request; los clics de UI (móvil/web) quedan como fallback. "clics": solo UI.
+    paginar: además de la primera página, descarga en paralelo (HTTP) todas las páginas de resultados
+    y deduplica por zpid.
+    mosaicos: si la búsqueda supera el tope de resultados de Zillow, divide el mapa en mosaicos (quadtree).
+    solo_duenos: devuelve solo los listados que el JSON de búsqueda no marca como broker/constructor/edificio.
+    """
+    inicializar()
+    WebDriverWait, EC, By = modulos_selenium()
+    print(f"Iniciando extracción para: {ciudad_estado_param} (Tipo: {tipo_listado}, filtros: {modo_filtros})")
     ubicacion_formateada = formatear_ubicacion_zillow(ciudad_estado_param)
     if not ubicacion_formateada: return []
     
-    target_zillow_url = f"https://www.zillow.com/{ubicacion_formateada}/{tipo_listado.lower()}/"
+    filter_state = None
+    if modo_filtros == "url":
+        filter_state = construir_filter_state(tipo_listado, sort_by_newest, min_price, max_price, days_on_zillow)
+        target_zillow_url = construir_url_busqueda(ubicacion_formateada, tipo_listado, filter_state, ciudad_estado_param)
+    else:
+        target_zillow_url = f"https://www.zillow.com/{ubicacion_formateada}/{tipo_listado.lower()}/"
     
     MAX_LOAD_ATTEMPTS = 3; page_loaded_successfully = False
-    for attempt in range(MAX_LOAD_ATTEMPTS):
-        print(f"\nIntento de carga de página inicial {attempt + 1}/{MAX_LOAD_ATTEMPTS}...")
-        url_scrapeops = get_scrapeops_url(target_zillow_url)
+    # Se sube de nivel del proxy (datacenter -> residencial -> residencial con JS) desde el más barato que viene funcionando.
+    # __NEXT_DATA__ viene en el HTML del servidor: un nivel con reintento que no lo trae en `timeout_escalable` s está bloqueado
+    # y se abandona sin backoff; en el último nivel se reintenta con backoff hasta agotar MAX_LOAD_ATTEMPTS.
+    timeout_carga, timeout_escalable = 60, 10
+    escalador = OPCIONES_PROXY.get("niveles")
+    niveles = escalador.orden("busqueda") if escalador else [None]
+    for attempt in range(len(niveles) - 1 + MAX_LOAD_ATTEMPTS):
+        i = min(attempt, len(niveles) - 1); nivel = niveles[i]; ultimo = i + 1 == len(niveles)
+        intento_ultimo = attempt - i + 1
+        print(f"\nCarga de página inicial{f' (nivel del proxy: {nivel})' if nivel else ''}" + (f", intento {intento_ultimo}/{MAX_LOAD_ATTEMPTS}" if ultimo else "") + "...")
+        url_scrapeops = get_scrapeops_url(target_zillow_url, **NIVELES_PROXY[nivel]) if nivel else get_scrapeops_url(target_zillow_url)
         print(f"Navegando a: {target_zillow_url} (vía ScrapeOps)")
-        driver.get(url_scrapeops)
-        try:
-            WebDriverWait(driver, 60).until(EC.presence_of_element_located((By.ID, "__NEXT_DATA__")))
-            print("Página de resultados inicial cargada exitosamente.")
-            page_loaded_successfully = True; break
-        except Exception as e_load:
-            print(f"Intento {attempt + 1} falló: {e_load}")
-            if attempt < MAX_LOAD_ATTEMPTS - 1: time.sleep(random.uniform(5, 10))
-            else: driver.save_screenshot("zillow_initial_load_failed.png")
+        with METRICAS.etapa("crawler.carga_inicial"), RITMO.turno(target_zillow_url) as medicion:
+            driver.get(url_scrapeops)
+            try:
+                WebDriverWait(driver, timeout_carga if ultimo else timeout_escalable).until(EC.presence_of_element_located((By.ID, "__NEXT_DATA__")))
+                print("Página de resultados inicial cargada exitosamente.")
+                page_loaded_successfully = True
+            except Exception as e_load:
+                # Sin __NEXT_DATA__: página de bloqueo del proxy o de Zillow. En un nivel escalable no baja el ritmo global
+                print(f"Sin __NEXT_DATA__ en el nivel '{nivel}': {type(e_load).__name__}")
+                medicion.senal = "timeout" if ultimo else "bloqueo_nivel"
+        if escalador: escalador.registrar("busqueda", nivel, page_loaded_successfully)
+        if page_loaded_successfully: break
+        if not ultimo:
+            print(f"Nivel '{nivel}' del proxy sin __NEXT_DATA__. Subiendo a '{niveles[i + 1]}'...")
+            METRICAS.contar("http.niveles.busqueda.escaladas")
+        elif intento_ultimo < MAX_LOAD_ATTEMPTS: RITMO.esperar_reintento(intento_ultimo - 1)
+        else: driver.save_screenshot("zillow_initial_load_failed.png")
     if not page_loaded_successfully: return []
 
-    try:
-        print("\nPágina cargada. Aplicando filtros de UI...")
-        filtros_aplicados_con_exito = False
-        print("\n--- Intento 1: Aplicar filtros con selectores de VISTA MÓVIL ---")
-        if aplicar_filtros_vista_mobile(driver, sort_by_newest, min_price, days_on_zillow):
-            filtros_aplicados_con_exito = True
-        else:
-            print("\n--- Intento 2: Fallback a selectores de VISTA WEB ---")
-            if aplicar_filtros_vista_web(driver, sort_by_newest, min_price, days_on_zillow):
-                filtros_aplicados_con_exito = True
-        if not filtros_aplicados_con_exito:
-            print("\nFallaron todos los intentos de filtrado (Móvil y Web). La extracción se detiene.")
-            return []
-    except Exception as e_filtros: print(f"Ocurrió un error mayor durante la aplicación de filtros: {e_filtros}"); return []
+    data_next = None
+    if filter_state is not None:
+        try:
+            data_next = leer_next_data(driver)
+            if filtros_reflejados(data_next, filter_state):
+                print("\n¡Filtros aplicados desde la URL! Se omite la secuencia de clics.")
+            else:
+                print("\nZillow no reflejó los filtros de la URL. Fallback a los filtros por clics...")
+                data_next = None
+        except Exception as e_url: print(f"No se pudo verificar los filtros de la URL: {e_url}"); data_next = None
+
+    if data_next is None:
+        try:
+            print("\nPágina cargada. Aplicando filtros de UI...")
+            # Primero la variante que el sondeo del DOM detecta (o la que más veces funcionó), no siempre la móvil
+            estrategias = {"movil": lambda: aplicar_filtros_vista_mobile(driver, sort_by_newest, min_price, days_on_zillow),
+                           "web": lambda: aplicar_filtros_vista_web(driver, sort_by_newest, min_price, days_on_zillow)}
+            filtros_aplicados_con_exito = aplicar_primera_estrategia(driver, estrategias, ESTRATEGIAS) is not None
+            if not filtros_aplicados_con_exito:
+                print("\nFallaron todos los intentos de filtrado (Móvil y Web). La extracción se detiene.")
+                return []
+        except Exception as e_filtros: print(f"Ocurrió un error mayor durante la aplicación de filtros: {e_filtros}"); return []
 
     links_propiedades_encontrados_set = set()
     try:
-        print("\n¡Filtros aplicados! Extrayendo __NEXT_DATA__ de la página final...")
-        time.sleep(2) 
-        next_data_script_element = WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.CSS_SELECTOR, 'script[id="__NEXT_DATA__"]')))
-        json_content_str = next_data_script_element.get_attribute('innerHTML')
-        if json_content_str:
-            data_next = json.loads(json_content_str)
-            list_results_array = data_next.get("props", {}).get("pageProps", {}).get("searchPageState", {}).get("cat1", {}).get("searchResults", {}).get("listResults", [])
+        if data_next is None:
+            print("\n¡Filtros aplicados! Extrayendo __NEXT_DATA__ de la página final...")
+            esperar_resultados_estables(driver)
+            data_next = leer_next_data(driver)
+        filter_state_paginas = filter_state or construir_filter_state(tipo_listado, sort_by_newest, min_price, max_price, days_on_zillow)
+        with ClienteHTTP(API_KEY, endpoint=SCRAPEOPS_ENDPOINT, cache=CACHE_RESPUESTAS, limitador=RITMO, **OPCIONES_PROXY) as cliente:
+            if not filtros_reflejados(data_next, filter_state_paginas):
+                # Tras los clics __NEXT_DATA__ sigue siendo el del render inicial (Next.js no lo reescribe): la primera página se pide ya filtrada
+                print("__NEXT_DATA__ no refleja los filtros aplicados. Descargando la primera página ya filtrada...")
+                data_next = descargar_pagina_busqueda(cliente, ubicacion_formateada, tipo_listado, filter_state_paginas, ciudad_estado_param) or data_next
+            list_results_array = extraer_list_results(data_next)
             print(f"__NEXT_DATA__ parseado. Encontrados {len(list_results_array)} resultados en 'listResults'.")
-            for prop_item in list_results_array:
-                if isinstance(prop_item, dict) and "detailUrl" in prop_item:
-                    links_propiedades_encontrados_set.add(urljoin("https://www.zillow.com", prop_item.get("detailUrl")))
+            if paginar:
+                list_results_array, _, _ = cosechar_busqueda_completa(cliente, data_next, ubicacion_formateada, tipo_listado, filter_state_paginas, ciudad_estado_param, mosaicos, trabajadores_paginas)
+        if INDICE_LISTADOS: INDICE_LISTADOS.registrar_resultados(list_results_array)
+        if solo_duenos: list_results_array = filtrar_probables_duenos(list_results_array)
+        links_propiedades_encontrados_set = links_desde_resultados(list_results_array)
     except Exception as e_extraccion:
         print(f"Ocurrió un error durante la extracción de __NEXT_DATA__: {e_extraccion}")
         driver.save_screenshot("error_screenshot_final_extraction.png"); print("Captura de pantalla de error guardada.")
@@ -211,20 +284,24 @@ def extraer_links_propiedades_zillow(driver, ciudad_estado_param, tipo_listado="
 
 # --- Bloque de Ejecución ---
 if __name__ == "__main__":
+    try: inicializar()
+    except ConfiguracionIncompleta as e: print(f"Error crítico: {e} El script se detendrá."); sys.exit(1)
     print("--- Configuración de la Búsqueda para Zillow Crawler ---")
-    ciudad_estado_a_buscar = input("Ingrese la Ciudad y Estado (ej. Stamford, CT): ") or "Stamford, CT"
+    interactivo = sys.stdin.isatty()  # Sin terminal (cron) se usan los valores por defecto y no se pregunta nada
+    preguntar = lambda mensaje: input(mensaje) if interactivo else ""
+    ciudad_estado_a_buscar = preguntar("Ingrese la Ciudad y Estado (ej. Stamford, CT): ") or "Stamford, CT"
     print(f"Usando ubicación: {ciudad_estado_a_buscar}")
     tipo_de_listado_param = "rentals" 
     
     precio_minimo_alquiler = None
     try:
-        precio_input = input("Ingrese el precio mínimo de alquiler (ej. 3000, presione Enter para no aplicar): ")
+        precio_input = preguntar("Ingrese el precio mínimo de alquiler (ej. 3000, presione Enter para no aplicar): ")
         if precio_input.strip(): precio_minimo_alquiler = int(precio_input)
     except ValueError: print("Entrada de precio inválida. No se aplicará filtro de precio.")
     
     dias_en_zillow = None
     try:
-        dias_input = input("Filtrar por 'Days on Zillow' - 1, 7, 14, 30, o 90 (ej. 1, presione Enter para no aplicar): ")
+        dias_input = preguntar("Filtrar por 'Days on Zillow' - 1, 7, 14, 30, o 90 (ej. 1, presione Enter para no aplicar): ")
         if dias_input.strip() and dias_input.strip() in ["1", "7", "14", "30", "90"]: dias_en_zillow = dias_input.strip()
         elif dias_input.strip(): print("Valor para 'Days on Zillow' no válido. No se aplicará el filtro.")
     except ValueError: print("Entrada de días inválida. No se aplicará filtro de días.")
@@ -255,9 +332,10 @@ if __name__ == "__main__":
                 print("\nNo se extrajeron links de propiedades.")
         
         finally:
-            print("\n" + "="*50)
-            input("El script ha finalizado. La ventana del navegador permanecerá abierta para tu inspección. \nPRESIONA ENTER EN ESTA CONSOLA PARA CERRAR EL NAVEGADOR.")
-            print("="*50)
+            if interactivo and PERFIL_NAVEGADOR == "completo":
+                print("\n" + "="*50)
+                input("El script ha finalizado. La ventana del navegador permanecerá abierta para tu inspección. \nPRESIONA ENTER EN ESTA CONSOLA PARA CERRAR EL NAVEGADOR.")
+                print("="*50)
             mi_driver.quit()
             print("Driver de Selenium cerrado.")
     else:
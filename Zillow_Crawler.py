@@ -1,46 +1,57 @@
-import time
 import json
-import random
 import re 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.options import Options
+import sys
 from urllib.parse import urlencode, urljoin, urlparse
+from zillow_navegador import PoolDrivers, chromedriver_desde_config, lanzar_chrome, modulos_selenium, perfil_desde_config
+from zillow_busqueda import construir_filter_state, construir_url_busqueda, extraer_list_results, filtros_reflejados, links_desde_resultados, cosechar_busqueda_completa, descargar_pagina_busqueda, obtener_search_page_state, filtrar_probables_duenos, extraer_next_data_de_html, cargar_json, JS_PROYECTAR_BUSQUEDA, CAMPOS_RESULTADO, SORT_NEWEST
+from zillow_http import ClienteHTTP, NIVELES_PROXY, construir_url_scrapeops, opciones_proxy_desde_config, timeout_proxy_ms, SCRAPEOPS_ENDPOINT
+from zillow_cache import OPCIONES_CACHE, cache_desde_config
+from zillow_indice import indice_desde_config
+from zillow_ritmo import ritmo_desde_config
+from zillow_metricas import METRICAS
+from zillow_estrategias import aplicar_primera_estrategia, registro_estrategias_desde_config
+from zillow_esperas import esperando_resultados, esperar_resultados_estables
+from zillow_config import ConfiguracionIncompleta, api_key_desde_config, una_sola_vez
 
 # --- Configuración Global y Carga de API Key ---
+# Se cargan de config.json en inicializar(), la primera vez que se usan (importar el módulo no lee nada)
 API_KEY = "" 
-try:
-    with open("config.json", "r") as config_file:
-        config = json.load(config_file)
-        API_KEY = config.get("api_key", "")
-        if API_KEY: print(f"API Key cargada.")
-        else: print("Advertencia: 'api_key' no encontrada o vacía en config.json.")
-except FileNotFoundError: print("Advertencia: El archivo config.json no fue encontrado."); exit() if not API_KEY else None
-except KeyError: print("Advertencia: 'api_key' no encontrada en config.json."); exit() if not API_KEY else None
-if not API_KEY: print("Error crítico: API_KEY de ScrapeOps no está configurada. El script se detendrá."); exit()
+CACHE_RESPUESTAS = None
+INDICE_LISTADOS = None
+RITMO = None
+ESTRATEGIAS = None
+OPCIONES_PROXY = {}
+PERFIL_NAVEGADOR = "ligero"
+CHROMEDRIVER = {}
+
+@una_sola_vez
+def inicializar(config):
+    """Carga config.json (o `config`) en los globales del módulo, una sola vez. Lanza ConfiguracionIncompleta sin api_key."""
+    global API_KEY, SCRAPEOPS_ENDPOINT, CACHE_RESPUESTAS, INDICE_LISTADOS, RITMO, ESTRATEGIAS, OPCIONES_PROXY, PERFIL_NAVEGADOR, CHROMEDRIVER
+    API_KEY = api_key_desde_config(config)
+    SCRAPEOPS_ENDPOINT = config.get("scrapeops_endpoint", SCRAPEOPS_ENDPOINT)
+    CACHE_RESPUESTAS = cache_desde_config(config)
+    INDICE_LISTADOS = indice_desde_config(config)
+    RITMO = ritmo_desde_config(config)
+    ESTRATEGIAS = registro_estrategias_desde_config(config)
+    OPCIONES_PROXY = opciones_proxy_desde_config(config)
+    PERFIL_NAVEGADOR = perfil_desde_config(config, "crawler")
+    CHROMEDRIVER = chromedriver_desde_config(config)
+    print(f"API Key cargada.")
 
 # --- Funciones Auxiliares ---
 def get_scrapeops_url(target_url, residential=True, render_js=True, country="us"):
-    if not API_KEY: print("ADVERTENCIA: API_KEY de ScrapeOps no está configurada. Accediendo a la URL directamente."); return target_url
-    payload = { "api_key": API_KEY, "url": target_url, "country": country, "residential": residential, "render_js": render_js, "timeout": 180000 }
-    return "https://proxy.scrapeops.io/v1/?" + urlencode(payload)
-
-def configurar_driver():
-    options = Options()
-    # options.add_argument("--headless") 
-    options.add_argument("--no-sandbox"); options.add_argument("--disable-dev-shm-usage"); options.add_argument("--disable-gpu")
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36")
-    options.add_argument("--start-maximized") 
-    options.add_experimental_option("excludeSwitches", ["enable-automation"]); options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument('--disable-blink-features=AutomationControlled')
+    inicializar()
+    return construir_url_scrapeops(target_url, API_KEY, residential=residential, render_js=render_js, country=country, endpoint=SCRAPEOPS_ENDPOINT,
+                                   timeout_ms=timeout_proxy_ms(OPCIONES_PROXY.get("presupuesto_s", 60)))
+
+def configurar_driver(perfil=None):
+    """Lanza Chrome con el perfil de la etapa (config "navegador"); perfil="completo" muestra la ventana."""
+    inicializar()
+    perfil = perfil or PERFIL_NAVEGADOR
     try:
-        driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=options)
-        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined});"})
-        print("Driver de Selenium configurado.")
+        driver = lanzar_chrome(perfil, OPCIONES_PROXY.get("presupuesto_s", 60), CHROMEDRIVER)
+        print(f"Driver de Selenium configurado (perfil: {perfil}).")
         return driver
     except Exception as e: print(f"Error al configurar el driver de Selenium: {e}"); return None
 
@@ -54,37 +65,35 @@ def formatear_ubicacion_zillow(ubicacion_str):
 
 # --- Funciones para Aplicar Filtros (VISTA MÓVIL) ---
 def aplicar_filtro_sort_mobile(driver, sort_by="Newest"):
+    WebDriverWait, EC, By = modulos_selenium()
     try:
         print(f"  [Mobile] Intentando aplicar filtro de orden: '{sort_by}'...")
         sort_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[aria-label="Sort Properties"]')))
         sort_button.click()
         print("  [Mobile] Clic en el botón 'Sort' realizado.")
-        time.sleep(random.uniform(1.5, 2.5))
         newest_option = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[data-key="days"]')))
-        newest_option.click()
+        with esperando_resultados(driver, {"sort": {"value": SORT_NEWEST}}): newest_option.click()
         print("  [Mobile] Clic en la opción 'Newest' realizado.")
-        time.sleep(random.uniform(4, 6))
         return True
     except Exception as e: print(f"    ERROR [Mobile]: No se pudo aplicar el filtro de orden 'Newest'."); return False
 
 def aplicar_filtro_precio_mobile(driver, min_price):
+    WebDriverWait, EC, By = modulos_selenium()
     try:
         print(f"  [Mobile] Intentando aplicar filtro de precio mínimo: ${min_price}")
         price_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.XPATH, "//button[.//span[text()='Price']]")))
         price_button.click()
         print("  [Mobile] Clic en el botón 'Price' realizado.")
-        time.sleep(random.uniform(1.5, 2.5))
         min_price_input = WebDriverWait(driver, 15).until(EC.visibility_of_element_located((By.CSS_SELECTOR, 'input[placeholder="No Min"]')))
         min_price_input.clear(); min_price_input.send_keys(str(min_price))
         print(f"  [Mobile] Precio mínimo '{min_price}' introducido.")
-        time.sleep(random.uniform(0.5, 1))
         apply_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'See') and contains(text(), 'rentals')]")))
-        apply_button.click()
+        with esperando_resultados(driver, {"mp": {"min": int(min_price)}}): apply_button.click()
         print("  [Mobile] Clic en el botón 'Apply' de precio realizado.")
-        time.sleep(random.uniform(4, 6))
         return True
     except Exception as e: print(f"    ERROR [Mobile]: No se pudo aplicar el filtro de precio."); return False
 
+@METRICAS.medir("crawler.filtros_movil")
 def aplicar_filtros_vista_mobile(driver, sort_by_newest, min_price, tipo_listado):
     if sort_by_newest:
         if not aplicar_filtro_sort_mobile(driver): return False
@@ -96,6 +105,7 @@ def aplicar_filtros_vista_mobile(driver, sort_by_newest, min_price, tipo_listado
 # --- Funciones para Aplicar Filtros (VISTA WEB) ---
 def aplicar_filtro_sort_web(driver, sort_by="Newest"):
     """Aplica el filtro 'Newest' en la vista web usando los selectores encontrados."""
+    WebDriverWait, EC, By = modulos_selenium()
     try:
         print(f"  [Web] Intentando aplicar filtro de orden: '{sort_by}'...")
         
@@ -106,17 +116,14 @@ def aplicar_filtro_sort_web(driver, sort_by="Newest"):
         sort_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.CSS_SELECTOR, selector_boton_sort_web)))
         sort_button.click()
         print("  [Web] Clic en el botón 'Sort' principal realizado.")
-        time.sleep(random.uniform(1.5, 2.5))
 
         # Selector para la OPCIÓN 'Newest' en el menú desplegable
         selector_opcion_newest_web = 'button[data-value="days"]'
         
         print(f"  [Web] Buscando la opción '{sort_by}' con el selector: {selector_opcion_newest_web}")
         newest_option = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.CSS_SELECTOR, selector_opcion_newest_web)))
-        newest_option.click()
+        with esperando_resultados(driver, {"sort": {"value": SORT_NEWEST}}): newest_option.click()  # Vuelve en cuanto los resultados se reordenan
         print("  [Web] Clic en la opción 'Newest' realizado.")
-        
-        time.sleep(random.uniform(4, 6)) # Esperar a que los resultados se reordenen
         return True
     except Exception as e:
         print(f"    ERROR [Web]: No se pudo aplicar el filtro de orden 'Newest'. Causa: {e}")
@@ -128,6 +135,7 @@ def aplicar_filtro_precio_web(driver, min_price):
     print("    ERROR [Web]: Esta función es un placeholder. Debes añadir los selectores de la vista web para el precio.")
     return False
 
+@METRICAS.medir("crawler.filtros_web")
 def aplicar_filtros_vista_web(driver, sort_by_newest, min_price, tipo_listado):
     """Agrupa y ejecuta la secuencia de filtros para la vista web."""
     if sort_by_newest:
@@ -138,69 +146,168 @@ def aplicar_filtros_vista_web(driver, sort_by_newest, min_price, tipo_listado):
     return True
 
 # --- Función Principal del Scraper (con lógica de fallback) ---
-def extraer_links_propiedades_zillow(driver, ciudad_estado_param, tipo_listado="rentals", sort_by_newest=True, min_price=None):
-    print(f"Iniciando extracción para: {ciudad_estado_param} (Tipo: {tipo_listado})")
+class ExtraccionFallida(RuntimeError):
+    """La búsqueda de una ciudad no se pudo cargar ni filtrar (bloqueo, timeout, filtros que no se aplicaron)."""
+
+def leer_next_data(driver, timeout=30):
+    """Espera __NEXT_DATA__ y trae solo la proyección de la búsqueda, evaluada dentro de la página; el JSON completo queda como fallback."""
+    WebDriverWait, EC, By = modulos_selenium()
+    selector_next_data = 'script[id="__NEXT_DATA__"]'
+    with METRICAS.etapa("crawler.espera_next_data"):
+        next_data_script_element = WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, selector_next_data)))
+    with METRICAS.etapa("crawler.proyeccion_json"): data_next = driver.execute_script(JS_PROYECTAR_BUSQUEDA, CAMPOS_RESULTADO)
+    if data_next: return data_next
+    json_content_str = next_data_script_element.get_attribute('innerHTML')
+    with METRICAS.etapa("crawler.parseo_json"): return cargar_json(json_content_str) if json_content_str else {}
+
+def cargar_busqueda_inicial(driver, target_zillow_url, timeout=60, timeout_escalable=10):
+    """
+    Carga la búsqueda en Chrome por el nivel de proxy más barato que viene funcionando para búsquedas y sube
+    de nivel solo si la página llega bloqueada o sin searchPageState. __NEXT_DATA__ viene en el HTML del
+    servidor, así que en los niveles con reintento se espera poco (`timeout_escalable`) antes de subir.
+    """
+    from selenium.common.exceptions import TimeoutException
+    inicializar()
+    escalador = OPCIONES_PROXY.get("niveles")
+    niveles = escalador.orden("busqueda") if escalador else [None]
+    for i, nivel in enumerate(niveles):
+        ultimo = i + 1 == len(niveles)
+        url_scrapeops = get_scrapeops_url(target_zillow_url, **NIVELES_PROXY[nivel]) if nivel else get_scrapeops_url(target_zillow_url)
+        with METRICAS.etapa("crawler.carga_inicial"), RITMO.turno(target_zillow_url) as medicion:
+            try:
+                driver.get(url_scrapeops)  # Lanza TimeoutException si el nivel se cuelga hasta el timeout de carga
+                data_next = leer_next_data(driver, timeout if ultimo else timeout_escalable)
+            except TimeoutException:
+                if ultimo:
+                    if escalador: escalador.registrar("busqueda", nivel, False)
+                    raise
+                data_next = {}  # Sin __NEXT_DATA__ (o colgada): página de bloqueo del proxy o de Zillow
+            completa = bool(obtener_search_page_state(data_next))
+            if not completa and not ultimo: medicion.senal = "bloqueo_nivel"  # Lo resuelve el nivel siguiente: no baja el ritmo global
+        if escalador: escalador.registrar("busqueda", nivel, completa)
+        if completa or ultimo: return data_next
+        print(f"Nivel '{nivel}' del proxy sin resultados de búsqueda. Subiendo a '{niveles[i + 1]}'...")
+        METRICAS.contar("http.niveles.busqueda.escaladas")
+
+def extraer_links_propiedades_zillow(driver, ciudad_estado_param, tipo_listado="rentals", sort_by_newest=True, min_price=None, max_price=None, modo_filtros="url", paginar=True, mosaicos=True, trabajadores_paginas=4, solo_duenos=True, al_descubrir=None, al_terminar=None):
+    """
+    modo_filtros="url": carga la búsqueda ya filtrada (searchQueryState) en un solo request;
+    los clics en la UI (móvil/web) quedan solo como fallback si Zillow no refleja los filtros.
+    modo_filtros="clics": usa directamente la secuencia de clics.
+    paginar: además de la primera página, descarga en paralelo (HTTP) todas las páginas de resultados
+    y deduplica por zpid.
+    mosaicos: si la búsqueda supera el tope de resultados de Zillow, divide el mapa en mosaicos (quadtree).
+    solo_duenos: devuelve solo los listados que el JSON de búsqueda no marca como broker/constructor/edificio.
+    al_descubrir(links): se llama con cada lote de links nuevos en cuanto se descubre (para consumirlos en streaming).
+    al_terminar(cosecha): con paginar, se llama al final con {"reportados", "cosechados", "parcial"}: lo que Zillow
+    reporta, los listados únicos cosechados y si faltaron páginas o mosaicos.
+    Lanza ExtraccionFallida si la búsqueda no se pudo cargar o filtrar: una lista vacía significa "sin resultados".
+    """
+    inicializar()
+    print(f"Iniciando extracción para: {ciudad_estado_param} (Tipo: {tipo_listado}, filtros: {modo_filtros})")
     ubicacion_formateada = formatear_ubicacion_zillow(ciudad_estado_param)
-    if not ubicacion_formateada: return []
+    if not ubicacion_formateada: raise ExtraccionFallida(f"Ubicación inválida: '{ciudad_estado_param}'.")
     
-    target_zillow_url = f"https://www.zillow.com/{ubicacion_formateada}/{tipo_listado.lower()}/"
-    print(f"Navegando a la URL base (vía ScrapeOps): {target_zillow_url}")
-    url_scrapeops = get_scrapeops_url(target_zillow_url)
-    driver.get(url_scrapeops)
+    filter_state = None
+    if modo_filtros == "url":
+        filter_state = construir_filter_state(tipo_listado, sort_by_newest, min_price, max_price)
+        target_zillow_url = construir_url_busqueda(ubicacion_formateada, tipo_listado, filter_state, ciudad_estado_param)
+        print(f"Navegando a la URL ya filtrada (vía ScrapeOps): {target_zillow_url}")
+    else:
+        target_zillow_url = f"https://www.zillow.com/{ubicacion_formateada}/{tipo_listado.lower()}/"
+        print(f"Navegando a la URL base (vía ScrapeOps): {target_zillow_url}")
+
+    def procesar_lote(list_results):
+        if INDICE_LISTADOS: INDICE_LISTADOS.registrar_resultados(list_results)
+        METRICAS.contar("crawler.resultados", len(list_results))
+        if solo_duenos: list_results = filtrar_probables_duenos(list_results)
+        links = links_desde_resultados(list_results)
+        METRICAS.contar("crawler.links", len(links))
+        if al_descubrir and links: al_descubrir(list(links))
+        return links
+
+    def cosechar_links(data_next):
+        links = set()
+        filter_state_paginas = filter_state or construir_filter_state(tipo_listado, sort_by_newest, min_price, max_price)
+        with METRICAS.etapa("crawler.cosecha_paginas"), ClienteHTTP(API_KEY, endpoint=SCRAPEOPS_ENDPOINT, cache=CACHE_RESPUESTAS, limitador=RITMO, **OPCIONES_PROXY) as cliente:
+            if not filtros_reflejados(data_next, filter_state_paginas):
+                # Tras los clics __NEXT_DATA__ sigue siendo el del render inicial (Next.js no lo reescribe): la primera página se pide ya filtrada
+                print("__NEXT_DATA__ no refleja los filtros aplicados. Descargando la primera página ya filtrada...")
+                data_next = descargar_pagina_busqueda(cliente, ubicacion_formateada, tipo_listado, filter_state_paginas, ciudad_estado_param) or data_next
+            list_results_array = extraer_list_results(data_next)
+            print(f"__NEXT_DATA__ parseado. Encontrados {len(list_results_array)} resultados en 'listResults'.")
+            if not paginar: return list(procesar_lote(list_results_array))
+            unicos, total_reportado, parcial = cosechar_busqueda_completa(cliente, data_next, ubicacion_formateada, tipo_listado, filter_state_paginas, ciudad_estado_param,
+                                                                          mosaicos, trabajadores_paginas, al_descubrir=lambda nuevos: links.update(procesar_lote(nuevos)))
+        if al_terminar: al_terminar({"reportados": total_reportado, "cosechados": len(unicos), "parcial": parcial})
+        return list(links)
+
+    # Solo las búsquedas filtradas por URL son reproducibles a partir de la URL, así que solo esas se cachean
+    if CACHE_RESPUESTAS and filter_state is not None:
+        html_cacheado = CACHE_RESPUESTAS.obtener(target_zillow_url, OPCIONES_CACHE)
+        METRICAS.contar("cache.acierto" if html_cacheado else "cache.fallo")
+        if html_cacheado:
+            print("Primera página servida desde la caché local (sin costo de ScrapeOps).")
+            return cosechar_links(extraer_next_data_de_html(html_cacheado))
 
     try:
         print("Esperando a que la página de resultados cargue...")
-        WebDriverWait(driver, 60).until(EC.presence_of_element_located((By.ID, "__NEXT_DATA__")))
+        data_next = cargar_busqueda_inicial(driver, target_zillow_url)
         print("Página de resultados inicial cargada.")
         
         filtros_aplicados_con_exito = False
-        
-        print("\n--- Intento 1: Aplicar filtros con selectores de VISTA MÓVIL ---")
-        if aplicar_filtros_vista_mobile(driver, sort_by_newest, min_price, tipo_listado):
-            filtros_aplicados_con_exito = True
-        else:
-            print("\n--- Intento 2: Fallback a selectores de VISTA WEB ---")
-            if aplicar_filtros_vista_web(driver, sort_by_newest, min_price, tipo_listado):
+        if filter_state is not None:
+            if filtros_reflejados(data_next, filter_state):
+                print("¡Filtros aplicados desde la URL! Se omite la secuencia de clics.")
                 filtros_aplicados_con_exito = True
-
+                if CACHE_RESPUESTAS:
+                    html_next_data = f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(data_next)}</script>'
+                    CACHE_RESPUESTAS.guardar(target_zillow_url, html_next_data, OPCIONES_CACHE)
+            else:
+                print("Zillow no reflejó los filtros de la URL. Fallback a los filtros por clics...")
+        
         if not filtros_aplicados_con_exito:
-            print("\nFallaron todos los intentos de filtrado (Móvil y Web). La extracción se detiene pero el driver quedará abierto para inspección.")
-            return []
+            # Primero la variante que el sondeo del DOM detecta (o la que más veces funcionó), no siempre la móvil
+            estrategias = {"movil": lambda: aplicar_filtros_vista_mobile(driver, sort_by_newest, min_price, tipo_listado),
+                           "web": lambda: aplicar_filtros_vista_web(driver, sort_by_newest, min_price, tipo_listado)}
+            filtros_aplicados_con_exito = aplicar_primera_estrategia(driver, estrategias, ESTRATEGIAS) is not None
+
+            if not filtros_aplicados_con_exito: raise ExtraccionFallida("Fallaron todos los intentos de filtrado (Móvil y Web).")
 
-        print("\n¡Filtros aplicados con éxito! Extrayendo __NEXT_DATA__ de la página final...")
-        selector_next_data = 'script[id="__NEXT_DATA__"]'
-        next_data_script_element = WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.CSS_SELECTOR, selector_next_data)))
-        json_content_str = next_data_script_element.get_attribute('innerHTML')
+            print("\n¡Filtros aplicados con éxito! Extrayendo __NEXT_DATA__ de la página final...")
+            esperar_resultados_estables(driver)
+            data_next = leer_next_data(driver)
         
-        links_propiedades_encontrados_set = set()
-        if json_content_str:
-            data_next = json.loads(json_content_str)
-            list_results_array = data_next.get("props", {}).get("pageProps", {}).get("searchPageState", {}).get("cat1", {}).get("searchResults", {}).get("listResults", [])
-            print(f"__NEXT_DATA__ parseado. Encontrados {len(list_results_array)} resultados en 'listResults'.")
-            for prop_item in list_results_array:
-                if isinstance(prop_item, dict) and "detailUrl" in prop_item:
-                    links_propiedades_encontrados_set.add(urljoin("https://www.zillow.com", prop_item.get("detailUrl")))
-        return list(links_propiedades_encontrados_set)
+        return cosechar_links(data_next)
 
     except Exception as e:
         print(f"Ocurrió un error mayor en la extracción: {e}")
-        driver.save_screenshot("error_screenshot_final.png"); print("Captura de pantalla de error guardada.")
-        return []
+        try: driver.save_screenshot("error_screenshot_final.png"); print("Captura de pantalla de error guardada.")
+        except Exception: pass  # El driver puede haber muerto con el error
+        if isinstance(e, ExtraccionFallida): raise
+        raise ExtraccionFallida(f"{type(e).__name__}: {e}") from e
 
 # --- Bloque de Ejecución ---
 if __name__ == "__main__":
+    try: inicializar()
+    except ConfiguracionIncompleta as e: print(f"Error crítico: {e} El script se detendrá."); sys.exit(1)
     ciudad_estado_a_buscar = "Norwalk, CT"
     tipo_de_listado_param = "rentals"
     aplicar_orden_nuevos = True
     precio_minimo_alquiler = 3000
     
-    mi_driver = configurar_driver()
-    if mi_driver:
-        try:
-            links = extraer_links_propiedades_zillow(
-                mi_driver, ciudad_estado_a_buscar, tipo_listado=tipo_de_listado_param, 
-                sort_by_newest=aplicar_orden_nuevos, min_price=precio_minimo_alquiler
-            )
+    # Un pool de una sesión: un trabajo de varias ciudades reutilizaría el mismo Chrome ya configurado
+    pool_drivers = PoolDrivers(configurar_driver, tamano=1)
+    try:
+        with pool_drivers.sesion() as mi_driver:
+            try:
+                links = extraer_links_propiedades_zillow(
+                    mi_driver, ciudad_estado_a_buscar, tipo_listado=tipo_de_listado_param, 
+                    sort_by_newest=aplicar_orden_nuevos, min_price=precio_minimo_alquiler
+                )
+            except ExtraccionFallida as e:
+                print(f"\nLa extracción falló: {e} El driver quedará abierto para inspección.")
+                links = []
             if links:
                 print("\n" + "---" * 10 + "\n--- Links de Propiedades Extraídos ---")
                 for link_idx, link_url in enumerate(links): print(f"{link_idx+1}. {link_url}")
@@ -211,10 +318,12 @@ if __name__ == "__main__":
                 with open(output_filename, "w", encoding="utf-8") as f_json: json.dump(links, f_json, indent=4)
                 print(f"Links guardados en {output_filename}")
             else: print("\nNo se extrajeron links de propiedades (posiblemente por fallo en los filtros o no habían resultados).")
-        finally:
-            print("\n" + "="*50)
-            input("El script ha finalizado. La ventana del navegador permanecerá abierta para tu inspección. \nPRESIONA ENTER EN ESTA CONSOLA PARA CERRAR EL NAVEGADOR.")
-            print("="*50)
-            mi_driver.quit()
-            print("Driver de Selenium cerrado.")
-    else: print("No se pudo inicializar el driver de Selenium.")
\ No newline at end of file
+            METRICAS.imprimir_tabla()
+            if sys.stdin.isatty() and PERFIL_NAVEGADOR == "completo":  # Sin terminal (cron) o sin ventana no se espera el ENTER
+                print("\n" + "="*50)
+                input("El script ha finalizado. La ventana del navegador permanecerá abierta para tu inspección. \nPRESIONA ENTER EN ESTA CONSOLA PARA CERRAR EL NAVEGADOR.")
+                print("="*50)
+    except RuntimeError as e: print(f"No se pudo inicializar el driver de Selenium: {e}")
+    finally:
+        pool_drivers.cerrar()
+        print("Driver de Selenium cerrado.")
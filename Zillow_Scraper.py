@@ -1,57 +1,185 @@
-import time
 import json
-import random
 import re 
-import csv
+import sys
 import argparse
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.options import Options
-from urllib.parse import urlencode
+from contextlib import nullcontext
+from zillow_http import ClienteHTTP, NIVELES_PROXY, construir_url_scrapeops, opciones_proxy_desde_config, timeout_proxy_ms, SCRAPEOPS_ENDPOINT
+from zillow_cache import OPCIONES_CACHE, cache_desde_config
+from zillow_indice import indice_desde_config
+from zillow_detalle import JS_ESTADO_PUBLICACION, JS_EXTRAER_CAMPOS, TABLA_SELECTORES, DetallePropiedad, extraer_detalle_de_html
+from zillow_concurrencia import EscritorOrdenado, procesar_en_paralelo
+from zillow_navegador import PoolDrivers, chromedriver_desde_config, lanzar_chrome, modulos_selenium, perfil_desde_config
+from zillow_diario import preparar_reanudacion
+from zillow_salidas import abrir_salidas, opciones_salidas_desde_config
+from zillow_ritmo import ritmo_desde_config
+from zillow_metricas import METRICAS, finalizar_metricas, perfilar
+from zillow_config import ConfiguracionIncompleta, api_key_desde_config, una_sola_vez
 
 # --- Configuración Global y Funciones Auxiliares ---
+# Se cargan de config.json en inicializar(), la primera vez que se usan (importar el módulo no lee nada)
 API_KEY = "" 
-try:
-    with open("config.json", "r") as config_file:
-        config = json.load(config_file)
-        API_KEY = config.get("api_key", "")
-        if API_KEY: print(f"API Key cargada.")
-        else: print("Advertencia: 'api_key' no encontrada o vacía en config.json.")
-except FileNotFoundError: print("Advertencia: El archivo config.json no fue encontrado."); exit() if not API_KEY else None
-except KeyError: print("Advertencia: 'api_key' no encontrada en config.json."); exit() if not API_KEY else None
-if not API_KEY: print("Error crítico: API_KEY de ScrapeOps no está configurada. El script se detendrá."); exit()
+CACHE_RESPUESTAS = None
+INDICE_LISTADOS = None
+RITMO = None
+OPCIONES_PROXY = {}
+PERFIL_NAVEGADOR = "ligero"
+CHROMEDRIVER = {}
+OPCIONES_SALIDAS = opciones_salidas_desde_config({})
+
+@una_sola_vez
+def inicializar(config):
+    """Carga config.json (o `config`) en los globales del módulo, una sola vez. Lanza ConfiguracionIncompleta sin api_key."""
+    global API_KEY, SCRAPEOPS_ENDPOINT, CACHE_RESPUESTAS, INDICE_LISTADOS, RITMO, OPCIONES_PROXY, PERFIL_NAVEGADOR, CHROMEDRIVER, OPCIONES_SALIDAS
+    API_KEY = api_key_desde_config(config)
+    SCRAPEOPS_ENDPOINT = config.get("scrapeops_endpoint", SCRAPEOPS_ENDPOINT)
+    CACHE_RESPUESTAS = cache_desde_config(config)
+    INDICE_LISTADOS = indice_desde_config(config)
+    RITMO = ritmo_desde_config(config)
+    OPCIONES_PROXY = opciones_proxy_desde_config(config)
+    PERFIL_NAVEGADOR = perfil_desde_config(config, "scraper")
+    CHROMEDRIVER = chromedriver_desde_config(config)
+    OPCIONES_SALIDAS = opciones_salidas_desde_config(config)
+    print(f"API Key cargada.")
 
 def get_scrapeops_url(target_url, residential=True, render_js=True, country="us"):
-    if not API_KEY: return target_url
-    payload = { "api_key": API_KEY, "url": target_url, "country": country, "residential": residential, "render_js": render_js, "timeout": 180000 }
-    return "https://proxy.scrapeops.io/v1/?" + urlencode(payload)
-
-def configurar_driver():
-    options = Options()
-    # options.add_argument("--headless") 
-    options.add_argument("--no-sandbox"); options.add_argument("--disable-dev-shm-usage"); options.add_argument("--disable-gpu")
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36")
-    options.add_argument("--start-maximized")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"]); options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument('--disable-blink-features=AutomationControlled')
+    inicializar()
+    return construir_url_scrapeops(target_url, API_KEY, residential=residential, render_js=render_js, country=country, endpoint=SCRAPEOPS_ENDPOINT,
+                                   timeout_ms=timeout_proxy_ms(OPCIONES_PROXY.get("presupuesto_s", 60)))
+
+def configurar_driver(perfil=None):
+    """Lanza Chrome con el perfil de la etapa (config "navegador"); perfil="completo" muestra la ventana."""
+    inicializar()
+    perfil = perfil or PERFIL_NAVEGADOR
     try:
-        driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=options)
-        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined});"})
-        print("Driver de Selenium configurado.")
+        driver = lanzar_chrome(perfil, OPCIONES_PROXY.get("presupuesto_s", 60), CHROMEDRIVER)
+        print(f"Driver de Selenium configurado (perfil: {perfil}).")
         return driver
     except Exception as e: print(f"Error al configurar el driver de Selenium: {e}"); return None
 
+# --- Extracción de Detalles (un link) ---
+def guardar_en_cache(driver, link):
+    """Guarda el DOM renderizado para que una re-ejecución lo parsee sin volver a pagar el proxy."""
+    if not CACHE_RESPUESTAS: return
+    try:
+        html = driver.page_source
+        if "__NEXT_DATA__" in html: CACHE_RESPUESTAS.guardar(link, html, OPCIONES_CACHE)
+    except Exception as e: print(f"    - No se pudo guardar la página en la caché: {e}")
+
+def extraer_detalle_selenium(driver, link, limitador=None):
+    """Visita el link con Selenium y devuelve un DetallePropiedad, o None si no es publicada por el dueño."""
+    inicializar()
+    WebDriverWait, _, _ = modulos_selenium()
+    if CACHE_RESPUESTAS:
+        html_cacheado = CACHE_RESPUESTAS.obtener(link, OPCIONES_CACHE)  # La misma clave que el motor HTTP, sin importar el nivel
+        METRICAS.contar("cache.acierto" if html_cacheado is not None else "cache.fallo")
+        if html_cacheado is not None:
+            print("  Página servida desde la caché local (sin costo de ScrapeOps).")
+            return extraer_detalle_de_html(html_cacheado, link)
+
+    interruptor, escalador = OPCIONES_PROXY.get("interruptor"), OPCIONES_PROXY.get("niveles")
+    niveles = escalador.orden("detalle") if escalador else [None]
+    for i, nivel in enumerate(niveles):
+        # Un bloqueo o una página sin datos en un nivel barato se reintenta en el siguiente, sin frenar el ritmo
+        escalable = i + 1 < len(niveles)
+        url_scrapeops = get_scrapeops_url(link, **NIVELES_PROXY[nivel]) if nivel else get_scrapeops_url(link)
+        with (interruptor.intento(link) if interruptor else nullcontext()) as intento, (limitador.turno(link) if limitador else nullcontext()) as medicion:
+            with METRICAS.etapa("selenium.carga"): driver.get(url_scrapeops)  # Lanza TimeoutException si se pasa del presupuesto de carga
+            try:
+                print("  Verificando si es 'Listed by property owner'...")
+                # Devuelve en cuanto aparece el header del anunciante (o la página terminó de cargar sin él),
+                # en vez de esperar siempre los 15 s completos en los listados de brokers
+                with METRICAS.etapa("selenium.espera_estado"): estado = WebDriverWait(driver, 15).until(lambda d: d.execute_script(JS_ESTADO_PUBLICACION))
+            except Exception:
+                estado = None
+            senal = "bloqueo" if estado == "bloqueo" else ("timeout" if estado is None else "ok")
+            if intento is not None: intento.senal = "ok" if escalable and senal == "bloqueo" else senal
+            if medicion is not None: medicion.senal = "bloqueo_nivel" if escalable and senal == "bloqueo" else senal
+        if escalador and estado is not None: escalador.registrar("detalle", nivel, estado not in ("bloqueo", "incompleta"))
+        if estado not in ("bloqueo", "incompleta") or not escalable: break
+        print(f"  Nivel '{nivel}' del proxy: página {'bloqueada' if estado == 'bloqueo' else 'sin datos'}. Subiendo a '{niveles[i + 1]}'...")
+        METRICAS.contar("http.niveles.detalle.escaladas")
+    if estado == "bloqueo": raise RuntimeError(f"Zillow devolvió una página de captcha para {link}")
+    if estado != "dueno":
+        print(f"  No es una publicación de dueño{'' if estado else ' o falló la espera'}. Saltando.")
+        guardar_en_cache(driver, link)
+        return None
+    print("  ¡Confirmado! La propiedad es publicada por el dueño.")
+    guardar_en_cache(driver, link)
+
+    # Todos los campos en un único execute_script, guiado por la tabla de selectores (con sus fallbacks)
+    with METRICAS.etapa("selenium.extraccion_dom"):
+        detalle = DetallePropiedad.desde_campos(link, driver.execute_script(JS_EXTRAER_CAMPOS, TABLA_SELECTORES) or {})
+    for campo in detalle.campos_faltantes(): print(f"    - Campo '{campo}' no encontrado.")
+    return detalle
+
+
+def extraer_detalle_http(cliente, link):
+    """
+    Descarga el link por HTTP (sin navegador) y devuelve el mismo DetallePropiedad que el motor Selenium.
+    Empieza por el nivel de proxy más barato que viene funcionando para las páginas de detalle.
+    """
+    detalle, descargada = cliente.obtener_con_niveles(link, "detalle", lambda html: extraer_detalle_de_html(html, link, exigir_completa=True))
+    if not descargada: raise RuntimeError(f"No se pudo descargar la página {link}")
+    if detalle is None: print(f"  No es una publicación de dueño. Saltando.")
+    else: print("  ¡Confirmado! La propiedad es publicada por el dueño.")
+    return detalle
+
+
+# --- Recursos por Motor ---
+def preparar_motor(motor, trabajadores=1, pool_drivers=None, limitador=None):
+    """
+    Devuelve (procesar, cerrar_todo), donde procesar(link) devuelve un DetallePropiedad o None.
+    Con "http" todos los hilos comparten una sesión; con "selenium" cada link toma prestado
+    un Chrome del pool (se crea uno propio si no se recibe `pool_drivers`).
+    `limitador` reparte el ritmo solo entre las descargas reales (no los aciertos de caché); por defecto
+    es el ControladorRitmo compartido del proceso, que se adapta a la latencia y a los bloqueos.
+    """
+    inicializar()
+    limitador = limitador or RITMO
+    if motor == "http":
+        cliente = ClienteHTTP(API_KEY, endpoint=SCRAPEOPS_ENDPOINT, cache=CACHE_RESPUESTAS, limitador=limitador, **OPCIONES_PROXY)
+        return (lambda link: extraer_detalle_http(cliente, link)), cliente.cerrar
+
+    pool_propio = pool_drivers is None
+    pool = pool_drivers or PoolDrivers(configurar_driver, tamano=trabajadores)
+    pool.precalentar()
+    def procesar_con_driver(link):
+        with pool.sesion() as driver:
+            return extraer_detalle_selenium(driver, link, limitador)
+    return procesar_con_driver, (pool.cerrar if pool_propio else (lambda: None))
+
+
+def scrapear_link(procesar, link):
+    """Procesa un link. El ritmo entre descargas lo pone el ControladorRitmo del motor."""
+    inicializar()
+    with METRICAS.etapa("scraper.link"): detalle = procesar(link)
+    METRICAS.contar("scraper.duenos" if detalle is not None else "scraper.no_duenos")
+    return detalle
+
+
+def marcar_en_indice(link):
+    """
+    Marca el link como scrapeado en el índice de listados. Se llama recién cuando su fila llegó a disco
+    (o cuando se descartó por no ser de un dueño): si el proceso muere antes, el link sigue pendiente.
+    """
+    if INDICE_LISTADOS: INDICE_LISTADOS.marcar_scrapeado(link)
+
+
 # --- Lógica Principal ---
-def scrapear_detalles_de_propiedades(archivo_json_entrada, archivo_csv_salida):
+def scrapear_detalles_de_propiedades(archivo_json_entrada, archivo_csv_salida, motor="selenium", trabajadores=1, pool_drivers=None, solo_pendientes=True,
+                                     reanudar=False):
     """
     Lee una lista de URLs de Zillow, visita cada una, y si es publicada por el dueño,
     extrae los detalles y los guarda en un CSV.
+    motor: "selenium" (Chrome) o "http" (requests + BeautifulSoup, sin navegador).
+    trabajadores: cantidad de links procesados en paralelo; el CSV conserva el orden de entrada.
+    pool_drivers: PoolDrivers compartido (opcional) para reutilizar sesiones de Chrome entre corridas.
+    solo_pendientes: con el índice de listados activo, omite los links ya scrapeados cuyo precio y estado no cambiaron.
+    reanudar: retoma una corrida interrumpida; omite los links terminados según el diario `<csv>.journal.jsonl`
+              y agrega al CSV existente en lugar de sobrescribirlo. Los links con error se reintentan.
     """
-    print(f"Iniciando scrapeo de detalles desde: {archivo_json_entrada}")
+    inicializar()
+    print(f"Iniciando scrapeo de detalles desde: {archivo_json_entrada} (motor: {motor}, trabajadores: {trabajadores})")
     try:
         with open(archivo_json_entrada, 'r', encoding='utf-8') as f:
             links_propiedades = json.load(f)
@@ -59,98 +187,76 @@ def scrapear_detalles_de_propiedades(archivo_json_entrada, archivo_csv_salida):
             print("Error: El archivo JSON de entrada no contiene una lista de links.")
             return
         print(f"Se cargaron {len(links_propiedades)} links de propiedades para procesar.")
+        if solo_pendientes and INDICE_LISTADOS:
+            pendientes = INDICE_LISTADOS.filtrar_pendientes(links_propiedades)
+            print(f"Índice de listados: se omiten {len(links_propiedades) - len(pendientes)} links sin cambios desde el último scrapeo.")
+            links_propiedades = pendientes
     except Exception as e:
         print(f"Error al leer el archivo JSON de entrada '{archivo_json_entrada}': {e}")
         return
 
-    columnas_csv = ["Adress", "", "", "url link", "phone number", "", "property owner name", "", "date", "", "", "price"]
-    
-    with open(archivo_csv_salida, 'w', newline='', encoding='utf-8') as f_csv:
-        writer = csv.writer(f_csv)
-        writer.writerow(columnas_csv)
+    diario, ya_terminados = preparar_reanudacion(archivo_csv_salida, reanudar)
+    links_propiedades = [link for link in links_propiedades if link not in ya_terminados]
+    salidas = abrir_salidas(archivo_csv_salida, reanudar, OPCIONES_SALIDAS)
+    errores = {}
 
-        mi_driver = configurar_driver()
-        if not mi_driver:
-            print("No se pudo iniciar el driver, abortando scrapeo de detalles.")
-            return
+    def guardado(link):
+        diario.registrar(link, "guardado"); marcar_en_indice(link)
 
+    def escribir_fila(detalle):
+        # Se anota en el diario y en el índice recién cuando su lote llegó a disco
+        salidas.escribir(detalle, al_confirmar=lambda: guardado(detalle.url))
+        print(f"  -> Datos guardados para '{detalle.owner_name or 'Dueño Desconocido'}'.")
+
+    def anotar_en_diario(i, detalle):
+        if detalle is not None: return
+        diario.registrar(links_propiedades[i], "error" if i in errores else "descartado", errores.get(i))
+        if i not in errores: marcar_en_indice(links_propiedades[i])  # Los errores se reintentan en la próxima corrida
+
+    escritor = EscritorOrdenado(escribir_fila, al_consumir=anotar_en_diario)
+    try:
+        procesar, cerrar_todo = preparar_motor(motor, trabajadores, pool_drivers)
+    except RuntimeError as e:
+        print(f"{e} Abortando scrapeo de detalles.")
+        salidas.cerrar()
+        diario.cerrar()
+        return
+
+    def procesar_link(i, link):
+        print(f"\n[{i+1}/{len(links_propiedades)}] Procesando URL: {link}")
         try:
-            for i, link in enumerate(links_propiedades):
-                print(f"\n[{i+1}/{len(links_propiedades)}] Procesando URL: {link}")
-                
-                url_scrapeops = get_scrapeops_url(link)
-                mi_driver.get(url_scrapeops)
-
-                try:
-                    selector_owner = "//div[@class='ds-listing-agent-header' and text()='Listed by property owner']"
-                    print("  Verificando si es 'Listed by property owner'...")
-                    WebDriverWait(mi_driver, 15).until(EC.presence_of_element_located((By.XPATH, selector_owner)))
-                    print("  ¡Confirmado! La propiedad es publicada por el dueño.")
-
-                    address = ""; owner_name = ""; phone_number = ""; publication_date = ""; price = ""
-
-                    try:
-                        address_selector = 'div[class^="styles__AddressWrapper-"] h1'
-                        address = mi_driver.find_element(By.CSS_SELECTOR, address_selector).text
-                    except: print("    - Dirección no encontrada.")
-                    
-                    try:
-                        owner_name = mi_driver.find_element(By.CSS_SELECTOR, "span.ds-listing-agent-display-name").text
-                    except: print("    - Nombre del dueño no encontrado.")
-                    
-                    try:
-                        phone_number = mi_driver.find_element(By.CSS_SELECTOR, "li.ds-listing-agent-info-text").text
-                    except: print("    - Teléfono no encontrado.")
-
-                    try:
-                        date_selector = 'tbody tr:first-child span[data-testid="date-info"]'
-                        publication_date = mi_driver.find_element(By.CSS_SELECTOR, date_selector).text
-                    except: print("    - Fecha de publicación no encontrada.")
-                    
-                    # --- LÓGICA DE EXTRACCIÓN DE PRECIO ACTUALIZADA ---
-                    try:
-                        price_selector = 'span[data-testid="price"]'
-                        price_element = mi_driver.find_element(By.CSS_SELECTOR, price_selector)
-                        # El texto puede ser "$3,399/mo", usamos .find_element para obtener el span interno sin "/mo"
-                        # o procesamos el texto. El texto del elemento principal puede ser más fácil de obtener.
-                        full_price_text = price_element.text
-                        if "/mo" in full_price_text:
-                            price = full_price_text.split("/mo")[0].strip()
-                        else:
-                            price = full_price_text.strip()
-                    except: 
-                        print("    - Precio no encontrado con selector principal. Intentando con la tabla de historial como fallback...")
-                        # Fallback al método anterior si el principal no funciona
-                        try:
-                            price_selector_fallback = 'tbody tr:first-child td[data-testid="price-money-cell"] span[class*="StyledPriceText"]'
-                            price = mi_driver.find_element(By.CSS_SELECTOR, price_selector_fallback).text
-                        except:
-                            print("    - Precio no encontrado tampoco en la tabla de historial.")
-                    # --- FIN DE LA LÓGICA DE PRECIO ---
-
-                    fila_csv = [
-                        address, "", "", link, phone_number, "", 
-                        owner_name, "", publication_date, "", "", price
-                    ]
-                    
-                    writer.writerow(fila_csv)
-                    print(f"  -> Datos guardados para '{owner_name or 'Dueño Desconocido'}' en el CSV.")
-
-                except Exception as e_owner_check:
-                    print(f"  No es una publicación de dueño o falló la espera. Saltando.")
-                
-                time.sleep(random.uniform(2, 5))
-
-        finally:
-            if mi_driver:
-                mi_driver.quit()
-                print("\nDriver de Selenium cerrado.")
+            return scrapear_link(procesar, link)
+        except Exception as e:
+            errores[i] = str(e)
+            raise
+
+    try:
+        procesar_en_paralelo(links_propiedades, procesar_link, trabajadores=trabajadores, al_completar=escritor.entregar)
+    finally:
+        cerrar_todo()
+        salidas.cerrar()
+        diario.cerrar()
+        print(f"\nMotor '{motor}' cerrado. Diario de progreso: {diario.ruta} {diario.resumen()}")
+        if RITMO: print(f"Ritmo final: {RITMO.estado()}")
+        METRICAS.imprimir_tabla()
 
 
 if __name__ == "__main__":
-    # Estos nombres serán pasados por main_pipeline.py en el futuro
-    # Por ahora, para pruebas directas, asegúrate de que el archivo de entrada exista
-    archivo_json_entrada = "zillow_links_stamford-ct_rentals_newest_minprice3000.json"
-    archivo_csv_salida = "Zillow_Owner_Listings_Report_v3.csv"
-    
-    scrapear_detalles_de_propiedades(archivo_json_entrada, archivo_csv_salida)
\ No newline at end of file
+    # Para correr crawler + scraper en un solo paso (y varias ciudades) usa main_pipeline.py
+    parser = argparse.ArgumentParser(description="Scrapea los detalles de una lista de links de Zillow y guarda las publicaciones de dueños en un CSV.")
+    parser.add_argument("--entrada", default="zillow_links_stamford-ct_rentals_newest_minprice3000.json", help="Archivo JSON generado por el crawler.")
+    parser.add_argument("--salida", default="Zillow_Owner_Listings_Report_v3.csv", help="CSV de salida.")
+    parser.add_argument("--motor", default="selenium", choices=["selenium", "http"], help='"http" scrapea sin levantar Chrome.')
+    parser.add_argument("--trabajadores", type=int, default=1, help="Links procesados en paralelo (con Selenium, una sesión de Chrome por trabajador).")
+    parser.add_argument("--reanudar", "--resume", action="store_true", help="Retoma una corrida interrumpida: omite los links ya terminados y agrega al CSV.")
+    parser.add_argument("--reporte-metricas", help="Archivo JSON con tiempos por etapa (percentiles) y contadores de la corrida.")
+    parser.add_argument("--prometheus", help="Archivo .prom para el textfile collector de node_exporter.")
+    parser.add_argument("--perfilar", help="Corre bajo cProfile y guarda las estadísticas en este archivo.")
+    args = parser.parse_args()
+    try: inicializar()
+    except ConfiguracionIncompleta as e: print(f"Error crítico: {e} El script se detendrá."); sys.exit(1)
+
+    with perfilar(args.perfilar):
+        scrapear_detalles_de_propiedades(args.entrada, args.salida, motor=args.motor, trabajadores=args.trabajadores, reanudar=args.reanudar)
+    if args.reporte_metricas or args.prometheus:
+        finalizar_metricas(args.reporte_metricas, args.prometheus, extra={"ritmo": RITMO.estado() if RITMO else None})
@@ -0,0 +1,248 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import contextlib
+
+DIRECTORIO_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if DIRECTORIO_REPO not in sys.path: sys.path.insert(0, DIRECTORIO_REPO)
+
+from benchmarks.servidor_scrapeops import ConfigSimulacion, ServidorScrapeOps
+
+try:
+    import psutil
+except ImportError:  # Opcional: sin psutil se mide solo este proceso (sin Chrome)
+    psutil = None
+
+CIUDAD = "Stamford, CT"
+ESCENARIOS_POR_DEFECTO = ["busqueda_http", "detalles_http"]
+
+
+# --- Memoria ---
+def rss_actual_mb():
+    """RSS de este proceso más sus hijos (chromedriver/Chrome) en MB."""
+    if psutil is not None:
+        proceso = psutil.Process()
+        procesos = [proceso] + proceso.children(recursive=True)
+        total = 0
+        for p in procesos:
+            try: total += p.memory_info().rss
+            except psutil.Error: pass
+        return total / (1024 * 1024)
+    try:
+        with open("/proc/self/statm") as f: return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Pico de toda la vida del proceso
+
+
+class MuestreadorMemoria:
+    """Toma el RSS cada `intervalo_s` en un hilo aparte y guarda el pico observado mientras dura el bloque."""
+
+    def __init__(self, intervalo_s=0.05):
+        self.intervalo_s = intervalo_s
+        self.pico_mb = 0.0
+        self._fin = threading.Event()
+
+    def _muestrear(self):
+        while not self._fin.is_set():
+            self.pico_mb = max(self.pico_mb, rss_actual_mb())
+            self._fin.wait(self.intervalo_s)
+
+    def __enter__(self):
+        self.pico_mb = rss_actual_mb()
+        self._hilo = threading.Thread(target=self._muestrear, name="muestreador-memoria", daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._fin.set(); self._hilo.join()
+        self.pico_mb = max(self.pico_mb, rss_actual_mb())
+
+
+# --- Entorno Aislado ---
+def escribir_config(directorio, endpoint, trabajadores, tasa, cobertura, niveles=True):
+    """config.json del benchmark: sin caché ni índice (cada corrida descarga todo) y un ritmo que no sea el cuello de botella."""
+    config = {
+        "api_key": "benchmark", "scrapeops_endpoint": endpoint,
+        "cache": {"activa": False}, "indice": {"activo": False},
+        "ritmo": {"tasa_inicial": tasa, "tasa_max": tasa, "concurrencia_inicial": trabajadores, "concurrencia_max": trabajadores, "enfriamiento_s": 2},
+        "proxy": {"presupuesto_s": 15, "cobertura": cobertura, **({} if niveles else {"niveles": False})},
+    }
+    with open(os.path.join(directorio, "config.json"), "w", encoding="utf-8") as f: json.dump(config, f, indent=4)
+    return config
+
+
+class Contexto:
+    """Módulos del scraper cargados dentro del directorio del benchmark: inicializar() lee ahí su config.json (importarlos no lee nada)."""
+
+    def __init__(self, directorio, config, servidor, args):
+        self.directorio, self.config, self.servidor, self.args = directorio, config, servidor, args
+        os.chdir(directorio)
+        import Zillow_Crawler, Zillow_Scraper
+        Zillow_Crawler.inicializar(); Zillow_Scraper.inicializar()
+        from zillow_ritmo import ControladorRitmo
+        from zillow_http import EscaladorNiveles
+        from zillow_metricas import METRICAS
+        self.crawler, self.scraper, self.metricas = Zillow_Crawler, Zillow_Scraper, METRICAS
+        self._ControladorRitmo, self._EscaladorNiveles = ControladorRitmo, EscaladorNiveles
+
+    def reiniciar(self):
+        """Métricas, ritmo y niveles del proxy de cero para que un escenario no herede el estado del anterior."""
+        self.metricas.reiniciar()
+        ritmo = self._ControladorRitmo(**self.config["ritmo"])
+        self.crawler.RITMO = self.scraper.RITMO = ritmo
+        if self.crawler.OPCIONES_PROXY.get("niveles"):
+            self.crawler.OPCIONES_PROXY["niveles"] = self.scraper.OPCIONES_PROXY["niveles"] = self._EscaladorNiveles()
+
+    def driver_disponible(self):
+        driver = self.crawler.configurar_driver()
+        if driver is None: return False
+        driver.quit()
+        return True
+
+
+# --- Escenarios ---
+def escenario_busqueda_http(ctx):
+    """Primera página + paginación y mosaicos por HTTP (lo que hace extraer_links_propiedades_zillow tras la carga inicial)."""
+    from zillow_busqueda import construir_filter_state, descargar_pagina_busqueda, cosechar_busqueda_completa, filtrar_probables_duenos
+    from zillow_http import ClienteHTTP
+    ubicacion = ctx.crawler.formatear_ubicacion_zillow(CIUDAD)
+    filter_state = construir_filter_state("rentals", True)
+    with ClienteHTTP(ctx.crawler.API_KEY, endpoint=ctx.crawler.SCRAPEOPS_ENDPOINT, limitador=ctx.crawler.RITMO, **ctx.crawler.OPCIONES_PROXY) as cliente:
+        data_next = descargar_pagina_busqueda(cliente, ubicacion, "rentals", filter_state, CIUDAD)
+        unicos, total, parcial = cosechar_busqueda_completa(cliente, data_next, ubicacion, "rentals", filter_state, CIUDAD, True, ctx.args.trabajadores)
+    return {"listados": len(unicos), "reportados": total, "parcial": parcial, "probables_duenos": len(filtrar_probables_duenos(unicos))}
+
+
+def escenario_crawler_selenium(ctx):
+    """extraer_links_propiedades_zillow completo: carga inicial en Chrome y cosecha por HTTP."""
+    driver = ctx.crawler.configurar_driver()
+    try:
+        links = ctx.crawler.extraer_links_propiedades_zillow(driver, CIUDAD, trabajadores_paginas=ctx.args.trabajadores)
+    finally:
+        driver.quit()
+    return {"links": len(links)}
+
+
+def _escenario_detalles(ctx, motor):
+    entrada, salida = os.path.join(ctx.directorio, f"links_{motor}.json"), os.path.join(ctx.directorio, f"detalles_{motor}.csv")
+    with open(entrada, "w", encoding="utf-8") as f: json.dump(ctx.servidor.mercado.links(ctx.args.links), f)
+    ctx.scraper.scrapear_detalles_de_propiedades(entrada, salida, motor=motor, trabajadores=ctx.args.trabajadores, solo_pendientes=False)
+    with open(salida, "r", encoding="utf-8") as f: filas = sum(1 for _ in f) - 1
+    return {"links": ctx.args.links, "filas_csv": filas}
+
+
+def escenario_detalles_http(ctx):
+    """scrapear_detalles_de_propiedades con el motor HTTP (requests + BeautifulSoup)."""
+    return _escenario_detalles(ctx, "http")
+
+
+def escenario_detalles_selenium(ctx):
+    """scrapear_detalles_de_propiedades con el pool de Chrome."""
+    return _escenario_detalles(ctx, "selenium")
+
+
+ESCENARIOS = {
+    "busqueda_http": (escenario_busqueda_http, False, "http.descarga"),
+    "crawler_selenium": (escenario_crawler_selenium, True, "http.descarga"),
+    "detalles_http": (escenario_detalles_http, False, "http.descarga"),
+    "detalles_selenium": (escenario_detalles_selenium, True, "selenium.carga"),
+}
+
+
+def correr_escenario(ctx, nombre, verboso=False):
+    """Corre un escenario y devuelve páginas/s, p50/p95 de la etapa de descarga y el pico de RSS."""
+    funcion, necesita_chrome, etapa_latencia = ESCENARIOS[nombre]
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(sys.stdout if verboso else nulo):
+        if necesita_chrome and not ctx.driver_disponible():
+            return {"escenario": nombre, "omitido": "no se pudo lanzar Chrome/chromedriver"}
+        ctx.reiniciar()
+        antes = ctx.servidor.estadisticas()
+        inicio = time.perf_counter()
+        with MuestreadorMemoria() as memoria: extra = funcion(ctx)
+        segundos = time.perf_counter() - inicio
+
+    despues = ctx.servidor.estadisticas()
+    def diferencia(valor, previo):
+        if isinstance(valor, dict): return {clave: diferencia(v, (previo or {}).get(clave, 0)) for clave, v in valor.items()}
+        return valor - (previo or 0)
+    servidas = {tipo: diferencia(conteo, antes.get(tipo, {})) for tipo, conteo in despues.items()}
+    paginas_ok = sum(conteo["ok"] for conteo in servidas.values())
+    resumen = ctx.metricas.resumen()
+    latencia = resumen["etapas"].get(etapa_latencia, {})
+    return {"escenario": nombre, "segundos": round(segundos, 3), "paginas_ok": paginas_ok,
+            "paginas_por_s": round(paginas_ok / segundos, 2) if segundos else 0.0,
+            "latencia_p50_s": latencia.get("p50_s", 0.0), "latencia_p95_s": latencia.get("p95_s", 0.0),
+            "pico_rss_mb": round(memoria.pico_mb, 1), "servidor": servidas, **extra, "metricas": resumen}
+
+
+def imprimir_resultados(resultados):
+    print(f"\n{'Escenario':<20}{'s':>8}{'páginas':>9}{'pág/s':>8}{'p50 s':>8}{'p95 s':>8}{'RSS MB':>9}")
+    for r in resultados:
+        if "omitido" in r: print(f"{r['escenario']:<20}  omitido: {r['omitido']}"); continue
+        print(f"{r['escenario']:<20}{r['segundos']:>8.2f}{r['paginas_ok']:>9}{r['paginas_por_s']:>8.2f}{r['latencia_p50_s']:>8.3f}{r['latencia_p95_s']:>8.3f}{r['pico_rss_mb']:>9.1f}")
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Benchmark offline del crawler y del scraper contra un ScrapeOps/Zillow simulado.")
+    parser.add_argument("--escenarios", default=",".join(ESCENARIOS_POR_DEFECTO), help=f"Separados por coma. Disponibles: {', '.join(ESCENARIOS)}.")
+    parser.add_argument("--links", type=int, default=200, help="Links de detalle a scrapear en los escenarios de detalles.")
+    parser.add_argument("--trabajadores", type=int, default=8, help="Trabajadores (y concurrencia máxima del ritmo).")
+    parser.add_argument("--tasa", type=float, default=100.0, help="Tasa del ritmo en req/s (alta para medir el pipeline, no el limitador).")
+    parser.add_argument("--cobertura", action="store_true", help="Activa las peticiones de cobertura (hedging) del cliente HTTP.")
+    parser.add_argument("--latencia-ms", type=float, default=300.0, help="Mediana de la latencia simulada del proxy.")
+    parser.add_argument("--cola", type=float, default=0.5, help="Sigma de la latencia log-normal (cola de lentos).")
+    parser.add_argument("--fallos", type=float, default=0.0, help="Proporción de respuestas 500 del proxy.")
+    parser.add_argument("--bloqueos", type=float, default=0.0, help="Proporción de bloqueos (429 o captcha).")
+    parser.add_argument("--bloqueos-datacenter", type=float, default=0.0, help="Bloqueos adicionales de las peticiones sin IP residencial.")
+    parser.add_argument("--render-js-ms", type=float, default=0.0, help="Latencia extra de las peticiones con render de JS.")
+    parser.add_argument("--sin-niveles", action="store_true", help="Desactiva la escalada por niveles del proxy (todo por un solo nivel).")
+    parser.add_argument("--listados", type=int, default=1500, help="Listados del mercado simulado (más de 820 obliga a usar mosaicos).")
+    parser.add_argument("--relleno-kb", type=int, default=200, help="KB de JS inline por página (las reales pesan cientos de KB).")
+    parser.add_argument("--salida", help="Archivo JSON con los resultados completos (incluye las métricas por etapa).")
+    parser.add_argument("--directorio", help="Directorio de trabajo (config.json, CSV, diarios). Por defecto uno temporal que se borra.")
+    parser.add_argument("--verboso", action="store_true", help="Muestra la salida del scraper en lugar de descartarla.")
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    escenarios = [e.strip() for e in args.escenarios.split(",") if e.strip()]
+    desconocidos = [e for e in escenarios if e not in ESCENARIOS]
+    if desconocidos: sys.exit(f"Escenarios desconocidos: {', '.join(desconocidos)}")
+    salida = os.path.abspath(args.salida) if args.salida else None
+
+    config_simulacion = ConfigSimulacion(latencia_ms=args.latencia_ms, cola=args.cola, tasa_fallos=args.fallos, tasa_bloqueos=args.bloqueos,
+                                         bloqueos_datacenter=args.bloqueos_datacenter, render_js_ms=args.render_js_ms, listados=args.listados, relleno_kb=args.relleno_kb)
+    directorio = os.path.abspath(args.directorio) if args.directorio else tempfile.mkdtemp(prefix="bench_zillow_")
+    os.makedirs(directorio, exist_ok=True)
+    directorio_original = os.getcwd()
+    resultados = []
+    try:
+        with ServidorScrapeOps(config_simulacion) as servidor:
+            print(f"Proxy simulado en {servidor.endpoint} ({config_simulacion})")
+            config = escribir_config(directorio, servidor.endpoint, args.trabajadores, args.tasa, args.cobertura, not args.sin_niveles)
+            with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(sys.stdout if args.verboso else nulo):
+                ctx = Contexto(directorio, config, servidor, args)
+            for nombre in escenarios:
+                print(f"Corriendo {nombre}...")
+                resultados.append(correr_escenario(ctx, nombre, args.verboso))
+    finally:
+        os.chdir(directorio_original)
+        if not args.directorio: shutil.rmtree(directorio, ignore_errors=True)
+
+    imprimir_resultados(resultados)
+    if salida:
+        reporte = {"simulacion": vars(config_simulacion), "argumentos": vars(args), "resultados": resultados}
+        with open(salida, "w", encoding="utf-8") as f: json.dump(reporte, f, indent=4, ensure_ascii=False)
+        print(f"\nResultados guardados en {salida}")
+    return resultados
+
+
+if __name__ == "__main__":
+    main()
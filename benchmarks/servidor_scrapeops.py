@@ -0,0 +1,274 @@
+import os
+import re
+import json
+import copy
+import math
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# --- Fixtures y Mercado Simulado ---
+DIRECTORIO_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+BOUNDS_MERCADO = {"west": -73.62, "east": -73.49, "south": 41.02, "north": 41.15}
+RESULTADOS_POR_PAGINA = 41
+PAGINAS_MAX = 20  # Zillow nunca sirve más de 20 páginas por búsqueda (tope de 820 resultados)
+CALLES = ["Main St", "Bedford St", "Summer St", "Washington Blvd", "Hope St", "Shippan Ave", "Elm St", "Strawberry Hill Ave", "Glenbrook Rd", "Courtland Ave"]
+NOMBRES = ["Jane Miller", "Carlos Rivera", "Priya Shah", "Tom O'Neil", "Ana Costa", "Wei Chen", "Laura Rossi", "Sam Okafor"]
+RE_ZPID = re.compile(r"/(\d+)_zpid")
+PAGINA_CAPTCHA = ('<html><head><title>Access to this page has been denied</title></head>'
+                  '<body><div id="px-captcha"></div><p>Press &amp; Hold to confirm you are a human.</p></body></html>')
+
+
+def cargar_fixture(nombre):
+    with open(os.path.join(DIRECTORIO_FIXTURES, nombre), "r", encoding="utf-8") as f:
+        return json.load(f) if nombre.endswith(".json") else f.read()
+
+
+@dataclass
+class ConfigSimulacion:
+    """Comportamiento del proxy simulado: latencia log-normal (mediana + cola), tasas de fallo y tamaño del mercado."""
+    latencia_ms: float = 300.0
+    cola: float = 0.5             # sigma de la log-normal: 0 = latencia fija, 1 = cola muy pesada
+    tasa_fallos: float = 0.0      # Respuestas 500 del proxy
+    tasa_bloqueos: float = 0.0    # Mitad 429, mitad página de captcha con 200
+    bloqueos_datacenter: float = 0.0  # Bloqueos adicionales de las peticiones con residential=False
+    render_js_ms: float = 0.0     # Latencia extra de las peticiones con render_js=True
+    listados: int = 1500
+    proporcion_duenos: float = 0.3
+    relleno_kb: int = 200         # JS inline para que las páginas pesen como las reales
+    semilla: int = 7
+
+
+class MercadoSimulado:
+    """Listados deterministas (por semilla) repartidos al azar dentro de BOUNDS_MERCADO."""
+
+    def __init__(self, cantidad, proporcion_duenos=0.3, semilla=7):
+        rng = random.Random(semilla)
+        self.listados = []
+        for i in range(cantidad):
+            zpid = 50000000 + i
+            calle = f"{rng.randint(1, 1999)} {rng.choice(CALLES)}"
+            self.listados.append({
+                "zpid": zpid, "calle": calle, "precio": rng.randrange(1800, 7500, 25),
+                "lat": rng.uniform(BOUNDS_MERCADO["south"], BOUNDS_MERCADO["north"]),
+                "lon": rng.uniform(BOUNDS_MERCADO["west"], BOUNDS_MERCADO["east"]),
+                "clase": "dueno" if rng.random() < proporcion_duenos else "broker",
+                "nombre": rng.choice(NOMBRES), "telefono": f"(203) 555-{rng.randint(0, 9999):04d}",
+                "fecha": f"{rng.randint(1, 12)}/{rng.randint(1, 28)}/2026",
+            })
+        self.por_zpid = {str(listado["zpid"]): listado for listado in self.listados}
+
+    def en_bounds(self, bounds):
+        return [l for l in self.listados if bounds["south"] <= l["lat"] <= bounds["north"] and bounds["west"] <= l["lon"] <= bounds["east"]]
+
+    def links(self, cantidad=None, clase=None):
+        elegidos = [l for l in self.listados if clase is None or l["clase"] == clase][:cantidad]
+        return [f"https://www.zillow.com{url_detalle(l)}" for l in elegidos]
+
+
+def url_detalle(listado):
+    slug = listado["calle"].replace(" ", "-") + "-Stamford-CT-06901"
+    return f"/homedetails/{slug}/{listado['zpid']}_zpid/"
+
+
+def direccion(listado):
+    return f"{listado['calle']}, Stamford, CT 06901"
+
+
+# --- Respuestas ---
+class GeneradorPaginas:
+    """Arma las páginas de búsqueda y de detalle a partir de los fixtures y del mercado simulado."""
+
+    def __init__(self, mercado, relleno_kb=200):
+        self.mercado = mercado
+        busqueda = cargar_fixture("busqueda.json")
+        self.next_data_busqueda, self.plantillas_resultado = busqueda["next_data"], busqueda["resultados"]
+        self.propiedad = cargar_fixture("propiedad.json")
+        self.html_detalle = {"dueno": cargar_fixture("detalle_dueno.html"), "broker": cargar_fixture("detalle_broker.html")}
+        bloque = "window.__zbench=window.__zbench||[];__zbench.push(function(){return 'abcdefghijklmnopqrstuvwxyz0123456789';});\n"
+        self.relleno = bloque * max(0, relleno_kb * 1024 // len(bloque))
+
+    def _resultado(self, listado):
+        item = copy.deepcopy(self.plantillas_resultado[listado["clase"]])
+        home_info = item["hdpData"]["homeInfo"]
+        item.update(zpid=str(listado["zpid"]), id=str(listado["zpid"]), detailUrl=url_detalle(listado), price=f"${listado['precio']:,}/mo",
+                    unformattedPrice=listado["precio"], address=direccion(listado), addressStreet=listado["calle"],
+                    latLong={"latitude": listado["lat"], "longitude": listado["lon"]})
+        home_info.update(zpid=listado["zpid"], streetAddress=listado["calle"], latitude=listado["lat"], longitude=listado["lon"],
+                         price=listado["precio"], priceForHDP=listado["precio"], rentZestimate=listado["precio"])
+        return item
+
+    def busqueda(self, search_query_state):
+        bounds = search_query_state.get("mapBounds") or BOUNDS_MERCADO
+        pagina = int((search_query_state.get("pagination") or {}).get("currentPage") or 1)
+        dentro = self.mercado.en_bounds(bounds)
+        total_paginas = max(1, min(PAGINAS_MAX, math.ceil(len(dentro) / RESULTADOS_POR_PAGINA)))
+        inicio = (pagina - 1) * RESULTADOS_POR_PAGINA
+        list_results = [self._resultado(l) for l in dentro[inicio:inicio + RESULTADOS_POR_PAGINA]] if pagina <= PAGINAS_MAX else []
+
+        data_next = copy.deepcopy(self.next_data_busqueda)
+        estado = data_next["props"]["pageProps"]["searchPageState"]
+        estado["queryState"].update(pagination=search_query_state.get("pagination") or {}, mapBounds=bounds,
+                                    filterState=search_query_state.get("filterState") or {},
+                                    usersSearchTerm=search_query_state.get("usersSearchTerm", ""))
+        estado["cat1"]["searchResults"]["listResults"] = list_results
+        estado["cat1"]["searchList"].update(totalPages=total_paginas, totalResultCount=len(dentro))
+        estado["categoryTotals"]["cat1"]["totalResultCount"] = len(dentro)
+        return (f'<!DOCTYPE html><html><head><title>Stamford CT Rentals | Zillow</title><script>{self.relleno}</script></head>'
+                f'<body><div id="__next"></div><script id="__NEXT_DATA__" type="application/json">{json.dumps(data_next)}</script></body></html>')
+
+    def detalle(self, zpid):
+        listado = self.mercado.por_zpid.get(zpid)
+        if listado is None: return None
+        propiedad = copy.deepcopy(self.propiedad)
+        propiedad.update(zpid=listado["zpid"], streetAddress=listado["calle"], price=listado["precio"], latitude=listado["lat"],
+                         longitude=listado["lon"], datePostedString=listado["fecha"],
+                         listingSubType={"isFRBO": True} if listado["clase"] == "dueno" else {"isFSBA": True})
+        propiedad["attributionInfo"].update(agentName=listado["nombre"], agentPhoneNumber=listado["telefono"],
+                                            brokerName=None if listado["clase"] == "dueno" else "Coastal Realty Group")
+        propiedad["priceHistory"][0].update(date=listado["fecha"], price=listado["precio"])
+        # Como en Zillow, gdpClientCache es un JSON serializado dentro del JSON de la página
+        cache = json.dumps({f'ForRentShopperPlatformFullRenderQuery{{"zpid":{listado["zpid"]}}}': {"property": propiedad}})
+        data_next = {"props": {"pageProps": {"componentProps": {"gdpClientCache": cache, "zpid": listado["zpid"]}}}, "page": "/homedetails/[...slug]"}
+        html = self.html_detalle[listado["clase"]]
+        for clave, valor in (("{{relleno}}", self.relleno), ("{{next_data}}", json.dumps(data_next)), ("{{direccion}}", direccion(listado)),
+                             ("{{precio}}", f"${listado['precio']:,}"), ("{{nombre}}", listado["nombre"]), ("{{telefono}}", listado["telefono"]),
+                             ("{{fecha}}", listado["fecha"]), ("{{zpid}}", str(listado["zpid"]))):
+            html = html.replace(clave, valor)
+        return html
+
+
+# --- Servidor HTTP (imita proxy.scrapeops.io/v1/) ---
+class _ManejadorProxy(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: el pool de requests.Session reutiliza conexiones como con el proxy real
+
+    def do_GET(self):
+        servidor = self.server.simulador
+        partes = urlparse(self.path)
+        parametros = parse_qs(partes.query)
+        target_url = (parametros.get("url") or [""])[0]
+        if not partes.path.startswith("/v1") or not target_url:
+            return self._responder(404, "Not found")
+        residential, render_js = ((parametros.get(clave) or ["True"])[0] == "True" for clave in ("residential", "render_js"))
+        status, html, tipo = servidor.resolver(target_url, residential, render_js)
+        servidor.anotar(tipo, status, len(html), nivel=("residencial" if residential else "datacenter") + ("_js" if render_js else ""))
+        self._responder(status, html)
+
+    def _responder(self, status, cuerpo):
+        datos = cuerpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ServidorHilos(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class ServidorScrapeOps:
+    """
+    Sustituto local de ScrapeOps + Zillow para medir sin gastar créditos: responde en /v1/?url=<zillow>
+    con búsquedas paginadas (eco de filterState y mapBounds, para que funcionen filtros y mosaicos) y
+    páginas de detalle de dueño o de broker, con la latencia y las tasas de fallo de ConfigSimulacion.
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", puerto=0):
+        self.config = config or ConfigSimulacion()
+        self.mercado = MercadoSimulado(self.config.listados, self.config.proporcion_duenos, self.config.semilla)
+        self.paginas = GeneradorPaginas(self.mercado, self.config.relleno_kb)
+        self._rng = random.Random(self.config.semilla)
+        self._lock = threading.Lock()
+        self._estadisticas = {}
+        self._servidor = _ServidorHilos((host, puerto), _ManejadorProxy)
+        self._servidor.simulador = self
+        self._hilo = None
+
+    @property
+    def endpoint(self):
+        host, puerto = self._servidor.server_address[:2]
+        return f"http://{host}:{puerto}/v1/"
+
+    def _sortear(self, residential=True, render_js=True):
+        with self._lock:
+            latencia = self._rng.lognormvariate(math.log(max(1.0, self.config.latencia_ms) / 1000), self.config.cola)
+            azar = self._rng.random()
+        latencia += self.config.render_js_ms / 1000 if render_js else 0
+        bloqueos = self.config.tasa_bloqueos + (0 if residential else self.config.bloqueos_datacenter)
+        if azar < self.config.tasa_fallos: return latencia, "error"
+        if azar < self.config.tasa_fallos + bloqueos / 2: return latencia, "429"
+        if azar < self.config.tasa_fallos + bloqueos: return latencia, "captcha"
+        return latencia, None
+
+    def resolver(self, target_url, residential=True, render_js=True):
+        """Devuelve (status, html, tipo) para la URL de Zillow pedida, después de simular la latencia del proxy y su nivel."""
+        latencia, falla = self._sortear(residential, render_js)
+        time.sleep(latencia)
+        coincidencia = RE_ZPID.search(target_url)
+        tipo = "detalle" if coincidencia else "busqueda"
+        if falla == "error": return 500, "ScrapeOps: upstream error", tipo
+        if falla == "429": return 429, "Too Many Requests", tipo
+        if falla == "captcha": return 200, PAGINA_CAPTCHA, tipo
+        if coincidencia:
+            html = self.paginas.detalle(coincidencia.group(1))
+            return (200, html, tipo) if html else (404, "Not found", tipo)
+        try:
+            search_query_state = json.loads(parse_qs(urlparse(target_url).query)["searchQueryState"][0])
+        except (KeyError, ValueError):
+            search_query_state = {}
+        return 200, self.paginas.busqueda(search_query_state), tipo
+
+    def anotar(self, tipo, status, tamano, nivel=None):
+        with self._lock:
+            conteo = self._estadisticas.setdefault(tipo, {"peticiones": 0, "ok": 0, "fallidas": 0, "bytes": 0, "niveles": {}})
+            conteo["peticiones"] += 1; conteo["bytes"] += tamano
+            conteo["ok" if status == 200 else "fallidas"] += 1
+            if nivel: conteo["niveles"][nivel] = conteo["niveles"].get(nivel, 0) + 1
+
+    def estadisticas(self):
+        with self._lock: return copy.deepcopy(self._estadisticas)
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name="servidor-scrapeops", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sustituto local de proxy.scrapeops.io/v1/ con páginas de Zillow simuladas.")
+    parser.add_argument("--puerto", type=int, default=8800)
+    parser.add_argument("--latencia-ms", type=float, default=300.0, help="Mediana de la latencia simulada del proxy.")
+    parser.add_argument("--cola", type=float, default=0.5, help="Sigma de la latencia log-normal (cola de lentos).")
+    parser.add_argument("--fallos", type=float, default=0.0, help="Proporción de respuestas 500.")
+    parser.add_argument("--bloqueos", type=float, default=0.0, help="Proporción de bloqueos (429 o captcha).")
+    parser.add_argument("--bloqueos-datacenter", type=float, default=0.0, help="Bloqueos adicionales de las peticiones sin IP residencial.")
+    parser.add_argument("--render-js-ms", type=float, default=0.0, help="Latencia extra de las peticiones con render de JS.")
+    parser.add_argument("--listados", type=int, default=1500, help="Listados del mercado simulado (más de 820 obliga a usar mosaicos).")
+    parser.add_argument("--relleno-kb", type=int, default=200, help="KB de JS inline por página.")
+    args = parser.parse_args()
+    config = ConfigSimulacion(latencia_ms=args.latencia_ms, cola=args.cola, tasa_fallos=args.fallos, tasa_bloqueos=args.bloqueos,
+                              bloqueos_datacenter=args.bloqueos_datacenter, render_js_ms=args.render_js_ms, listados=args.listados, relleno_kb=args.relleno_kb)
+    servidor = ServidorScrapeOps(config, puerto=args.puerto)
+    print(f'Proxy simulado en {servidor.endpoint} (usa "scrapeops_endpoint": "{servidor.endpoint}" en config.json). Ctrl+C para salir.')
+    with servidor:
+        try: threading.Event().wait()
+        except KeyboardInterrupt: pass
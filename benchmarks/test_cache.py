@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from zillow_cache import OPCIONES_CACHE, CacheRespuestas
+
+URL_BUSQUEDA = "https://www.zillow.com/stamford-ct/rentals/"
+URL_DETALLE = "https://www.zillow.com/homedetails/1-Main-St/123_zpid/"
+
+
+class TestCacheRespuestas(unittest.TestCase):
+    """Vencimiento por TTL según el tipo de página y desalojo LRU por tamaño."""
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.reloj = 1000.0
+        parche = mock.patch("zillow_cache.time.time", side_effect=lambda: self.reloj)
+        parche.start(); self.addCleanup(parche.stop)
+        self.cache = CacheRespuestas(os.path.join(self.directorio.name, "cache.sqlite"), ttl_por_tipo={"busqueda": 60, "detalle": 3600})
+
+    def tearDown(self):
+        self.cache.cerrar()
+        self.directorio.cleanup()
+
+    def tamano(self, url):
+        clave = CacheRespuestas.clave(url, OPCIONES_CACHE)
+        return self.cache._conexion.execute("SELECT tamano FROM respuestas WHERE clave = ?", (clave,)).fetchone()[0]
+
+    def test_vence_segun_el_tipo(self):
+        self.cache.guardar(URL_BUSQUEDA, "<html>busqueda</html>", OPCIONES_CACHE)
+        self.cache.guardar(URL_DETALLE, "<html>detalle</html>", OPCIONES_CACHE)
+        self.reloj += 30
+        self.assertEqual(self.cache.obtener(URL_BUSQUEDA, OPCIONES_CACHE), "<html>busqueda</html>")
+        self.reloj += 60
+        self.assertIsNone(self.cache.obtener(URL_BUSQUEDA, OPCIONES_CACHE))  # Venció a los 60 s
+        self.assertEqual(self.cache.obtener(URL_DETALLE, OPCIONES_CACHE), "<html>detalle</html>")  # El detalle dura una hora
+        self.assertEqual(self.cache._conexion.execute("SELECT COUNT(*) FROM respuestas").fetchone()[0], 1)  # La vencida se borró
+
+    def test_la_clave_no_depende_del_nivel_del_proxy(self):
+        self.cache.guardar(URL_DETALLE, "<html>detalle</html>", OPCIONES_CACHE)
+        self.assertEqual(self.cache.obtener(URL_DETALLE, OPCIONES_CACHE), "<html>detalle</html>")
+        self.assertIsNone(self.cache.obtener(URL_DETALLE, {"country": "us", "residential": True}))
+
+    def test_desaloja_la_menos_usada(self):
+        urls = [f"{URL_DETALLE}?v={i}" for i in range(3)]
+        self.cache.guardar(urls[0], "a" * 1000, OPCIONES_CACHE); self.reloj += 1
+        self.cache.guardar(urls[1], "b" * 1000, OPCIONES_CACHE); self.reloj += 1
+        self.cache.obtener(urls[0], OPCIONES_CACHE); self.reloj += 1  # La primera pasa a ser la más reciente
+        self.cache.max_bytes = self.tamano(urls[0]) + self.tamano(urls[1])
+        self.cache.guardar(urls[2], "c" * 1000, OPCIONES_CACHE)
+        self.assertIsNotNone(self.cache.obtener(urls[0], OPCIONES_CACHE))
+        self.assertIsNone(self.cache.obtener(urls[1], OPCIONES_CACHE))
+        self.assertIsNotNone(self.cache.obtener(urls[2], OPCIONES_CACHE))
+
+
+if __name__ == "__main__":
+    unittest.main()
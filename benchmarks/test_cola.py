@@ -0,0 +1,66 @@
+import os
+import tempfile
+import time
+import unittest
+from zillow_cola import ColaSQLite, sembrar_busqueda
+
+
+class TestColaSQLite(unittest.TestCase):
+    """Ciclo de préstamo y confirmación (lease/ack) de la cola SQLite."""
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.cola = ColaSQLite(os.path.join(self.directorio.name, "cola.sqlite"), visibilidad_s=60, max_intentos=2)
+
+    def tearDown(self):
+        self.cola.cerrar()
+        self.directorio.cleanup()
+
+    def test_encolar_deduplica_las_pendientes(self):
+        self.assertEqual(self.cola.encolar("detalle", [("1", {"url": "a"}), ("2", {"url": "b"})]), 2)
+        self.assertEqual(self.cola.encolar("detalle", [("1", {"url": "a"})]), 0)
+        self.assertEqual(self.cola.estado(), {"detalle": {"pendiente": 2}})
+
+    def test_tomar_confirmar(self):
+        self.cola.encolar("detalle", [("1", {"url": "a"})])
+        tarea, = self.cola.tomar("detalle")
+        self.assertEqual((tarea.clave, tarea.carga, tarea.intentos), ("1", {"url": "a"}, 1))
+        self.assertEqual(self.cola.tomar("detalle"), [])  # Prestada: nadie más la ve
+        self.assertTrue(self.cola.confirmar(tarea))
+        self.assertEqual(self.cola.activas(), 0)
+
+    def test_prestamo_vencido_vuelve_a_la_cola(self):
+        self.cola.encolar("detalle", [("1", {"url": "a"})])
+        vieja, = self.cola.tomar("detalle", visibilidad_s=0.01)
+        time.sleep(0.05)
+        nueva, = self.cola.tomar("detalle")
+        self.assertEqual(nueva.intentos, 2)
+        self.assertFalse(self.cola.confirmar(vieja))  # El préstamo vencido ya no puede confirmar
+        self.assertTrue(self.cola.confirmar(nueva))
+
+    def test_agota_intentos_y_queda_fallida(self):
+        self.cola.encolar("detalle", [("1", {"url": "a"})])
+        for _ in range(2):
+            tarea, = self.cola.tomar("detalle")
+            self.cola.liberar(tarea, "error de prueba")
+        self.assertEqual(self.cola.estado(), {"detalle": {"fallida": 1}})
+        self.assertEqual(self.cola.fallidas()[0][3], "error de prueba")
+
+    def test_sembrar_de_nuevo_reabre_la_busqueda_terminada(self):
+        self.assertEqual(sembrar_busqueda(self.cola, "Stamford, CT"), 1)
+        tarea, = self.cola.tomar("busqueda")
+        self.cola.confirmar(tarea)
+        self.assertEqual(sembrar_busqueda(self.cola, "Stamford, CT"), 1)
+        tarea, = self.cola.tomar("busqueda")
+        self.assertEqual(tarea.intentos, 1)
+
+    def test_encolar_reabre_las_fallidas(self):
+        self.cola.encolar("detalle", [("1", {"url": "a"})])
+        for _ in range(2): self.cola.liberar(self.cola.tomar("detalle")[0], "error")
+        self.assertEqual(self.cola.encolar("detalle", [("1", {"url": "a2"})]), 1)
+        tarea, = self.cola.tomar("detalle")
+        self.assertEqual((tarea.carga, tarea.intentos), ({"url": "a2"}, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from zillow_detalle import DetallePropiedad
+from zillow_diario import abrir_csv_salida, preparar_reanudacion, ruta_diario
+
+
+class TestReanudacion(unittest.TestCase):
+    """Reanudar a partir del diario (y del CSV) tras una corrida interrumpida."""
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.csv = os.path.join(self.directorio.name, "salida.csv")
+        parche = mock.patch("builtins.print")
+        parche.start(); self.addCleanup(parche.stop)
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def test_omite_lo_terminado_y_reintenta_los_errores(self):
+        diario, ya_terminados = preparar_reanudacion(self.csv)
+        self.assertEqual(ya_terminados, set())
+        diario.registrar("a", "guardado"); diario.registrar("b", "descartado"); diario.registrar("c", "error", "timeout")
+        diario.registrar("d", "error", "timeout"); diario.registrar("d", "guardado")  # Gana la última línea
+        diario.cerrar()
+        with open(ruta_diario(self.csv), "a", encoding="utf-8") as f: f.write('{"url": "e", "esta')  # Caída a mitad de línea
+
+        diario, ya_terminados = preparar_reanudacion(self.csv, reanudar=True)
+        self.assertEqual(ya_terminados, {"a", "b", "d"})
+        self.assertEqual(diario.resumen(), {"guardado": 2, "descartado": 1, "error": 1})
+        diario.cerrar()
+
+    def test_cubre_filas_del_csv_que_no_llegaron_al_diario(self):
+        f_csv, writer = abrir_csv_salida(self.csv)
+        writer.writerow(DetallePropiedad(url="a").a_fila_csv()); f_csv.close()
+        diario, ya_terminados = preparar_reanudacion(self.csv, reanudar=True)
+        self.assertEqual(ya_terminados, {"a"})
+        diario.cerrar()
+
+    def test_sin_reanudar_empieza_de_cero(self):
+        diario, _ = preparar_reanudacion(self.csv)
+        diario.registrar("a", "guardado"); diario.cerrar()
+        diario, ya_terminados = preparar_reanudacion(self.csv)
+        self.assertEqual((ya_terminados, diario.resumen()), (set(), {}))
+        diario.cerrar()
+        with open(ruta_diario(self.csv), encoding="utf-8") as f: self.assertEqual(f.read(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from benchmarks.servidor_scrapeops import GeneradorPaginas, MercadoSimulado, direccion, url_detalle
+from zillow_busqueda import extraer_list_results, extraer_next_data_de_html, info_paginacion
+from zillow_detalle import extraer_detalle_de_html, extraer_propiedad_json
+from bs4 import BeautifulSoup
+
+
+class TestExtraccionDesdeFixtures(unittest.TestCase):
+    """El motor HTTP sobre las páginas de benchmarks/fixtures (con el __NEXT_DATA__ que sirve Zillow)."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.mercado = MercadoSimulado(60, proporcion_duenos=0.5)
+        cls.paginas = GeneradorPaginas(cls.mercado, relleno_kb=0)
+        cls.dueno = next(l for l in cls.mercado.listados if l["clase"] == "dueno")
+        cls.broker = next(l for l in cls.mercado.listados if l["clase"] == "broker")
+
+    def test_detalle_de_dueno(self):
+        link = url_detalle(self.dueno)
+        detalle = extraer_detalle_de_html(self.paginas.detalle(str(self.dueno["zpid"])), link, exigir_completa=True)
+        self.assertIsNotNone(detalle)
+        self.assertEqual(detalle.url, link)
+        self.assertEqual(detalle.address, direccion(self.dueno))
+        self.assertEqual(detalle.owner_name, self.dueno["nombre"])
+        self.assertEqual(detalle.phone_number, self.dueno["telefono"])
+        self.assertEqual(detalle.price, f"${self.dueno['precio']:,}")
+
+    def test_detalle_de_broker(self):
+        html = self.paginas.detalle(str(self.broker["zpid"]))
+        self.assertIsNone(extraer_detalle_de_html(html, url_detalle(self.broker)))
+
+    def test_json_embebido_de_la_propiedad(self):
+        propiedad = extraer_propiedad_json(BeautifulSoup(self.paginas.detalle(str(self.dueno["zpid"])), "html.parser"))
+        self.assertEqual(propiedad["zpid"], self.dueno["zpid"])
+        self.assertEqual(propiedad["attributionInfo"]["agentPhoneNumber"], self.dueno["telefono"])
+
+    def test_busqueda(self):
+        data_next = extraer_next_data_de_html(self.paginas.busqueda({}))
+        resultados = extraer_list_results(data_next)
+        self.assertEqual(len(resultados), 41)
+        self.assertEqual(info_paginacion(data_next), (2, 60))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from unittest import mock
+from zillow_concurrencia import EscritorOrdenado
+from zillow_detalle import DetallePropiedad
+from zillow_salidas import Salidas
+
+
+class SalidaFalla:
+    """Salida en memoria que falla las primeras `fallos` veces (como un SQLite "database is locked")."""
+
+    def __init__(self, fallos=0):
+        self.fallos, self.filas, self.cerrada = fallos, [], False
+
+    def escribir_lote(self, detalles, registros):
+        if self.fallos:
+            self.fallos -= 1
+            raise RuntimeError("database is locked")
+        self.filas.extend(detalle.url for detalle in detalles)
+
+    def cerrar(self):
+        self.cerrada = True
+
+
+class TestSalidas(unittest.TestCase):
+    """Una salida que falla no aborta la corrida, no duplica filas y no confirma lo que no escribió."""
+
+    def setUp(self):
+        self.sana, self.falla = SalidaFalla(), SalidaFalla(fallos=1)
+        self.salidas = Salidas([self.sana, self.falla], tamano_lote=2, intervalo_s=60)
+        self.confirmadas = []
+
+    def escribir(self, url):
+        self.salidas.escribir(DetallePropiedad(url=url), al_confirmar=lambda: self.confirmadas.append(url))
+
+    def test_reintenta_en_cerrar_sin_duplicar(self):
+        with mock.patch("builtins.print"):
+            self.escribir("a")
+            self.escribir("b")  # Completa el lote: la segunda salida falla
+            self.assertEqual((self.sana.filas, self.falla.filas, self.confirmadas), (["a", "b"], [], []))
+            self.escribir("c")
+            self.salidas.cerrar()
+        self.assertEqual(self.sana.filas, ["a", "b", "c"])
+        self.assertEqual(self.falla.filas, ["a", "b", "c"])
+        self.assertEqual(self.confirmadas, ["a", "b", "c"])
+        self.assertTrue(self.sana.cerrada and self.falla.cerrada)
+
+    def test_cerrar_no_confirma_lo_que_nunca_se_escribio(self):
+        self.falla.fallos = 10
+        self.salidas.reintentos_cierre = 1
+        with mock.patch("builtins.print"), mock.patch("zillow_salidas.time.sleep"):
+            self.escribir("a")
+            self.escribir("b")
+            self.salidas.cerrar()
+        self.assertEqual((self.sana.filas, self.falla.filas, self.confirmadas), (["a", "b"], [], []))
+        self.assertTrue(self.falla.cerrada)
+
+
+class TestEscritorOrdenado(unittest.TestCase):
+
+    def test_un_error_al_escribir_no_traba_las_filas_siguientes(self):
+        escritas = []
+
+        def escribir(fila):
+            if fila == "b": raise RuntimeError("database is locked")
+            escritas.append(fila)
+
+        escritor = EscritorOrdenado(escribir)
+        with mock.patch("builtins.print"):
+            for indice, fila in [(2, "c"), (1, "b"), (0, "a"), (3, "d")]: escritor.entregar(indice, fila)
+        self.assertEqual(escritas, ["a", "c", "d"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import Zillow_Crawler as crawler
+import Zillow_Scraper as scraper
+from zillow_concurrencia import EscritorOrdenado
+from zillow_navegador import PoolDrivers
+from zillow_diario import preparar_reanudacion
+from zillow_salidas import abrir_salidas
+from zillow_metricas import METRICAS, finalizar_metricas
+from zillow_config import ConfiguracionIncompleta, api_key_desde_config, cargar_config
+
+FIN_DE_COLA = None
+
+
+# --- Pipeline en Streaming: Crawler -> Cola Acotada -> Scraper ---
+def ejecutar_pipeline(ciudad_estado, archivo_csv_salida, tipo_listado="rentals", sort_by_newest=True, min_price=None, max_price=None,
+                      motor="http", trabajadores=4, capacidad_cola=100, solo_pendientes=True, reanudar=False):
+    """
+    Corre crawler y scraper superpuestos: cada lote de links que descubre extraer_links_propiedades_zillow
+    entra a una cola acotada y los trabajadores del scraper empiezan a procesarlo de inmediato.
+    Cuando la cola se llena, el crawler espera (la memoria queda acotada aunque el mercado sea grande).
+    El CSV conserva el orden en que se descubrieron los links. Devuelve un resumen con los contadores, más
+    "reportados", "cosechados" y "parcial" de la búsqueda (parcial=True si faltaron páginas o mosaicos).
+    Con reanudar=True se omiten los links ya terminados según el diario del CSV y se agrega al CSV existente.
+    """
+    crawler.inicializar(); scraper.inicializar()
+    print(f"Iniciando pipeline para: {ciudad_estado} (motor de detalles: {motor}, trabajadores: {trabajadores})")
+    cola = queue.Queue(maxsize=capacidad_cola)
+    resumen = {"descubiertos": 0, "omitidos": 0, "encolados": 0, "guardados": 0, "errores": 0}
+    lock_resumen = threading.Lock()
+
+    links_por_indice = {}
+    errores = {}
+
+    def encolar(links):
+        resumen["descubiertos"] += len(links)
+        pendientes = [link for link in links if link not in ya_terminados]
+        if solo_pendientes and scraper.INDICE_LISTADOS: pendientes = scraper.INDICE_LISTADOS.filtrar_pendientes(pendientes)
+        resumen["omitidos"] += len(links) - len(pendientes)
+        for link in pendientes:
+            links_por_indice[resumen["encolados"]] = link
+            cola.put((resumen["encolados"], link))  # Bloquea si la cola está llena
+            resumen["encolados"] += 1
+
+    def productor():
+        pool_crawler = PoolDrivers(crawler.configurar_driver, tamano=1)
+        try:
+            with pool_crawler.sesion() as driver:
+                crawler.extraer_links_propiedades_zillow(driver, ciudad_estado, tipo_listado=tipo_listado, sort_by_newest=sort_by_newest,
+                                                         min_price=min_price, max_price=max_price, al_descubrir=encolar, al_terminar=resumen.update)
+        except Exception as e:
+            print(f"ERROR [Pipeline]: El crawler se detuvo: {e}")
+            resumen["error"] = f"crawler: {e}"
+        finally:
+            pool_crawler.cerrar()
+            for _ in range(trabajadores): cola.put(FIN_DE_COLA)
+
+    try:
+        procesar, cerrar_motor = scraper.preparar_motor(motor, trabajadores)
+    except RuntimeError as e:
+        print(f"{e} Abortando pipeline.")
+        resumen["error"] = str(e)
+        return resumen
+
+    diario, ya_terminados = preparar_reanudacion(archivo_csv_salida, reanudar)
+    salidas = abrir_salidas(archivo_csv_salida, reanudar, scraper.OPCIONES_SALIDAS)
+
+    def guardado(link):
+        diario.registrar(link, "guardado"); scraper.marcar_en_indice(link)
+
+    def escribir_fila(detalle):
+        link = detalle.url
+        salidas.escribir(detalle, al_confirmar=lambda: guardado(link))  # Al diario y al índice cuando el lote llegó a disco
+        resumen["guardados"] += 1
+        print(f"  -> Datos guardados para '{detalle.owner_name or 'Dueño Desconocido'}'.")
+
+    def anotar_en_diario(indice, detalle):
+        link = links_por_indice.pop(indice)
+        if detalle is not None: return
+        error = errores.pop(indice, None)
+        diario.registrar(link, "error" if error is not None else "descartado", error)
+        if error is None: scraper.marcar_en_indice(link)
+
+    escritor = EscritorOrdenado(escribir_fila, al_consumir=anotar_en_diario)
+
+    def consumidor():
+        while True:
+            item = cola.get()
+            if item is FIN_DE_COLA: return
+            indice, link = item
+            print(f"\n[Pipeline #{indice + 1}] Procesando URL: {link}")
+            try:
+                detalle = scraper.scrapear_link(procesar, link)
+            except Exception as e:
+                print(f"    ERROR: Falló {link}: {e}")
+                with lock_resumen: resumen["errores"] += 1
+                errores[indice] = str(e)
+                detalle = None
+            escritor.entregar(indice, detalle)
+
+    hilos = [threading.Thread(target=productor, name="crawler")]
+    hilos += [threading.Thread(target=consumidor, name=f"scraper-{i}") for i in range(max(1, trabajadores))]
+    try:
+        for hilo in hilos: hilo.start()
+        for hilo in hilos: hilo.join()
+    finally:
+        cerrar_motor()
+        salidas.cerrar()
+        diario.cerrar()
+
+    if scraper.RITMO: resumen["ritmo"] = scraper.RITMO.estado()
+    METRICAS.imprimir_tabla()
+    print(f"\nPipeline finalizado: {resumen['descubiertos']} links descubiertos, {resumen['omitidos']} omitidos por el índice, "
+          f"{resumen['guardados']} publicaciones de dueño guardadas en {archivo_csv_salida}, {resumen['errores']} errores.")
+    if resumen.get("parcial"): print(f"ADVERTENCIA: Búsqueda parcial: {resumen['cosechados']} listados cosechados de {resumen['reportados']} reportados por Zillow.")
+    return resumen
+
+
+# --- Lote de Ciudades en Paralelo (pool de procesos) ---
+def nombre_csv_trabajo(trabajo, directorio_salida):
+    ubicacion = crawler.formatear_ubicacion_zillow(trabajo["ciudad"])
+    precio = f"_minprice{trabajo['min_price']}" if trabajo.get("min_price") else ""
+    return os.path.join(directorio_salida, f"Zillow_Owner_Listings_{ubicacion}_{trabajo.get('tipo_listado', 'rentals')}{precio}.csv")
+
+
+def ejecutar_trabajo(trabajo, directorio_salida, motor, trabajadores, reanudar=False, prometheus_dir=None):
+    """
+    Corre el pipeline de una ciudad dentro de un proceso del pool y devuelve su resumen, con las métricas
+    por etapa de esa ciudad. Con `prometheus_dir` deja además un .prom por ciudad.
+    """
+    inicio = time.time()
+    METRICAS.reiniciar()  # El proceso del pool puede venir de otra ciudad
+    archivo_csv = nombre_csv_trabajo(trabajo, directorio_salida)
+    resultado = {"ciudad": trabajo["ciudad"], "archivo": archivo_csv, "ok": True}
+    try:
+        resultado.update(ejecutar_pipeline(trabajo["ciudad"], archivo_csv, tipo_listado=trabajo.get("tipo_listado", "rentals"),
+                                           sort_by_newest=trabajo.get("sort_by_newest", True), min_price=trabajo.get("min_price"),
+                                           max_price=trabajo.get("max_price"), motor=motor, trabajadores=trabajadores,
+                                           reanudar=reanudar))
+        resultado["ok"] = "error" not in resultado
+    except Exception as e:
+        resultado.update(ok=False, error=str(e))
+    resultado["segundos"] = round(time.time() - inicio, 1)
+    resultado["metricas"] = METRICAS.resumen()
+    if prometheus_dir:
+        ubicacion = crawler.formatear_ubicacion_zillow(trabajo["ciudad"])
+        finalizar_metricas(prometheus=os.path.join(prometheus_dir, f"zillow_{ubicacion}_{trabajo.get('tipo_listado', 'rentals')}.prom"),
+                           etiquetas={"ciudad": ubicacion, "tipo_listado": trabajo.get("tipo_listado", "rentals")})
+    return resultado
+
+
+def ejecutar_lote(trabajos, directorio_salida=".", procesos=2, motor="http", trabajadores=4, reanudar=False, prometheus_dir=None):
+    """Reparte las ciudades entre `procesos` procesos y escribe resumen_lote.json con el resultado de cada una."""
+    os.makedirs(directorio_salida, exist_ok=True)
+    if prometheus_dir: os.makedirs(prometheus_dir, exist_ok=True)
+    print(f"Iniciando lote de {len(trabajos)} ciudades con {procesos} procesos...")
+    resultados = []
+    with ProcessPoolExecutor(max_workers=max(1, procesos)) as pool:
+        futuros = {pool.submit(ejecutar_trabajo, trabajo, directorio_salida, motor, trabajadores, reanudar, prometheus_dir): trabajo for trabajo in trabajos}
+        for futuro in as_completed(futuros):
+            try: resultado = futuro.result()
+            except Exception as e: resultado = {"ciudad": futuros[futuro]["ciudad"], "ok": False, "error": str(e)}
+            resultados.append(resultado)
+            print(f"[Lote] {resultado['ciudad']}: {'OK' if resultado['ok'] else 'ERROR ' + resultado.get('error', '')}{' (búsqueda parcial)' if resultado.get('parcial') else ''} "
+                  f"({resultado.get('guardados', 0)} guardados, {resultado.get('segundos', '?')} s)")
+
+    archivo_resumen = os.path.join(directorio_salida, "resumen_lote.json")
+    with open(archivo_resumen, "w", encoding="utf-8") as f_json: json.dump(resultados, f_json, indent=4, ensure_ascii=False)
+    parciales = sum(bool(r.get("parcial")) for r in resultados)
+    print(f"\nLote finalizado: {sum(r['ok'] for r in resultados)}/{len(resultados)} ciudades OK"
+          f"{f' ({parciales} con búsqueda parcial)' if parciales else ''}. Resumen en {archivo_resumen}")
+    return resultados
+
+
+def cargar_trabajos(args):
+    """Une las ciudades de --ciudad con las del archivo --trabajos (lista JSON de specs)."""
+    trabajos = []
+    if args.trabajos:
+        with open(args.trabajos, "r", encoding="utf-8") as f: trabajos.extend(json.load(f))
+    for ciudad in args.ciudad or []:
+        trabajos.append({"ciudad": ciudad, "tipo_listado": args.tipo, "min_price": args.min_price, "max_price": args.max_price,
+                         "sort_by_newest": not args.sin_orden_nuevos})
+    return trabajos
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Crawler + scraper de Zillow para varias ciudades, sin interacción (apto para cron).")
+    parser.add_argument("--ciudad", action="append", help='Ciudad y estado, ej. "Stamford, CT". Se puede repetir.')
+    parser.add_argument("--trabajos", help='Archivo JSON con una lista de specs: [{"ciudad": "...", "tipo_listado": "rentals", "min_price": 3000}]')
+    parser.add_argument("--tipo", default="rentals", choices=["rentals", "for_sale"], help="Tipo de listado para las ciudades de --ciudad.")
+    parser.add_argument("--min-price", type=int, help="Precio mínimo para las ciudades de --ciudad.")
+    parser.add_argument("--max-price", type=int, help="Precio máximo para las ciudades de --ciudad.")
+    parser.add_argument("--sin-orden-nuevos", action="store_true", help="No ordenar por 'Newest'.")
+    parser.add_argument("--procesos", type=int, default=2, help="Ciudades procesadas en paralelo (procesos).")
+    parser.add_argument("--trabajadores", type=int, default=4, help="Links en paralelo dentro de cada ciudad.")
+    parser.add_argument("--motor", default="http", choices=["http", "selenium"], help="Motor para las páginas de detalle.")
+    parser.add_argument("--salida-dir", default=".", help="Directorio para los CSV por ciudad y el resumen del lote.")
+    parser.add_argument("--reanudar", "--resume", action="store_true", help="Retoma un lote interrumpido: omite los links ya terminados de cada ciudad.")
+    parser.add_argument("--prometheus-dir", help="Directorio del textfile collector de node_exporter (un .prom por ciudad).")
+    return parser
+
+
+if __name__ == "__main__":
+    parser = crear_parser()
+    args = parser.parse_args()
+    trabajos = cargar_trabajos(args)
+    if not trabajos: parser.error("Indica al menos una ciudad con --ciudad o un archivo con --trabajos.")
+    try: api_key_desde_config(cargar_config())  # Falla antes de lanzar el pool; cada proceso carga el resto al empezar su ciudad
+    except ConfiguracionIncompleta as e: print(f"Error crítico: {e} El script se detendrá."); sys.exit(1)
+    resultados = ejecutar_lote(trabajos, args.salida_dir, procesos=args.procesos, motor=args.motor, trabajadores=args.trabajadores,
+                               reanudar=args.reanudar, prometheus_dir=args.prometheus_dir)
+    sys.exit(0 if all(r["ok"] for r in resultados) else 1)
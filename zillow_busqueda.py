@@ -0,0 +1,425 @@
+import re
+import json
+import time
+import random
+from urllib.parse import parse_qs, quote, urljoin, urlparse
+from zillow_concurrencia import procesar_en_paralelo
+from zillow_http import PaginaIncompleta
+from zillow_metricas import METRICAS
+
+# --- Filtros Codificados en la URL (searchQueryState) ---
+# Flags de tipo de listado que Zillow espera en filterState.
+FILTROS_TIPO_LISTADO = {
+    "rentals": {"fr": {"value": True}, "fsba": {"value": False}, "fsbo": {"value": False}, "nc": {"value": False},
+                "cmsn": {"value": False}, "auc": {"value": False}, "fore": {"value": False}},
+    "for_sale": {},
+}
+SORT_NEWEST = "days"
+
+
+def construir_filter_state(tipo_listado="rentals", sort_by_newest=True, min_price=None, max_price=None, days_on_zillow=None):
+    """Arma el filterState equivalente a los filtros que hoy se aplican con clics en la UI."""
+    filter_state = dict(FILTROS_TIPO_LISTADO.get(tipo_listado.lower(), {}))
+    if sort_by_newest: filter_state["sort"] = {"value": SORT_NEWEST}
+    if min_price is not None or max_price is not None:
+        # En alquileres el precio es el pago mensual ("mp"); en venta es "price"
+        clave_precio = "mp" if tipo_listado.lower() == "rentals" else "price"
+        rango = {}
+        if min_price is not None: rango["min"] = int(min_price)
+        if max_price is not None: rango["max"] = int(max_price)
+        filter_state[clave_precio] = rango
+    if days_on_zillow is not None: filter_state["doz"] = {"value": str(days_on_zillow)}
+    return filter_state
+
+
+def construir_url_busqueda(ubicacion_formateada, tipo_listado="rentals", filter_state=None, termino_busqueda=None, pagina=None, map_bounds=None):
+    """
+    URL de resultados ya filtrados: https://www.zillow.com/<ubicacion>/<tipo>/?searchQueryState=...
+    Con map_bounds ({"west","east","south","north"}) la búsqueda se restringe a ese rectángulo del mapa.
+    """
+    url_base = f"https://www.zillow.com/{ubicacion_formateada}/{tipo_listado.lower()}/"
+    paginacion = {"currentPage": pagina} if pagina and pagina > 1 else {}
+    search_query_state = {"pagination": paginacion, "isMapVisible": bool(map_bounds), "isListVisible": True, "filterState": filter_state or {}}
+    if termino_busqueda: search_query_state["usersSearchTerm"] = termino_busqueda
+    if map_bounds: search_query_state["mapBounds"] = map_bounds
+    return url_base + "?searchQueryState=" + quote(json.dumps(search_query_state, separators=(",", ":")))
+
+
+# --- Lectura de __NEXT_DATA__ ---
+RE_NEXT_DATA = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL)
+RE_ZPID = re.compile(r"/(\d+)_zpid")
+
+try:
+    import orjson
+    cargar_json = orjson.loads  # Opcional: parsea el JSON embebido varias veces más rápido que json
+except ImportError:
+    cargar_json = json.loads
+
+# Campos de cada listResult que usa el pipeline: zpid y link, precio/estado (índice) e indicadores de dueño/broker.
+# Las rutas con punto se conservan anidadas. La proyección tiene la misma forma que __NEXT_DATA__, así que
+# extraer_list_results, info_paginacion, obtener_map_bounds y filtros_reflejados funcionan igual sobre ella.
+CAMPOS_RESULTADO = ["zpid", "detailUrl", "price", "unformattedPrice", "statusType", "statusText", "isFRBO", "isFSBO", "listingSubType",
+                    "brokerName", "builderName", "isBuilder", "isBuilding", "buildingId", "isFeaturedListing", "hdpData.homeInfo.listing_sub_type"]
+
+# Se evalúa en el navegador: parsea __NEXT_DATA__ dentro de la página y devuelve solo la proyección
+# (unos KB) en lugar de traer por WebDriver los MB del script. null si la página no es de resultados.
+JS_PROYECTAR_BUSQUEDA = """
+const script = document.getElementById('__NEXT_DATA__');
+if (!script) return null;
+const estado = ((JSON.parse(script.textContent).props || {}).pageProps || {}).searchPageState;
+if (!estado) return null;
+const rutas = arguments[0];
+const proyectar = (item) => {
+  const destino = {};
+  for (const ruta of rutas) {
+    const partes = ruta.split('.'); let valor = item;
+    for (const parte of partes) valor = (valor === null || valor === undefined) ? undefined : valor[parte];
+    if (valor === undefined || valor === null) continue;
+    let nodo = destino;
+    for (const parte of partes.slice(0, -1)) nodo = nodo[parte] = nodo[parte] || {};
+    nodo[partes[partes.length - 1]] = valor;
+  }
+  return destino;
+};
+const consulta = estado.queryState || {}, cat1 = estado.cat1 || {}, lista = cat1.searchList || {};
+return {props: {pageProps: {searchPageState: {
+  queryState: {filterState: consulta.filterState || {}, mapBounds: consulta.mapBounds || null, pagination: consulta.pagination || {}, usersSearchTerm: consulta.usersSearchTerm || ''},
+  cat1: {searchResults: {listResults: ((cat1.searchResults || {}).listResults || []).map(proyectar)},
+         searchList: {totalPages: lista.totalPages || 1, totalResultCount: lista.totalResultCount || 0}}
+}}}};
+"""
+
+
+def obtener_search_page_state(data_next):
+    return data_next.get("props", {}).get("pageProps", {}).get("searchPageState", {}) or {}
+
+
+def extraer_list_results(data_next):
+    return obtener_search_page_state(data_next).get("cat1", {}).get("searchResults", {}).get("listResults", []) or []
+
+
+def extraer_next_data_de_html(html):
+    """Recorta y parsea el <script id="__NEXT_DATA__"> de un HTML descargado sin navegador."""
+    coincidencia = RE_NEXT_DATA.search(html or "")
+    return cargar_json(coincidencia.group(1)) if coincidencia else {}
+
+
+def _proyectar_resultado(prop_item):
+    destino = {}
+    for ruta in CAMPOS_RESULTADO:
+        partes = ruta.split("."); valor = prop_item
+        for parte in partes: valor = valor.get(parte) if isinstance(valor, dict) else None
+        if valor is None: continue
+        nodo = destino
+        for parte in partes[:-1]: nodo = nodo.setdefault(parte, {})
+        nodo[partes[-1]] = valor
+    return destino
+
+
+def proyectar_next_data(data_next):
+    """Equivalente local de JS_PROYECTAR_BUSQUEDA: descarta todo lo que el pipeline no lee para no retener los listados completos."""
+    estado = obtener_search_page_state(data_next)
+    if not estado: return data_next
+    consulta, cat1 = estado.get("queryState", {}) or {}, estado.get("cat1", {}) or {}
+    search_list = cat1.get("searchList", {}) or {}
+    return {"props": {"pageProps": {"searchPageState": {
+        "queryState": {clave: consulta.get(clave) for clave in ("filterState", "mapBounds", "pagination", "usersSearchTerm")},
+        "cat1": {"searchResults": {"listResults": [_proyectar_resultado(p) for p in extraer_list_results(data_next) if isinstance(p, dict)]},
+                 "searchList": {"totalPages": search_list.get("totalPages"), "totalResultCount": search_list.get("totalResultCount")}}}}}}
+
+
+def info_paginacion(data_next):
+    """(total_paginas, total_resultados) que Zillow reporta para la búsqueda."""
+    search_list = obtener_search_page_state(data_next).get("cat1", {}).get("searchList", {}) or {}
+    return int(search_list.get("totalPages") or 1), int(search_list.get("totalResultCount") or 0)
+
+
+def obtener_map_bounds(data_next):
+    """Rectángulo del mapa que Zillow usó para la búsqueda, o None."""
+    bounds = obtener_search_page_state(data_next).get("queryState", {}).get("mapBounds")
+    if isinstance(bounds, dict) and all(k in bounds for k in ("west", "east", "south", "north")): return bounds
+    return None
+
+
+def zpid_de_resultado(prop_item):
+    if prop_item.get("zpid"): return str(prop_item["zpid"])
+    coincidencia = RE_ZPID.search(prop_item.get("detailUrl", ""))
+    return coincidencia.group(1) if coincidencia else prop_item.get("detailUrl")
+
+
+def deduplicar_por_zpid(list_results, vistos=None):
+    """Devuelve los resultados sin repetir zpid, conservando el primero visto."""
+    vistos = set() if vistos is None else vistos
+    unicos = []
+    for prop_item in list_results:
+        if not isinstance(prop_item, dict) or "detailUrl" not in prop_item: continue
+        zpid = zpid_de_resultado(prop_item)
+        if zpid in vistos: continue
+        vistos.add(zpid); unicos.append(prop_item)
+    return unicos
+
+
+# --- Clasificación de Listados (dueño vs. broker) ---
+def clasificar_listado(prop_item):
+    """
+    Clasifica un resultado de listResults a partir de los indicadores que ya trae la búsqueda:
+    "dueno" (FSBO/FRBO), "broker", "constructor", "edificio" (complejos administrados) o "desconocido".
+    """
+    home_info = (prop_item.get("hdpData") or {}).get("homeInfo") or {}
+    sub_tipo = home_info.get("listing_sub_type") or prop_item.get("listingSubType") or {}
+    if sub_tipo.get("is_FSBO") or sub_tipo.get("is_FRBO") or prop_item.get("isFRBO") or prop_item.get("isFSBO"): return "dueno"
+    if sub_tipo.get("is_newHome") or prop_item.get("builderName") or prop_item.get("isBuilder"): return "constructor"
+    if prop_item.get("isBuilding") or prop_item.get("buildingId"): return "edificio"
+    if sub_tipo.get("is_FSBA") or prop_item.get("brokerName") or prop_item.get("isFeaturedListing"): return "broker"
+    return "desconocido"
+
+
+def filtrar_probables_duenos(list_results):
+    """Deja solo los listados de dueños y los que no se pueden clasificar (para no perder ninguno)."""
+    conteo = {}; probables = []
+    for prop_item in list_results:
+        clase = clasificar_listado(prop_item)
+        conteo[clase] = conteo.get(clase, 0) + 1
+        if clase in ("dueno", "desconocido"): probables.append(prop_item)
+    detalle = ", ".join(f"{clase}: {cantidad}" for clase, cantidad in sorted(conteo.items()))
+    print(f"Pre-filtro de dueños: {len(probables)}/{len(list_results)} listados pasan ({detalle}).")
+    return probables
+
+
+def links_desde_resultados(list_results):
+    links = set()
+    for prop_item in list_results:
+        if isinstance(prop_item, dict) and "detailUrl" in prop_item:
+            links.add(urljoin("https://www.zillow.com", prop_item.get("detailUrl")))
+    return links
+
+
+def query_state_de_url(url):
+    """searchQueryState de una URL de resultados ({} si no tiene o no es JSON): lo que la UI dejó aplicado."""
+    valores = parse_qs(urlparse(url or "").query).get("searchQueryState")
+    if not valores: return {}
+    try: return cargar_json(valores[0]) or {}
+    except ValueError: return {}
+
+
+def filtros_reflejados(data_next, filter_state):
+    """True si el queryState devuelto por Zillow contiene todos los filtros pedidos."""
+    return filtros_en_query_state(obtener_search_page_state(data_next).get("queryState", {}), filter_state)
+
+
+def filtros_en_query_state(query_state, filter_state):
+    """True si el filterState de `query_state` (de __NEXT_DATA__ o de la URL) contiene todos los filtros pedidos."""
+    aplicados = (query_state or {}).get("filterState", {}) or {}
+    for clave, valor in filter_state.items():
+        if clave not in aplicados:
+            # Zillow omite los flags con su valor por defecto; solo exigimos los filtros "activos"
+            if clave in ("sort", "mp", "price", "doz"): return False
+            continue
+        if isinstance(valor, dict) and isinstance(aplicados[clave], dict):
+            if any(str(aplicados[clave].get(k)) != str(v) for k, v in valor.items()): return False
+    return True
+
+
+# --- Paginación Completa ---
+def descargar_pagina_busqueda(cliente, ubicacion_formateada, tipo_listado, filter_state, termino_busqueda, pagina=1, map_bounds=None, reintentos=2):
+    """
+    Descarga una página de resultados por HTTP y devuelve su __NEXT_DATA__. Los fallos transitorios (500,
+    timeout, bloqueo) se reintentan con backoff hasta `reintentos` veces; si igual falla devuelve {}.
+    """
+    url = construir_url_busqueda(ubicacion_formateada, tipo_listado, filter_state, termino_busqueda, pagina=pagina, map_bounds=map_bounds)
+    for intento in range(reintentos + 1):
+        data_next, descargada = cliente.obtener_con_niveles(url, "busqueda", parsear_pagina_busqueda)
+        if descargada:
+            METRICAS.contar("busqueda.paginas")
+            return data_next
+        if intento < reintentos:
+            METRICAS.contar("busqueda.reintentos")
+            esperar_reintento(cliente, intento)
+    METRICAS.contar("busqueda.paginas_fallidas")
+    return {}
+
+
+def esperar_reintento(cliente, intento):
+    """Backoff del ControladorRitmo del cliente (escalado por su tasa); sin controlador, exponencial con jitter."""
+    if hasattr(cliente.limitador, "esperar_reintento"): return cliente.limitador.esperar_reintento(intento)
+    time.sleep(min(30.0, 2.0 ** intento) * random.uniform(0.8, 1.2))
+
+
+def parsear_pagina_busqueda(html):
+    """Proyección del __NEXT_DATA__ de una página de resultados; PaginaIncompleta si no trae searchPageState."""
+    try:
+        with METRICAS.etapa("busqueda.parseo_json"): data_next = proyectar_next_data(extraer_next_data_de_html(html))
+    except ValueError as e: raise PaginaIncompleta(f"__NEXT_DATA__ inválido: {e}")
+    if not obtener_search_page_state(data_next): raise PaginaIncompleta("sin searchPageState")
+    return data_next
+
+
+def cosechar_paginas(cliente, ubicacion_formateada, tipo_listado, filter_state, termino_busqueda, paginas, trabajadores=4, al_completar_pagina=None,
+                     rondas_reintento=1):
+    """
+    Descarga en paralelo (por HTTP, sin navegador) las páginas de resultados indicadas.
+    `paginas` es una lista de números de página o de tuplas (pagina, map_bounds).
+    al_completar_pagina(list_results) se llama en el hilo principal a medida que llega cada página.
+    Las páginas que fallan (ya reintentadas una a una) vuelven a la cola para otra ronda, hasta `rondas_reintento`.
+    Devuelve (list_results en el mismo orden de `paginas`, páginas que no se pudieron descargar).
+    """
+    resultados = {}
+    def descargar_pagina(_, item):
+        i, pagina = item
+        numero, map_bounds = pagina if isinstance(pagina, tuple) else (pagina, None)
+        data_next = descargar_pagina_busqueda(cliente, ubicacion_formateada, tipo_listado, filter_state, termino_busqueda, numero, map_bounds)
+        if not data_next: return None
+        list_results = extraer_list_results(data_next)
+        print(f"  [Página {numero}] {len(list_results)} resultados.")
+        return list_results
+    pendientes = list(enumerate(paginas))
+    for ronda in range(rondas_reintento + 1):
+        fallidas = []
+        def recibir_pagina(j, list_results):
+            if list_results is None: fallidas.append(pendientes[j]); return
+            resultados[pendientes[j][0]] = list_results
+            if al_completar_pagina: al_completar_pagina(list_results)
+        procesar_en_paralelo(pendientes, descargar_pagina, trabajadores=trabajadores, al_completar=recibir_pagina)
+        # procesar_en_paralelo entrega None también cuando la función lanzó una excepción
+        pendientes = sorted(fallidas, key=lambda item: item[0])
+        if not pendientes: break
+        if ronda < rondas_reintento: print(f"  [Páginas] {len(pendientes)} páginas fallaron; reintentando (ronda {ronda + 1}/{rondas_reintento})...")
+    return [resultados.get(i, []) for i in range(len(paginas))], [pagina for _, pagina in pendientes]
+
+
+def _acumulador_unicos(al_descubrir):
+    """Devuelve (unicos, agregar): agregar(list_results) deduplica por zpid y avisa los nuevos a al_descubrir."""
+    vistos = set(); unicos = []
+    def agregar(list_results):
+        nuevos = deduplicar_por_zpid(list_results, vistos)
+        unicos.extend(nuevos)
+        if al_descubrir and nuevos: al_descubrir(nuevos)
+    return unicos, agregar
+
+
+def cosechar_todas_las_paginas(cliente, data_primera_pagina, ubicacion_formateada, tipo_listado, filter_state, termino_busqueda, trabajadores=4, al_descubrir=None):
+    """
+    A partir del __NEXT_DATA__ de la primera página, trae el resto de las páginas y devuelve
+    (resultados_unicos_por_zpid, total_reportado_por_zillow, paginas_fallidas).
+    al_descubrir(nuevos) recibe los listados nuevos de cada página en cuanto llegan.
+    """
+    total_paginas, total_reportado = info_paginacion(data_primera_pagina)
+    unicos, agregar = _acumulador_unicos(al_descubrir)
+    agregar(extraer_list_results(data_primera_pagina))
+    fallidas = []
+    if total_paginas > 1:
+        print(f"La búsqueda tiene {total_paginas} páginas. Descargando las páginas 2-{total_paginas} en paralelo...")
+        _, fallidas = cosechar_paginas(cliente, ubicacion_formateada, tipo_listado, filter_state, termino_busqueda,
+                                       range(2, total_paginas + 1), trabajadores, al_completar_pagina=agregar)
+    print(f"Cosecha completa: {len(unicos)} listados únicos de {total_reportado or len(unicos)} reportados por Zillow ({total_paginas} páginas).")
+    return unicos, total_reportado, fallidas
+
+
+# --- Cobertura por Mosaicos del Mapa ---
+# Zillow no devuelve más de ~20 páginas (unos 820 resultados) por búsqueda.
+TOPE_RESULTADOS_ZILLOW = 820
+
+
+def dividir_en_cuadrantes(bounds):
+    """Parte un rectángulo del mapa en 4 cuadrantes (NO, NE, SO, SE)."""
+    medio_lat = (bounds["north"] + bounds["south"]) / 2
+    medio_lon = (bounds["west"] + bounds["east"]) / 2
+    return [
+        {"west": bounds["west"], "east": medio_lon, "south": medio_lat, "north": bounds["north"]},
+        {"west": medio_lon, "east": bounds["east"], "south": medio_lat, "north": bounds["north"]},
+        {"west": bounds["west"], "east": medio_lon, "south": bounds["south"], "north": medio_lat},
+        {"west": medio_lon, "east": bounds["east"], "south": bounds["south"], "north": medio_lat},
+    ]
+
+
+def cosechar_por_mosaicos(cliente, bounds_iniciales, ubicacion_formateada, tipo_listado, filter_state, termino_busqueda,
+                          tope_resultados=TOPE_RESULTADOS_ZILLOW, profundidad_max=6, trabajadores=4, data_inicial=None, al_descubrir=None,
+                          reintentos_mosaico=2):
+    """
+    Cubre una región entera dividiéndola en mosaicos del mapa (quadtree): todo mosaico cuyo total
+    reportado supera el tope se subdivide en 4. Cada ronda se descarga en paralelo y los mosaicos
+    que entran bajo el tope se paginan completos. Un mosaico cuya primera página no se pudo bajar no
+    cuenta como hoja vacía: vuelve a la cola de la ronda siguiente, hasta `reintentos_mosaico` veces.
+    Un mosaico que sigue sobre el tope en `profundidad_max` se pagina igual, pero Zillow lo trunca: se avisa y
+    se devuelve en `truncados`. `data_inicial` evita volver a descargar la primera página de la región completa.
+    Devuelve (resultados_unicos_por_zpid, mosaicos_usados, paginas_fallidas, truncados) con las páginas como
+    (pagina, bounds) y los mosaicos truncados como (bounds, total_reportado).
+    """
+    unicos, agregar = _acumulador_unicos(al_descubrir); mosaicos_hoja = 0; fallidas = []; truncados = []
+    ronda = [(bounds_iniciales, 0, 0)]; numero_ronda = 0  # (bounds, profundidad, intentos)
+    while ronda:
+        print(f"[Mosaicos] Ronda {numero_ronda}: {len(ronda)} mosaicos en paralelo...")
+        if numero_ronda == 0 and data_inicial:
+            primeras = {0: data_inicial}
+        else:
+            primeras = {}
+            procesar_en_paralelo(ronda, lambda _, mosaico: descargar_pagina_busqueda(cliente, ubicacion_formateada, tipo_listado, filter_state, termino_busqueda, 1, mosaico[0]),
+                                 trabajadores=trabajadores, al_completar=lambda i, data_next: primeras.__setitem__(i, data_next or {}))
+
+        siguiente_ronda = []; paginas_pendientes = []
+        for i, (bounds, profundidad, intentos) in enumerate(ronda):
+            data_next = primeras.get(i, {})
+            if not data_next:
+                if intentos < reintentos_mosaico:
+                    METRICAS.contar("busqueda.mosaicos_reintentados")
+                    siguiente_ronda.append((bounds, profundidad, intentos + 1))
+                else:
+                    fallidas.append((1, bounds))
+                continue
+            total_paginas, total_reportado = info_paginacion(data_next)
+            if total_reportado > tope_resultados:
+                if profundidad < profundidad_max:
+                    siguiente_ronda.extend((cuadrante, profundidad + 1, 0) for cuadrante in dividir_en_cuadrantes(bounds))
+                    continue
+                METRICAS.contar("busqueda.mosaicos_truncados")
+                print(f"ADVERTENCIA [Mosaicos]: El mosaico {bounds} sigue con {total_reportado} resultados en la profundidad máxima "
+                      f"({profundidad_max}); Zillow solo entrega los primeros {tope_resultados}.")
+                truncados.append((bounds, total_reportado))
+            mosaicos_hoja += 1
+            agregar(extraer_list_results(data_next))
+            paginas_pendientes.extend((pagina, bounds) for pagina in range(2, total_paginas + 1))
+
+        if paginas_pendientes:
+            _, no_descargadas = cosechar_paginas(cliente, ubicacion_formateada, tipo_listado, filter_state, termino_busqueda, paginas_pendientes, trabajadores,
+                                                 al_completar_pagina=agregar)
+            fallidas.extend(no_descargadas)
+        ronda = siguiente_ronda; numero_ronda += 1
+
+    print(f"[Mosaicos] Cobertura {'parcial' if fallidas or truncados else 'completa'}: {len(unicos)} listados únicos en {mosaicos_hoja} mosaicos.")
+    return unicos, mosaicos_hoja, fallidas, truncados
+
+
+def cosechar_busqueda_completa(cliente, data_primera_pagina, ubicacion_formateada, tipo_listado, filter_state, termino_busqueda,
+                               mosaicos=True, trabajadores=4, al_descubrir=None):
+    """
+    Elige la estrategia de cobertura: si Zillow reporta más resultados que el tope de una búsqueda
+    (y hay mapBounds disponibles) se usan mosaicos; si no, alcanza con paginar.
+    al_descubrir(nuevos) recibe los listados nuevos a medida que se descubren.
+    Devuelve (resultados_unicos_por_zpid, total_reportado, parcial); parcial=True si alguna página
+    o mosaico no se pudo descargar ni con reintentos (se listan en la salida) o si algún mosaico
+    quedó truncado por el tope de Zillow en la profundidad máxima.
+    """
+    if not data_primera_pagina:
+        METRICAS.contar("busqueda.cosechas_parciales")
+        print("ADVERTENCIA: Cosecha parcial, la primera página de la búsqueda no se pudo descargar.")
+        return [], 0, True
+    _, total_reportado = info_paginacion(data_primera_pagina)
+    bounds = obtener_map_bounds(data_primera_pagina)
+    if mosaicos and bounds and total_reportado > TOPE_RESULTADOS_ZILLOW:
+        print(f"Zillow reporta {total_reportado} resultados (tope por búsqueda: {TOPE_RESULTADOS_ZILLOW}). Dividiendo la región en mosaicos...")
+        unicos, _, fallidas, truncados = cosechar_por_mosaicos(cliente, bounds, ubicacion_formateada, tipo_listado, filter_state, termino_busqueda,
+                                                    tope_resultados=TOPE_RESULTADOS_ZILLOW, trabajadores=trabajadores, data_inicial=data_primera_pagina,
+                                                    al_descubrir=al_descubrir)
+        print(f"Cosecha {'parcial' if fallidas or truncados else 'completa'}: {len(unicos)} listados únicos de {total_reportado} reportados por Zillow.")
+    else:
+        truncados = []
+        unicos, total_reportado, fallidas = cosechar_todas_las_paginas(cliente, data_primera_pagina, ubicacion_formateada, tipo_listado, filter_state,
+                                                                       termino_busqueda, trabajadores, al_descubrir)
+    if fallidas or truncados: METRICAS.contar("busqueda.cosechas_parciales")
+    if truncados: print(f"ADVERTENCIA: Cosecha parcial, {len(truncados)} mosaicos quedaron truncados por el tope de Zillow en la profundidad máxima.")
+    if fallidas:
+        print(f"ADVERTENCIA: Cosecha parcial, {len(fallidas)} páginas no se pudieron descargar:")
+        for pagina in fallidas:
+            numero, bounds_pagina = pagina if isinstance(pagina, tuple) else (pagina, None)
+            print(f"  - Página {numero}" + (f" del mosaico {bounds_pagina}" if bounds_pagina else ""))
+    return unicos, total_reportado, bool(fallidas or truncados)
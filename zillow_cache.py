@@ -0,0 +1,96 @@
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+
+# --- Caché Persistente de Respuestas del Proxy ---
+# TTL en segundos por tipo de página: las búsquedas cambian rápido, los detalles mucho menos.
+TTL_POR_TIPO = {"busqueda": 6 * 3600, "detalle": 7 * 24 * 3600}
+MAX_BYTES_POR_DEFECTO = 500 * 1024 * 1024
+# Opciones de la clave: el nivel del proxy (residencial, render_js) no cambia la página de Zillow, así que no entra
+# en la clave. Una re-ejecución encuentra la página sin importar qué nivel la bajó (ni si fue Chrome o HTTP).
+OPCIONES_CACHE = {"country": "us"}
+
+
+def tipo_de_url(target_url):
+    return "detalle" if "/homedetails/" in target_url or "_zpid" in target_url else "busqueda"
+
+
+class CacheRespuestas:
+    """
+    Guarda en SQLite el HTML (comprimido con zlib) de las páginas descargadas vía ScrapeOps.
+    La clave es la URL de Zillow más las opciones del fetch (nunca la API key), así que cambiar
+    de key no invalida la caché. Cuando el total supera `max_bytes` se desalojan las entradas
+    menos usadas recientemente (LRU).
+    """
+
+    def __init__(self, ruta="zillow_cache.sqlite", max_bytes=MAX_BYTES_POR_DEFECTO, ttl_por_tipo=None):
+        self.ruta = ruta
+        self.max_bytes = max_bytes
+        self.ttl_por_tipo = dict(TTL_POR_TIPO, **(ttl_por_tipo or {}))
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=30)  # Los procesos de ejecutar_lote comparten la caché
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("""CREATE TABLE IF NOT EXISTS respuestas (
+            clave TEXT PRIMARY KEY, tipo TEXT, creado REAL, ultimo_acceso REAL, tamano INTEGER, cuerpo BLOB)""")
+        self._conexion.execute("CREATE INDEX IF NOT EXISTS idx_respuestas_acceso ON respuestas (ultimo_acceso)")
+        self._conexion.commit()
+
+    @staticmethod
+    def clave(target_url, opciones=None):
+        material = json.dumps({"url": target_url, "opciones": opciones or {}}, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def obtener(self, target_url, opciones=None, tipo=None):
+        """Devuelve el HTML guardado si existe y no venció su TTL; si no, None."""
+        tipo = tipo or tipo_de_url(target_url)
+        clave = self.clave(target_url, opciones)
+        ahora = time.time()
+        with self._lock:
+            fila = self._conexion.execute("SELECT creado, cuerpo FROM respuestas WHERE clave = ?", (clave,)).fetchone()
+            if fila is None or ahora - fila[0] > self.ttl_por_tipo.get(tipo, 0):
+                if fila is not None: self._conexion.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+                self._conexion.commit()
+                return None
+            self._conexion.execute("UPDATE respuestas SET ultimo_acceso = ? WHERE clave = ?", (ahora, clave))
+            self._conexion.commit()
+        return zlib.decompress(fila[1]).decode("utf-8")
+
+    def guardar(self, target_url, cuerpo, opciones=None, tipo=None):
+        if not cuerpo: return
+        tipo = tipo or tipo_de_url(target_url)
+        comprimido = zlib.compress(cuerpo.encode("utf-8"), 6)
+        ahora = time.time()
+        with self._lock:
+            self._conexion.execute("INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?, ?)",
+                                   (self.clave(target_url, opciones), tipo, ahora, ahora, len(comprimido), comprimido))
+            self._desalojar()
+            self._conexion.commit()
+
+    def _desalojar(self):
+        total = self._conexion.execute("SELECT COALESCE(SUM(tamano), 0) FROM respuestas").fetchone()[0]
+        if total <= self.max_bytes: return
+        for clave, tamano in self._conexion.execute("SELECT clave, tamano FROM respuestas ORDER BY ultimo_acceso").fetchall():
+            self._conexion.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+            total -= tamano
+            if total <= self.max_bytes: break
+
+    def cerrar(self):
+        with self._lock: self._conexion.close()
+
+
+def cache_desde_config(config):
+    """
+    Crea la caché a partir de la sección opcional "cache" de config.json, por ejemplo:
+    {"cache": {"ruta": "zillow_cache.sqlite", "max_mb": 500, "ttl_busqueda_s": 21600, "ttl_detalle_s": 604800}}
+    Con {"cache": {"activa": false}} se desactiva y devuelve None.
+    """
+    opciones = config.get("cache", {}) or {}
+    if not opciones.get("activa", True): return None
+    ttl = {}
+    if "ttl_busqueda_s" in opciones: ttl["busqueda"] = opciones["ttl_busqueda_s"]
+    if "ttl_detalle_s" in opciones: ttl["detalle"] = opciones["ttl_detalle_s"]
+    max_bytes = int(opciones.get("max_mb", MAX_BYTES_POR_DEFECTO // (1024 * 1024))) * 1024 * 1024
+    return CacheRespuestas(opciones.get("ruta", "zillow_cache.sqlite"), max_bytes=max_bytes, ttl_por_tipo=ttl)
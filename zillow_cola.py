@@ -0,0 +1,466 @@
+import sys
+import json
+import time
+import uuid
+import socket
+import hashlib
+import sqlite3
+import argparse
+import ipaddress
+import threading
+import requests
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from zillow_config import ConfiguracionIncompleta, cargar_config
+from zillow_busqueda import (TOPE_RESULTADOS_ZILLOW, construir_filter_state, descargar_pagina_busqueda, dividir_en_cuadrantes, extraer_list_results,
+                             filtrar_probables_duenos, info_paginacion, links_desde_resultados, obtener_map_bounds)
+from zillow_indice import zpid_de_link
+from zillow_metricas import METRICAS
+
+# --- Tareas ---
+# "busqueda": una página de resultados (región o mosaico del mapa); "detalle": un link de publicación.
+TIPOS_TAREA = ("busqueda", "detalle")
+ESTADOS_ACTIVOS = ("pendiente", "tomada")
+
+
+@dataclass
+class Tarea:
+    """Una unidad de trabajo prestada (lease): hay que confirmarla o liberarla con el mismo `token`."""
+    id: int
+    tipo: str
+    clave: str
+    carga: dict = field(default_factory=dict)
+    intentos: int = 0
+    token: str = ""
+
+
+def clave_busqueda(carga):
+    """Clave de deduplicación de una página de búsqueda: misma región, filtros, mosaico y página = misma tarea."""
+    campos = {k: carga.get(k) for k in ("ubicacion", "tipo_listado", "filter_state", "bounds", "pagina")}
+    return hashlib.sha1(json.dumps(campos, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def tarea_detalle(link):
+    """(clave, carga) de un link de detalle: la clave es el zpid, así el mismo listado no se encola dos veces."""
+    return zpid_de_link(link), {"url": link}
+
+
+def identificador_trabajador():
+    return f"{socket.gethostname()}:{threading.get_ident()}"
+
+
+# --- Interfaz de la Cola ---
+class ColaTrabajo(ABC):
+    """
+    Cola de trabajo compartida con préstamo y confirmación (lease/ack). tomar() presta tareas por
+    `visibilidad_s` segundos: si el trabajador no confirma ni libera a tiempo (ej. se cayó), la tarea vuelve
+    a estar disponible para otro. Tras `max_intentos` préstamos la tarea queda "fallida".
+    encolar() ignora las claves pendientes o prestadas (dedup por zpid en los detalles); las ya hechas o
+    fallidas vuelven a quedar pendientes, así una nueva siembra recorre otra vez la búsqueda.
+    Implementaciones: ColaSQLite (un archivo, por defecto) y ColaRemota (la misma cola servida por HTTP).
+    """
+
+    @abstractmethod
+    def encolar(self, tipo, tareas):
+        """tareas: [(clave, carga)]. Devuelve cuántas quedaron pendientes (nuevas o reabiertas)."""
+
+    @abstractmethod
+    def tomar(self, tipo, cantidad=1, trabajador=None, visibilidad_s=None):
+        """Presta hasta `cantidad` tareas visibles de `tipo` ([] si no hay)."""
+
+    @abstractmethod
+    def confirmar(self, tarea):
+        """Marca la tarea como hecha. False si el préstamo ya había vencido y otro trabajador la tomó."""
+
+    @abstractmethod
+    def liberar(self, tarea, error=None, demora_s=0.0):
+        """Devuelve la tarea a la cola (visible en `demora_s`), o la marca fallida si agotó los intentos."""
+
+    @abstractmethod
+    def extender(self, tarea, visibilidad_s=None):
+        """Renueva el préstamo de una tarea larga. False si ya se perdió."""
+
+    @abstractmethod
+    def estado(self):
+        """{tipo: {estado: cantidad}}."""
+
+    def cerrar(self):
+        pass
+
+    def activas(self, tipos=TIPOS_TAREA):
+        """Tareas pendientes o prestadas de esos tipos (0 = no queda nada por hacer)."""
+        estado = self.estado()
+        return sum(estado.get(tipo, {}).get(e, 0) for tipo in tipos for e in ESTADOS_ACTIVOS)
+
+
+# --- Implementación SQLite (por defecto) ---
+class ColaSQLite(ColaTrabajo):
+    """
+    La cola en un archivo SQLite (WAL): la comparten todos los procesos de una máquina, o de varias si el
+    archivo está en un volumen con bloqueos confiables. Para nodos en otras máquinas, servirla con
+    `python zillow_cola.py servir` y apuntarlos a la URL (ColaRemota).
+    """
+
+    def __init__(self, ruta="zillow_cola.sqlite", visibilidad_s=600, max_intentos=3):
+        self.ruta, self.visibilidad_s, self.max_intentos = ruta, visibilidad_s, max_intentos
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("""CREATE TABLE IF NOT EXISTS tareas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT NOT NULL, clave TEXT NOT NULL, carga TEXT NOT NULL,
+            estado TEXT NOT NULL DEFAULT 'pendiente', intentos INTEGER NOT NULL DEFAULT 0, visible_desde REAL NOT NULL,
+            token TEXT, trabajador TEXT, error TEXT, creada_en REAL, actualizada_en REAL, UNIQUE (tipo, clave))""")
+        self._conexion.execute("CREATE INDEX IF NOT EXISTS idx_tareas_disponibles ON tareas (tipo, estado, visible_desde)")
+
+    def encolar(self, tipo, tareas):
+        ahora = time.time()
+        filas = [(tipo, clave, json.dumps(carga), ahora, ahora, ahora) for clave, carga in tareas]
+        if not filas: return 0
+        with self._lock:
+            cursor = self._conexion.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            antes = self._conexion.total_changes
+            # Una tarea terminada (o fallida) se reabre: si no, volver a sembrar la misma ciudad no recorrería nada
+            cursor.executemany("INSERT INTO tareas (tipo, clave, carga, visible_desde, creada_en, actualizada_en) VALUES (?, ?, ?, ?, ?, ?) "
+                               "ON CONFLICT (tipo, clave) DO UPDATE SET estado = 'pendiente', carga = excluded.carga, intentos = 0, "
+                               "visible_desde = excluded.visible_desde, token = NULL, error = NULL, actualizada_en = excluded.actualizada_en "
+                               "WHERE estado IN ('hecha', 'fallida')", filas)
+            nuevas = self._conexion.total_changes - antes
+            cursor.execute("COMMIT")
+        METRICAS.contar(f"cola.{tipo}.encoladas", nuevas)
+        return nuevas
+
+    def tomar(self, tipo, cantidad=1, trabajador=None, visibilidad_s=None):
+        ahora, token = time.time(), uuid.uuid4().hex
+        with self._lock:
+            cursor = self._conexion.cursor()
+            cursor.execute("BEGIN IMMEDIATE")  # Toma el lock de escritura: dos trabajadores no pueden prestarse la misma tarea
+            try:
+                # Préstamos vencidos que ya agotaron sus intentos: el trabajador se cayó demasiadas veces con esta tarea
+                cursor.execute("UPDATE tareas SET estado = 'fallida', error = COALESCE(error, 'préstamo vencido'), actualizada_en = ? "
+                               "WHERE tipo = ? AND estado = 'tomada' AND visible_desde <= ? AND intentos >= ?", (ahora, tipo, ahora, self.max_intentos))
+                filas = cursor.execute("SELECT id, clave, carga, intentos FROM tareas WHERE tipo = ? AND estado IN ('pendiente', 'tomada') "
+                                       "AND visible_desde <= ? ORDER BY id LIMIT ?", (tipo, ahora, cantidad)).fetchall()
+                cursor.executemany("UPDATE tareas SET estado = 'tomada', token = ?, trabajador = ?, intentos = intentos + 1, visible_desde = ?, "
+                                   "actualizada_en = ? WHERE id = ?",
+                                   [(token, trabajador or identificador_trabajador(), ahora + (visibilidad_s or self.visibilidad_s), ahora, fila[0]) for fila in filas])
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        METRICAS.contar(f"cola.{tipo}.tomadas", len(filas))
+        return [Tarea(id, tipo, clave, json.loads(carga), intentos + 1, token) for id, clave, carga, intentos in filas]
+
+    def _actualizar_prestada(self, tarea, asignaciones, parametros):
+        with self._lock:
+            cursor = self._conexion.execute(f"UPDATE tareas SET {asignaciones}, actualizada_en = ? WHERE id = ? AND token = ? AND estado = 'tomada'",
+                                            (*parametros, time.time(), tarea.id, tarea.token))
+            return cursor.rowcount == 1
+
+    def confirmar(self, tarea):
+        confirmada = self._actualizar_prestada(tarea, "estado = 'hecha', error = NULL", ())
+        METRICAS.contar(f"cola.{tarea.tipo}.{'confirmadas' if confirmada else 'prestamos_perdidos'}")
+        return confirmada
+
+    def liberar(self, tarea, error=None, demora_s=0.0):
+        agotada = tarea.intentos >= self.max_intentos
+        METRICAS.contar(f"cola.{tarea.tipo}.{'fallidas' if agotada else 'liberadas'}")
+        return self._actualizar_prestada(tarea, "estado = ?, error = ?, visible_desde = ?",
+                                         ("fallida" if agotada else "pendiente", error, time.time() + demora_s))
+
+    def extender(self, tarea, visibilidad_s=None):
+        return self._actualizar_prestada(tarea, "visible_desde = ?", (time.time() + (visibilidad_s or self.visibilidad_s),))
+
+    def estado(self):
+        with self._lock: filas = self._conexion.execute("SELECT tipo, estado, COUNT(*) FROM tareas GROUP BY tipo, estado").fetchall()
+        resultado = {}
+        for tipo, estado, cantidad in filas: resultado.setdefault(tipo, {})[estado] = cantidad
+        return resultado
+
+    def fallidas(self, limite=50):
+        """Las últimas tareas fallidas con su error, para revisar a mano."""
+        with self._lock:
+            return self._conexion.execute("SELECT tipo, clave, intentos, error FROM tareas WHERE estado = 'fallida' ORDER BY actualizada_en DESC LIMIT ?",
+                                          (limite,)).fetchall()
+
+    def cerrar(self):
+        with self._lock: self._conexion.close()
+
+
+# --- Broker por Red ---
+METODOS_REMOTOS = ("encolar", "tomar", "confirmar", "liberar", "extender", "estado")
+
+
+class _ManejadorCola(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        metodo = self.path.strip("/")
+        if metodo not in METODOS_REMOTOS: return self._responder(404, {"error": f"método desconocido: {metodo}"})
+        if self.server.token and self.headers.get("X-Token") != self.server.token: return self._responder(403, {"error": "token inválido"})
+        try:
+            argumentos = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if "tarea" in argumentos: argumentos["tarea"] = Tarea(**argumentos["tarea"])
+            resultado = getattr(self.server.cola, metodo)(**argumentos)
+            if metodo == "tomar": resultado = [asdict(tarea) for tarea in resultado]
+            self._responder(200, {"resultado": resultado})
+        except Exception as e:
+            self._responder(500, {"error": str(e)})
+
+    def _responder(self, status, cuerpo):
+        datos = json.dumps(cuerpo).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, *args):
+        pass
+
+
+def es_loopback(host):
+    """True si `host` solo es alcanzable desde esta máquina (127.0.0.0/8, ::1 o localhost)."""
+    try: return ipaddress.ip_address(host).is_loopback
+    except ValueError: pass  # Un nombre: se resuelve
+    try: return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError): return False
+
+
+def servir_cola(cola, host="127.0.0.1", puerto=8765, token=None):
+    """
+    Expone una cola (normalmente ColaSQLite) por HTTP para trabajadores de otras máquinas. Bloquea hasta Ctrl+C.
+    Escuchar fuera de loopback (ej. host="0.0.0.0") exige un token: sin él cualquiera en la red podría vaciarla.
+    """
+    if not token and not es_loopback(host):
+        raise ValueError(f"Servir la cola en '{host}' sin token la expone a toda la red. Se necesita --token (o --host 127.0.0.1).")
+    servidor = ThreadingHTTPServer((host, puerto), _ManejadorCola)
+    servidor.daemon_threads = True
+    servidor.cola, servidor.token = cola, token
+    print(f"Cola servida en http://{host}:{puerto}/ ({getattr(cola, 'ruta', type(cola).__name__)}). Ctrl+C para detener.")
+    try: servidor.serve_forever()
+    except KeyboardInterrupt: pass
+    finally: servidor.server_close()
+
+
+class ColaRemota(ColaTrabajo):
+    """Cliente de una cola servida con servir_cola(): misma interfaz que ColaSQLite, vía HTTP keep-alive."""
+
+    def __init__(self, url, token=None, timeout=30):
+        self.url, self.timeout = url.rstrip("/"), timeout
+        self.sesion = requests.Session()
+        if token: self.sesion.headers["X-Token"] = token
+
+    def _llamar(self, metodo, **argumentos):
+        respuesta = self.sesion.post(f"{self.url}/{metodo}", json=argumentos, timeout=self.timeout)
+        cuerpo = respuesta.json()
+        if respuesta.status_code != 200: raise RuntimeError(f"Cola remota ({metodo}): {cuerpo.get('error', respuesta.status_code)}")
+        return cuerpo["resultado"]
+
+    def encolar(self, tipo, tareas):
+        return self._llamar("encolar", tipo=tipo, tareas=[list(t) for t in tareas])
+
+    def tomar(self, tipo, cantidad=1, trabajador=None, visibilidad_s=None):
+        tareas = self._llamar("tomar", tipo=tipo, cantidad=cantidad, trabajador=trabajador or identificador_trabajador(), visibilidad_s=visibilidad_s)
+        return [Tarea(**tarea) for tarea in tareas]
+
+    def confirmar(self, tarea):
+        return self._llamar("confirmar", tarea=asdict(tarea))
+
+    def liberar(self, tarea, error=None, demora_s=0.0):
+        return self._llamar("liberar", tarea=asdict(tarea), error=error, demora_s=demora_s)
+
+    def extender(self, tarea, visibilidad_s=None):
+        return self._llamar("extender", tarea=asdict(tarea), visibilidad_s=visibilidad_s)
+
+    def estado(self):
+        return self._llamar("estado")
+
+    def cerrar(self):
+        self.sesion.close()
+
+
+def abrir_cola(destino="zillow_cola.sqlite", token=None, **opciones):
+    """Una URL http(s):// abre la cola remota; cualquier otra cosa es la ruta del archivo SQLite."""
+    if destino.startswith(("http://", "https://")): return ColaRemota(destino, token=token)
+    return ColaSQLite(destino, **opciones)
+
+
+def cola_desde_config(config):
+    """
+    Lee la sección opcional "cola" de config.json, ej.
+    {"cola": {"destino": "zillow_cola.sqlite", "visibilidad_s": 600, "max_intentos": 3, "token": null}}.
+    """
+    opciones = config.get("cola", {}) or {}
+    destino = opciones.get("destino", "zillow_cola.sqlite")
+    if destino.startswith(("http://", "https://")): return ColaRemota(destino, token=opciones.get("token"))
+    return ColaSQLite(destino, visibilidad_s=opciones.get("visibilidad_s", 600), max_intentos=opciones.get("max_intentos", 3))
+
+
+# --- Trabajadores ---
+def sembrar_busqueda(cola, ciudad_estado, tipo_listado="rentals", sort_by_newest=True, min_price=None, max_price=None, days_on_zillow=None, solo_duenos=True):
+    """Encola la primera página de la búsqueda completa; los trabajadores del crawler la dividen en mosaicos y páginas."""
+    import Zillow_Crawler as crawler
+    carga = {"ubicacion": crawler.formatear_ubicacion_zillow(ciudad_estado), "termino": ciudad_estado, "tipo_listado": tipo_listado,
+             "filter_state": construir_filter_state(tipo_listado, sort_by_newest, min_price, max_price, days_on_zillow),
+             "bounds": None, "pagina": 1, "profundidad": 0, "solo_duenos": solo_duenos}
+    nuevas = cola.encolar("busqueda", [(clave_busqueda(carga), carga)])
+    print(f"Búsqueda de {ciudad_estado} ({tipo_listado}) {'encolada' if nuevas else 'ya estaba en la cola'}.")
+    return nuevas
+
+
+def procesar_tarea_busqueda(cola, cliente, tarea, profundidad_max=6, indice=None):
+    """
+    Descarga una página de búsqueda. La primera página de un mosaico decide: si supera el tope de Zillow se
+    encolan sus 4 cuadrantes; si no, se encolan sus páginas 2..N. Los listados de la página se encolan como detalles.
+    Un mosaico que sigue sobre el tope en `profundidad_max` se pagina igual y se avisa que Zillow lo trunca.
+    """
+    carga = tarea.carga
+    data_next = descargar_pagina_busqueda(cliente, carga["ubicacion"], carga["tipo_listado"], carga["filter_state"], carga["termino"],
+                                          carga["pagina"], carga["bounds"])
+    if not data_next: raise RuntimeError("no se pudo descargar la página de búsqueda")
+    if carga["pagina"] == 1:
+        total_paginas, total_reportado = info_paginacion(data_next)
+        bounds = carga["bounds"] or obtener_map_bounds(data_next)
+        if total_reportado > TOPE_RESULTADOS_ZILLOW and bounds and carga["profundidad"] < profundidad_max:
+            hijos = [{**carga, "bounds": cuadrante, "profundidad": carga["profundidad"] + 1} for cuadrante in dividir_en_cuadrantes(bounds)]
+            cola.encolar("busqueda", [(clave_busqueda(hijo), hijo) for hijo in hijos])
+            print(f"  [Cola] {total_reportado} resultados superan el tope: 4 mosaicos encolados (profundidad {carga['profundidad'] + 1}).")
+            return 0
+        if total_reportado > TOPE_RESULTADOS_ZILLOW and carga["profundidad"] >= profundidad_max:
+            METRICAS.contar("busqueda.mosaicos_truncados")
+            print(f"  [Cola] ADVERTENCIA: El mosaico {bounds} sigue con {total_reportado} resultados en la profundidad máxima "
+                  f"({profundidad_max}); Zillow solo entrega los primeros {TOPE_RESULTADOS_ZILLOW}.")
+        paginas = [{**carga, "pagina": pagina} for pagina in range(2, total_paginas + 1)]
+        if paginas: cola.encolar("busqueda", [(clave_busqueda(pagina), pagina) for pagina in paginas])
+    list_results = extraer_list_results(data_next)
+    if indice: indice.registrar_resultados(list_results)
+    if carga.get("solo_duenos", True): list_results = filtrar_probables_duenos(list_results)
+    nuevas = cola.encolar("detalle", [tarea_detalle(link) for link in links_desde_resultados(list_results)])
+    print(f"  [Cola] Página {carga['pagina']}: {len(list_results)} listados, {nuevas} detalles nuevos encolados.")
+    return nuevas
+
+
+def _bucle_trabajador(cola, tipo, procesar, tipos_pendientes, seguir=False, al_vaciarse=None, espera_s=2.0, demora_error_s=30.0):
+    """
+    Toma tareas de a una hasta que no quede nada activo en `tipos_pendientes` (o para siempre con `seguir`).
+    al_vaciarse() se llama cada vez que no hay tareas visibles (ej. para volcar el lote de salidas y confirmar lo prestado).
+    """
+    procesadas = 0
+    while True:
+        tareas = cola.tomar(tipo, 1)
+        if not tareas:
+            if al_vaciarse: al_vaciarse()
+            if not seguir and cola.activas(tipos_pendientes) == 0: return procesadas
+            time.sleep(espera_s)  # Otro nodo todavía tiene tareas prestadas (o el crawler sigue encolando)
+            continue
+        tarea = tareas[0]
+        try:
+            with METRICAS.etapa(f"cola.{tipo}"): procesar(tarea)
+            procesadas += 1
+        except Exception as e:
+            print(f"    ERROR [Cola]: Falló la tarea {tipo} {tarea.clave} (intento {tarea.intentos}): {e}")
+            cola.liberar(tarea, str(e), demora_s=demora_error_s)
+
+
+def trabajador_crawler(cola, trabajadores=4, seguir=False):
+    """Procesa páginas de búsqueda por HTTP con `trabajadores` hilos; termina cuando no quedan búsquedas activas."""
+    import Zillow_Crawler as crawler
+    from zillow_http import ClienteHTTP
+
+    crawler.inicializar()
+    with ClienteHTTP(crawler.API_KEY, endpoint=crawler.SCRAPEOPS_ENDPOINT, cache=crawler.CACHE_RESPUESTAS, limitador=crawler.RITMO,
+                     **crawler.OPCIONES_PROXY) as cliente:
+        def procesar(tarea):
+            procesar_tarea_busqueda(cola, cliente, tarea, indice=crawler.INDICE_LISTADOS)
+            cola.confirmar(tarea)
+        hilos = [threading.Thread(target=_bucle_trabajador, args=(cola, "busqueda", procesar, ("busqueda",), seguir), name=f"crawler-cola-{i}")
+                 for i in range(max(1, trabajadores))]
+        for hilo in hilos: hilo.start()
+        for hilo in hilos: hilo.join()
+    print(f"Trabajador del crawler terminado. Cola: {cola.estado()}")
+
+
+def trabajador_scraper(cola, archivo_csv_salida, motor="http", trabajadores=4, seguir=False, solo_pendientes=True):
+    """
+    Procesa detalles con el motor elegido y `trabajadores` hilos. Cada detalle se confirma recién cuando su
+    fila llegó a todas las salidas; los que no son de dueños se confirman al terminar. Termina cuando no
+    quedan búsquedas ni detalles activos en la cola. Cada nodo escribe sus propias salidas (CSV, SQLite o Parquet).
+    solo_pendientes: con el índice de listados activo, confirma sin scrapear los links cuyo precio y estado no cambiaron.
+    """
+    import Zillow_Scraper as scraper
+    from zillow_salidas import abrir_salidas
+
+    scraper.inicializar()
+    procesar_link, cerrar_motor = scraper.preparar_motor(motor, trabajadores)
+    salidas = abrir_salidas(archivo_csv_salida, True, scraper.OPCIONES_SALIDAS)  # Agrega: varios turnos del nodo comparten el archivo
+
+    def procesar(tarea):
+        link = tarea.carga["url"]
+        print(f"\n[Cola] Procesando URL: {link} (intento {tarea.intentos})")
+        if solo_pendientes and scraper.INDICE_LISTADOS and not scraper.INDICE_LISTADOS.filtrar_pendientes([link]):
+            print("  -> Sin cambios desde el último scrapeo (índice de listados); se omite.")
+            METRICAS.contar("cola.detalle.sin_cambios")
+            cola.confirmar(tarea); return
+        detalle = scraper.scrapear_link(procesar_link, link)
+        if detalle is None: scraper.marcar_en_indice(link); cola.confirmar(tarea); return  # Descartado: no hay fila que esperar
+        salidas.escribir(detalle, al_confirmar=lambda: (scraper.marcar_en_indice(link), cola.confirmar(tarea)))
+        print(f"  -> Datos guardados para '{detalle.owner_name or 'Dueño Desconocido'}'.")
+
+    hilos = [threading.Thread(target=_bucle_trabajador, args=(cola, "detalle", procesar, TIPOS_TAREA, seguir, salidas.confirmar), name=f"scraper-cola-{i}")
+             for i in range(max(1, trabajadores))]
+    try:
+        for hilo in hilos: hilo.start()
+        for hilo in hilos: hilo.join()
+    finally:
+        cerrar_motor()
+        salidas.cerrar()
+    print(f"Trabajador del scraper terminado. Cola: {cola.estado()}")
+    METRICAS.imprimir_tabla()
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Cola de trabajo compartida: varios nodos de crawler y scraper drenan la misma búsqueda.")
+    parser.add_argument("--cola", help='Archivo SQLite de la cola o URL de una cola servida (http://host:8765). Por defecto, la sección "cola" de config.json.')
+    parser.add_argument("--token", help="Secreto compartido de la cola servida por red.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sembrar = sub.add_parser("sembrar", help="Encola la búsqueda de una o más ciudades.")
+    sembrar.add_argument("--ciudad", action="append", required=True, help='Ciudad y estado, ej. "Stamford, CT". Se puede repetir.')
+    sembrar.add_argument("--tipo", default="rentals", choices=["rentals", "for_sale"])
+    sembrar.add_argument("--min-price", type=int)
+    sembrar.add_argument("--max-price", type=int)
+    sembrar.add_argument("--sin-orden-nuevos", action="store_true")
+    for nombre, ayuda in (("crawler", "Procesa páginas de búsqueda (HTTP) y encola los detalles."), ("scraper", "Procesa los detalles encolados.")):
+        trabajador = sub.add_parser(nombre, help=ayuda)
+        trabajador.add_argument("--trabajadores", type=int, default=4)
+        trabajador.add_argument("--seguir", action="store_true", help="No terminar cuando la cola se vacía: esperar trabajo nuevo.")
+        if nombre == "scraper":
+            trabajador.add_argument("--motor", default="http", choices=["http", "selenium"])
+            trabajador.add_argument("--salida", default=f"Zillow_Owner_Listings_{socket.gethostname()}.csv", help="CSV de este nodo.")
+    servir = sub.add_parser("servir", help="Sirve la cola SQLite por HTTP para nodos de otras máquinas.")
+    servir.add_argument("--host", default="127.0.0.1", help="Interfaz donde escuchar (ej. 0.0.0.0 para otras máquinas; requiere --token).")
+    servir.add_argument("--puerto", type=int, default=8765)
+    sub.add_parser("estado", help="Muestra cuántas tareas hay en cada estado (y las últimas fallidas).")
+    return parser
+
+
+if __name__ == "__main__":
+    args = crear_parser().parse_args()
+    cola = abrir_cola(args.cola, token=args.token) if args.cola else cola_desde_config(cargar_config())
+    try:
+        if args.comando == "sembrar":
+            for ciudad in args.ciudad:
+                sembrar_busqueda(cola, ciudad, args.tipo, not args.sin_orden_nuevos, args.min_price, args.max_price)
+        elif args.comando == "crawler": trabajador_crawler(cola, args.trabajadores, args.seguir)
+        elif args.comando == "scraper": trabajador_scraper(cola, args.salida, args.motor, args.trabajadores, args.seguir)
+        elif args.comando == "servir": servir_cola(cola, args.host, args.puerto, args.token)
+        elif args.comando == "estado":
+            print(json.dumps(cola.estado(), indent=4, ensure_ascii=False))
+            for tipo, clave, intentos, error in (cola.fallidas(10) if isinstance(cola, ColaSQLite) else []):
+                print(f"  fallida: {tipo} {clave} ({intentos} intentos): {error}")
+    except (ConfiguracionIncompleta, ValueError) as e:
+        print(f"Error crítico: {e} El script se detendrá."); sys.exit(1)
+    finally:
+        cola.cerrar()
+    sys.exit(0)
@@ -0,0 +1,59 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+# --- Escritura Ordenada ---
+class EscritorOrdenado:
+    """
+    Recibe resultados fuera de orden (índice, fila) y los entrega a `escribir` en el
+    orden original de los links. Las filas None se consumen sin escribirse.
+    al_consumir(indice, fila), si se pasa, se llama después de consumir cada índice (escrito o no).
+    Si escribir falla, el error se informa y se sigue con el índice siguiente.
+    """
+
+    def __init__(self, escribir, al_consumir=None):
+        self.escribir = escribir
+        self.al_consumir = al_consumir
+        self._pendientes = {}
+        self._siguiente = 0
+        self._lock = threading.Lock()
+
+    def entregar(self, indice, fila):
+        with self._lock:
+            self._pendientes[indice] = fila
+            while self._siguiente in self._pendientes:
+                fila_lista = self._pendientes.pop(self._siguiente)
+                try:
+                    if fila_lista is not None: self.escribir(fila_lista)
+                    if self.al_consumir: self.al_consumir(self._siguiente, fila_lista)
+                except Exception as e:  # Un error al escribir no debe trabar a las filas siguientes ni abortar la corrida
+                    print(f"    ERROR: No se pudo escribir el item {self._siguiente + 1}: {e}")
+                finally:
+                    self._siguiente += 1
+
+
+# --- Pool de Trabajadores ---
+def procesar_en_paralelo(items, funcion, trabajadores=4, al_completar=None):
+    """
+    Ejecuta funcion(indice, item) sobre cada item con un pool de hilos acotado.
+    al_completar(indice, resultado) se llama desde el hilo principal a medida que terminan.
+    Un error en un item se reporta y se entrega como resultado None.
+    Con un solo trabajador se procesa en el hilo actual (mismo orden, y visible para cProfile).
+    """
+    if trabajadores <= 1:
+        for indice, item in enumerate(items):
+            try: resultado = funcion(indice, item)
+            except Exception as e:
+                print(f"    ERROR: Falló el item {indice + 1}: {e}")
+                resultado = None
+            if al_completar: al_completar(indice, resultado)
+        return
+    with ThreadPoolExecutor(max_workers=max(1, trabajadores)) as pool:
+        futuros = {pool.submit(funcion, i, item): i for i, item in enumerate(items)}
+        for futuro in as_completed(futuros):
+            indice = futuros[futuro]
+            try: resultado = futuro.result()
+            except Exception as e:
+                print(f"    ERROR: Falló el item {indice + 1}: {e}")
+                resultado = None
+            if al_completar: al_completar(indice, resultado)
@@ -0,0 +1,55 @@
+import os
+import json
+import threading
+from functools import wraps
+
+# --- Carga Perezosa de config.json ---
+# Importar los scripts no lee nada ni termina el proceso: cada uno llama a su inicializar() la primera vez
+# que hace falta la configuración, así los procesos de un pool arrancan en milisegundos.
+RUTA_CONFIG = "config.json"
+
+
+class ConfiguracionIncompleta(RuntimeError):
+    """Falta la api_key de ScrapeOps (o el config.json entero)."""
+
+
+def ruta_config():
+    """config.json del directorio actual, o el que indique la variable de entorno ZILLOW_CONFIG."""
+    return os.environ.get("ZILLOW_CONFIG") or RUTA_CONFIG
+
+
+def cargar_config(ruta=None):
+    """Lee config.json; {} (con una advertencia) si no existe."""
+    ruta = ruta or ruta_config()
+    try:
+        with open(ruta, "r") as config_file: return json.load(config_file)
+    except FileNotFoundError:
+        print(f"Advertencia: El archivo {ruta} no fue encontrado.")
+        return {}
+
+
+def api_key_desde_config(config):
+    """La api_key de ScrapeOps; lanza ConfiguracionIncompleta si falta o está vacía."""
+    api_key = config.get("api_key", "")
+    if not api_key: raise ConfiguracionIncompleta("API_KEY de ScrapeOps no está configurada ('api_key' en config.json).")
+    return api_key
+
+
+def una_sola_vez(cargar):
+    """
+    Decorador del inicializar() de cada script: cargar(config) corre una sola vez por proceso aunque lo llamen
+    varios hilos a la vez. Sin `config` se lee config.json. Si cargar() lanza (ej. ConfiguracionIncompleta),
+    la próxima llamada lo vuelve a intentar.
+    """
+    lock = threading.Lock()
+    listo = False
+
+    @wraps(cargar)
+    def inicializar(config=None):
+        nonlocal listo
+        if listo: return
+        with lock:
+            if listo: return
+            cargar(cargar_config() if config is None else config)
+            listo = True
+    return inicializar
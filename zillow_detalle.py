@@ -0,0 +1,157 @@
+from dataclasses import dataclass
+from bs4 import BeautifulSoup
+from zillow_metricas import METRICAS
+from zillow_busqueda import cargar_json
+from zillow_http import PaginaIncompleta
+
+# --- Selectores y Formato de Salida Compartidos por Ambos Motores ---
+MARCADOR_DUENO = "Listed by property owner"
+SELECTOR_ANUNCIANTE = 'div.ds-listing-agent-header, [data-testid^="attribution"], .ds-listing-agent-business-name'
+# Se evalúa en el navegador: "dueno" / "otro" en cuanto la página lo permite decidir, "bloqueo" si es
+# la página de captcha en lugar del listado, "incompleta" si terminó de cargar sin anunciante ni JSON del
+# listado (ej. un nivel del proxy sin render de JS), o null si todavía no.
+JS_ESTADO_PUBLICACION = """
+if (document.querySelector('#px-captcha') || /Access to this page has been denied/i.test(document.title)) return 'bloqueo';
+const headers = Array.from(document.querySelectorAll('div.ds-listing-agent-header'));
+if (headers.some(h => h.textContent.trim() === 'Listed by property owner')) return 'dueno';
+if (headers.length || document.querySelector('[data-testid^="attribution"], .ds-listing-agent-business-name')) return 'otro';
+if (document.readyState === 'complete') {
+  const nextData = document.getElementById('__NEXT_DATA__');
+  return nextData && nextData.textContent.includes('gdpClientCache') ? 'otro' : 'incompleta';
+}
+return null;
+"""
+
+COLUMNAS_CSV = ["Adress", "", "", "url link", "phone number", "", "property owner name", "", "date", "", "", "price"]
+
+
+# Tabla declarativa de selectores: campo -> selectores CSS en orden de prioridad (el primero con texto gana).
+# La usan tanto el extractor del navegador (un solo execute_script) como el de BeautifulSoup.
+TABLA_SELECTORES = {
+    "address": ['div[class^="styles__AddressWrapper-"] h1'],
+    "owner_name": ["span.ds-listing-agent-display-name"],
+    "phone_number": ["li.ds-listing-agent-info-text"],
+    "publication_date": ['tbody tr:first-child span[data-testid="date-info"]'],
+    "price": ['span[data-testid="price"]',
+              'tbody tr:first-child td[data-testid="price-money-cell"] span[class*="StyledPriceText"]'],
+}
+
+# Recibe la tabla como argumento y devuelve {campo: texto} en un único viaje al navegador.
+JS_EXTRAER_CAMPOS = """
+const tabla = arguments[0]; const campos = {};
+for (const [campo, selectores] of Object.entries(tabla)) {
+  campos[campo] = '';
+  for (const selector of selectores) {
+    const elemento = document.querySelector(selector);
+    const texto = elemento ? (elemento.innerText || elemento.textContent || '').trim() : '';
+    if (texto) { campos[campo] = texto; break; }
+  }
+}
+return campos;
+"""
+
+
+def construir_fila_csv(address, link, phone_number, owner_name, publication_date, price):
+    """Fila del CSV final. Las columnas vacías se mantienen por compatibilidad con el reporte."""
+    return [address, "", "", link, phone_number, "", owner_name, "", publication_date, "", "", price]
+
+
+def limpiar_precio(texto_precio):
+    """Convierte '$3,399/mo' en '$3,399'."""
+    if not texto_precio: return ""
+    return texto_precio.split("/mo")[0].strip()
+
+
+@dataclass
+class DetallePropiedad:
+    """Registro tipado de una publicación de dueño, independiente del motor que la extrajo."""
+    url: str
+    address: str = ""
+    owner_name: str = ""
+    phone_number: str = ""
+    publication_date: str = ""
+    price: str = ""
+
+    @classmethod
+    def desde_campos(cls, link, campos):
+        """Construye el registro a partir del dict {campo: texto} de la tabla de selectores."""
+        detalle = cls(url=link, **{campo: (campos.get(campo) or "").strip() for campo in TABLA_SELECTORES})
+        detalle.price = limpiar_precio(detalle.price)
+        return detalle
+
+    def campos_faltantes(self):
+        return [campo for campo in TABLA_SELECTORES if not getattr(self, campo)]
+
+    def a_fila_csv(self):
+        return construir_fila_csv(self.address, self.url, self.phone_number, self.owner_name, self.publication_date, self.price)
+
+
+# --- Extractor JSON (gdpClientCache dentro de __NEXT_DATA__) ---
+def extraer_propiedad_json(soup):
+    """Devuelve el dict 'property' embebido en la página de detalle, o {} si no existe."""
+    script = soup.find("script", id="__NEXT_DATA__")
+    if not script or not script.string: return {}
+    try:
+        data_next = cargar_json(str(script.string))  # orjson no acepta subclases de str (NavigableString)
+        cache = data_next.get("props", {}).get("pageProps", {}).get("componentProps", {}).get("gdpClientCache")
+        if isinstance(cache, str): cache = cargar_json(cache)
+        for valor in (cache or {}).values():
+            if isinstance(valor, dict) and isinstance(valor.get("property"), dict):
+                return valor["property"]
+    except (ValueError, AttributeError) as e:
+        print(f"    - No se pudo parsear el JSON embebido: {e}")
+    return {}
+
+
+def _es_dueno_segun_json(propiedad):
+    sub_tipo = propiedad.get("listingSubType") or {}
+    return bool(sub_tipo.get("isFSBO") or sub_tipo.get("isFRBO") or sub_tipo.get("is_FRBO"))
+
+
+def _direccion_desde_json(propiedad):
+    partes = [propiedad.get("streetAddress"), propiedad.get("city")]
+    estado_zip = " ".join(p for p in [propiedad.get("state"), propiedad.get("zipcode")] if p)
+    return ", ".join(p for p in partes + [estado_zip] if p)
+
+
+# --- Extractor HTML ---
+def extraer_campos_html(soup):
+    """Aplica la tabla de selectores sobre el HTML parseado."""
+    campos = {}
+    for campo, selectores in TABLA_SELECTORES.items():
+        campos[campo] = ""
+        for selector in selectores:
+            elemento = soup.select_one(selector)
+            texto = elemento.get_text(strip=True) if elemento else ""
+            if texto: campos[campo] = texto; break
+    return campos
+
+
+def es_publicacion_de_dueno(soup, propiedad=None):
+    for header in soup.select("div.ds-listing-agent-header"):
+        if header.get_text(strip=True) == MARCADOR_DUENO: return True
+    return _es_dueno_segun_json(propiedad or {})
+
+
+@METRICAS.medir("detalle.parseo_html")
+def extraer_detalle_de_html(html, link, exigir_completa=False):
+    """
+    Parsea el HTML de una página de detalle y devuelve el mismo DetallePropiedad que el motor Selenium,
+    completando con el JSON embebido los campos que el DOM no trae.
+    Devuelve None si la propiedad no es publicada por el dueño. Con exigir_completa, una página sin el JSON
+    ni el bloque del anunciante (ej. servida sin render de JS) lanza PaginaIncompleta en lugar de darse por "otro".
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    propiedad = extraer_propiedad_json(soup)
+    if exigir_completa and not propiedad and not soup.select_one(SELECTOR_ANUNCIANTE):
+        raise PaginaIncompleta("sin datos del listado ni del anunciante")
+    if not es_publicacion_de_dueno(soup, propiedad): return None
+
+    detalle = DetallePropiedad.desde_campos(link, extraer_campos_html(soup))
+    atribucion = propiedad.get("attributionInfo") or {}
+    detalle.address = detalle.address or _direccion_desde_json(propiedad)
+    detalle.owner_name = detalle.owner_name or atribucion.get("agentName") or ""
+    detalle.phone_number = detalle.phone_number or atribucion.get("agentPhoneNumber") or ""
+    if not detalle.price and propiedad.get("price"):
+        detalle.price = f"${propiedad['price']:,}" if isinstance(propiedad["price"], (int, float)) else str(propiedad["price"])
+    return detalle
@@ -0,0 +1,79 @@
+import os
+import csv
+import json
+import time
+import threading
+from zillow_detalle import COLUMNAS_CSV
+
+# --- Diario de Progreso (checkpoint / reanudar) ---
+# Estados finales de un link: "guardado" (fila en el CSV), "descartado" (no es de dueño) o "error" (se reintenta al reanudar).
+ESTADOS_TERMINADOS = ("guardado", "descartado")
+INDICE_COLUMNA_URL = COLUMNAS_CSV.index("url link")
+
+
+def ruta_diario(archivo_csv_salida):
+    return f"{archivo_csv_salida}.journal.jsonl"
+
+
+class DiarioScrapeo:
+    """
+    Archivo JSONL junto al CSV con una línea por link procesado. Cada línea se escribe y se
+    sincroniza a disco (flush + fsync) apenas se resuelve el link, así que tras una caída el
+    diario refleja exactamente el trabajo terminado. Si un link aparece varias veces gana la última línea.
+    """
+
+    def __init__(self, ruta, reanudar=False):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._estados = {}
+        if reanudar and os.path.exists(ruta):
+            with open(ruta, "r", encoding="utf-8") as f:
+                for linea in f:
+                    try: registro = json.loads(linea)
+                    except ValueError: continue  # Última línea a medio escribir durante la caída
+                    self._estados[registro.get("url")] = registro.get("estado")
+        self._archivo = open(ruta, "a" if reanudar else "w", encoding="utf-8")
+
+    def terminados(self):
+        return {url for url, estado in self._estados.items() if estado in ESTADOS_TERMINADOS}
+
+    def registrar(self, link, estado, error=None):
+        registro = {"url": link, "estado": estado, "ts": round(time.time(), 3)}
+        if error: registro["error"] = error
+        with self._lock:
+            self._estados[link] = estado
+            self._archivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            self._archivo.flush()
+            os.fsync(self._archivo.fileno())
+
+    def resumen(self):
+        conteo = {}
+        for estado in self._estados.values(): conteo[estado] = conteo.get(estado, 0) + 1
+        return conteo
+
+    def cerrar(self):
+        with self._lock: self._archivo.close()
+
+
+def urls_en_csv(archivo_csv_salida):
+    """URLs que ya tienen fila en el CSV (cubre una caída entre escribir la fila y anotarla en el diario)."""
+    if not os.path.exists(archivo_csv_salida): return set()
+    with open(archivo_csv_salida, "r", newline="", encoding="utf-8") as f_csv:
+        return {fila[INDICE_COLUMNA_URL] for fila in csv.reader(f_csv) if len(fila) > INDICE_COLUMNA_URL} - {"url link"}
+
+
+def abrir_csv_salida(archivo_csv_salida, reanudar=False):
+    """Abre el CSV: en modo reanudar agrega al final (sin repetir el encabezado); si no, lo crea de cero."""
+    agregar = reanudar and os.path.exists(archivo_csv_salida) and os.path.getsize(archivo_csv_salida) > 0
+    f_csv = open(archivo_csv_salida, "a" if agregar else "w", newline="", encoding="utf-8")
+    writer = csv.writer(f_csv)
+    if not agregar: writer.writerow(COLUMNAS_CSV)
+    return f_csv, writer
+
+
+def preparar_reanudacion(archivo_csv_salida, reanudar=False):
+    """Devuelve (diario, ya_terminados). Sin reanudar, el diario empieza vacío y no se omite nada."""
+    diario = DiarioScrapeo(ruta_diario(archivo_csv_salida), reanudar=reanudar)
+    ya_terminados = diario.terminados() | urls_en_csv(archivo_csv_salida) if reanudar else set()
+    if reanudar: print(f"Reanudando: {len(ya_terminados)} links ya terminados en {diario.ruta} / {archivo_csv_salida} se omitirán.")
+    return diario, ya_terminados
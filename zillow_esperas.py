@@ -0,0 +1,126 @@
+from contextlib import contextmanager
+from zillow_busqueda import filtros_en_query_state, query_state_de_url
+from zillow_metricas import METRICAS
+from zillow_navegador import modulos_selenium
+
+# --- Instrumentación de la Página ---
+# Cuenta las peticiones fetch/XHR en vuelo y el momento de la última actividad. Se instala una vez por
+# documento (una navegación completa la borra y se vuelve a instalar en el próximo clic).
+JS_INSTRUMENTAR_RED = """
+if (!window.__zillowEsperas) {
+  const red = window.__zillowEsperas = {pendientes: 0, ultima: performance.now()};
+  const terminar = () => { red.pendientes = Math.max(0, red.pendientes - 1); red.ultima = performance.now(); };
+  const fetchOriginal = window.fetch;
+  if (fetchOriginal) window.fetch = function() {
+    red.pendientes++; red.ultima = performance.now();
+    return fetchOriginal.apply(this, arguments).finally(terminar);
+  };
+  const enviarOriginal = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function() {
+    red.pendientes++; red.ultima = performance.now();
+    this.addEventListener('loadend', terminar);
+    return enviarOriginal.apply(this, arguments);
+  };
+}
+"""
+
+# Foto barata del estado de los resultados, en un solo viaje: URL, texto del conteo, primera tarjeta y red.
+JS_ESTADO_RESULTADOS = """
+const conteo = document.querySelector(arguments[0]);
+const tarjeta = document.querySelector(arguments[1]);
+const red = window.__zillowEsperas;
+return {url: location.href, conteo: conteo ? conteo.textContent.trim() : null,
+        primera: tarjeta ? tarjeta.getAttribute('href') : null,
+        pendientes: red ? red.pendientes : null, quieta_ms: red ? performance.now() - red.ultima : null};
+"""
+SELECTOR_CONTEO = '.result-count, span[class*="result-count"]'
+SELECTOR_PRIMERA_TARJETA = 'article[data-test="property-card"] a[href*="_zpid"], ul.photo-cards a[href*="_zpid"]'
+
+
+def estado_resultados(driver):
+    """{url, conteo, primera, pendientes, quieta_ms} de la página actual."""
+    return driver.execute_script(JS_ESTADO_RESULTADOS, SELECTOR_CONTEO, SELECTOR_PRIMERA_TARJETA) or {}
+
+
+# --- Condiciones (para WebDriverWait.until) ---
+def resultados_cambiaron(previo):
+    """El conteo, la primera tarjeta o la URL de la búsqueda ya no son los de `previo`."""
+    def condicion(driver):
+        actual = estado_resultados(driver)
+        return any(actual.get(campo) != previo.get(campo) for campo in ("conteo", "primera", "url"))
+    return condicion
+
+
+def lista_rerenderizada(elemento):
+    """La tarjeta (o lista) tomada antes del clic ya no está en el DOM: React re-renderizó los resultados."""
+    from selenium.common.exceptions import StaleElementReferenceException
+    def condicion(driver):
+        if elemento is None: return False
+        try: elemento.is_enabled(); return False
+        except StaleElementReferenceException: return True
+    return condicion
+
+
+def url_refleja_filtros(filter_state):
+    """El searchQueryState de la URL (que Zillow actualiza con cada filtro) ya contiene los filtros pedidos."""
+    return lambda driver: filtros_en_query_state(query_state_de_url(driver.current_url), filter_state)
+
+
+def red_inactiva(quieta_ms=500):
+    """No hay fetch/XHR en vuelo desde hace `quieta_ms` (sin instrumentación se da por inactiva)."""
+    def condicion(driver):
+        estado = estado_resultados(driver)
+        if estado.get("pendientes") is None: return True
+        return estado["pendientes"] == 0 and estado["quieta_ms"] >= quieta_ms
+    return condicion
+
+
+def alguna(*condiciones):
+    return lambda driver: any(condicion(driver) for condicion in condiciones)
+
+
+def todas(*condiciones):
+    return lambda driver: all(condicion(driver) for condicion in condiciones)
+
+
+# --- Esperas Compuestas ---
+def esperar(driver, condicion, timeout=15, etapa="esperas.condicion", descripcion="la página"):
+    """WebDriverWait con sondeo corto medido en METRICAS; devuelve False (y avisa) si se agota el tiempo."""
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+    WebDriverWait, _, _ = modulos_selenium()
+    try:
+        with METRICAS.etapa(etapa): WebDriverWait(driver, timeout, poll_frequency=0.1, ignored_exceptions=(WebDriverException,)).until(condicion)
+        return True
+    except TimeoutException:
+        METRICAS.contar(f"{etapa}.agotadas")
+        print(f"  [Esperas] {descripcion} no cambió en {timeout}s; se continúa igual.")
+        return False
+
+
+@contextmanager
+def esperando_resultados(driver, filter_state=None, timeout=15, quieta_ms=500):
+    """
+    Envuelve la acción que cambia la búsqueda (el clic en "Newest", "Apply", etc.): toma el estado antes y,
+    al salir, espera a que los resultados reflejen el cambio (URL con el filtro, conteo o tarjetas distintas,
+    o la lista re-renderizada) y a que la red quede quieta. Vuelve en cuanto se cumple, no tras un sleep fijo.
+    """
+    from selenium.common.exceptions import WebDriverException
+    _, _, By = modulos_selenium()
+    try:
+        driver.execute_script(JS_INSTRUMENTAR_RED)
+        previo = estado_resultados(driver)
+        tarjeta = next(iter(driver.find_elements(By.CSS_SELECTOR, SELECTOR_PRIMERA_TARJETA)), None)
+    except WebDriverException:
+        previo, tarjeta = {}, None
+    yield
+    cambio = alguna(*([url_refleja_filtros(filter_state)] if filter_state else []), resultados_cambiaron(previo), lista_rerenderizada(tarjeta))
+    esperar(driver, todas(cambio, red_inactiva(quieta_ms)), timeout, "esperas.resultados", "La búsqueda")
+
+
+def esperar_resultados_estables(driver, filter_state=None, timeout=15, quieta_ms=500):
+    """Antes de leer la página: la URL refleja `filter_state` (si se pasa) y no hay peticiones en vuelo."""
+    from selenium.common.exceptions import WebDriverException
+    try: driver.execute_script(JS_INSTRUMENTAR_RED)
+    except WebDriverException: pass
+    condiciones = ([url_refleja_filtros(filter_state)] if filter_state else []) + [red_inactiva(quieta_ms)]
+    return esperar(driver, todas(*condiciones), timeout, "esperas.estables", "El estado de la búsqueda")
@@ -0,0 +1,102 @@
+import time
+import sqlite3
+import threading
+from zillow_metricas import METRICAS
+
+# --- Sondeo del Diseño Servido ---
+# Marcadores baratos de cada diseño de la página de resultados: si el botón de orden de una variante
+# está en el DOM, esa es la que Zillow sirvió y sus selectores son los que van a funcionar.
+SONDEOS_DISENO = {
+    "movil": ['button[aria-label="Sort Properties"]'],
+    "web": ["button#sort-popover", 'button[data-test="price-filters-button"]'],
+}
+
+# Recibe {estrategia: [selectores]} y devuelve las estrategias con algún marcador presente, en un solo viaje.
+JS_SONDEO_DISENO = """
+const sondeos = arguments[0];
+return Object.keys(sondeos).filter(nombre => sondeos[nombre].some(selector => document.querySelector(selector)));
+"""
+
+
+# --- Registro Persistente de Estrategias ---
+class RegistroEstrategias:
+    """
+    Recuerda en SQLite cuántas veces funcionó cada estrategia (ej. filtros "movil" o "web") por contexto.
+    Las estadísticas más viejas que `ttl_s` se descartan, para que un cambio de diseño de Zillow se
+    re-aprenda. ordenar() pone primero lo que detectó el sondeo y después la mayor tasa de éxito.
+    """
+
+    def __init__(self, ruta="zillow_estrategias.sqlite", ttl_s=7 * 86400):
+        self.ruta, self.ttl_s = ruta, ttl_s
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=30)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("""CREATE TABLE IF NOT EXISTS estrategias (
+            contexto TEXT, estrategia TEXT, exitos INTEGER, fallos INTEGER, actualizado_en REAL,
+            PRIMARY KEY (contexto, estrategia))""")
+        self._conexion.commit()
+
+    def tasas(self, contexto):
+        """{estrategia: (exitos, fallos)} con las estadísticas todavía vigentes."""
+        with self._lock:
+            filas = self._conexion.execute("SELECT estrategia, exitos, fallos FROM estrategias WHERE contexto = ? AND actualizado_en >= ?",
+                                           (contexto, time.time() - self.ttl_s)).fetchall()
+        return {estrategia: (exitos, fallos) for estrategia, exitos, fallos in filas}
+
+    def ordenar(self, contexto, candidatas, detectadas=()):
+        """Candidatas en orden de probabilidad: detectadas por el sondeo, luego tasa de éxito (suavizada), luego el orden dado."""
+        tasas = self.tasas(contexto)
+        def probabilidad(estrategia):
+            exitos, fallos = tasas.get(estrategia, (0, 0))
+            return (exitos + 1) / (exitos + fallos + 2)
+        return sorted(candidatas, key=lambda e: (e not in detectadas, -probabilidad(e), candidatas.index(e)))
+
+    def registrar(self, contexto, estrategia, exito):
+        ahora = time.time()
+        with self._lock:
+            fila = self._conexion.execute("SELECT exitos, fallos, actualizado_en FROM estrategias WHERE contexto = ? AND estrategia = ?",
+                                          (contexto, estrategia)).fetchone()
+            exitos, fallos = (fila[0], fila[1]) if fila and fila[2] >= ahora - self.ttl_s else (0, 0)
+            exitos, fallos = exitos + bool(exito), fallos + (not exito)
+            self._conexion.execute("INSERT OR REPLACE INTO estrategias VALUES (?, ?, ?, ?, ?)", (contexto, estrategia, exitos, fallos, ahora))
+            self._conexion.commit()
+
+    def cerrar(self):
+        with self._lock: self._conexion.close()
+
+
+def registro_estrategias_desde_config(config):
+    """
+    Crea el registro a partir de la sección opcional "estrategias" de config.json, ej.
+    {"estrategias": {"ruta": "zillow_estrategias.sqlite", "ttl_dias": 7}}. Con {"activo": false} devuelve None.
+    """
+    opciones = config.get("estrategias", {}) or {}
+    if not opciones.get("activo", True): return None
+    return RegistroEstrategias(opciones.get("ruta", "zillow_estrategias.sqlite"), ttl_s=float(opciones.get("ttl_dias", 7)) * 86400)
+
+
+def sondear_diseno(driver, sondeos=SONDEOS_DISENO):
+    """Estrategias cuyo marcador ya está en el DOM ([] si el sondeo falla)."""
+    try:
+        with METRICAS.etapa("estrategias.sondeo"): return driver.execute_script(JS_SONDEO_DISENO, sondeos) or []
+    except Exception as e:
+        print(f"  [Estrategias] No se pudo sondear el diseño: {e}")
+        return []
+
+
+def aplicar_primera_estrategia(driver, estrategias, registro=None, contexto="filtros_busqueda", sondeos=SONDEOS_DISENO):
+    """
+    Prueba las estrategias ({nombre: funcion() -> bool}) empezando por la más probable y se detiene en la
+    primera que funciona. Devuelve su nombre, o None si fallaron todas. Sin `registro` solo ordena por el sondeo.
+    """
+    candidatas = list(estrategias)
+    detectadas = sondear_diseno(driver, sondeos)
+    orden = registro.ordenar(contexto, candidatas, detectadas) if registro else sorted(candidatas, key=lambda e: (e not in detectadas, candidatas.index(e)))
+    print(f"  [Estrategias] Diseño detectado: {', '.join(detectadas) or 'ninguno'}. Orden de intento: {' -> '.join(orden)}.")
+    for intento, nombre in enumerate(orden, start=1):
+        print(f"\n--- Intento {intento}: Aplicar filtros con la estrategia '{nombre}' ---")
+        exito = bool(estrategias[nombre]())
+        METRICAS.contar(f"estrategias.{contexto}.{nombre}.{'exito' if exito else 'fallo'}")
+        if registro: registro.registrar(contexto, nombre, exito)
+        if exito: return nombre
+    return None
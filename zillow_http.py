@@ -0,0 +1,354 @@
+import time
+import threading
+import requests
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode
+from zillow_cache import OPCIONES_CACHE
+from zillow_ritmo import Medicion, senal_de_respuesta
+from zillow_metricas import METRICAS
+
+# --- Configuración del Motor HTTP (sin navegador) ---
+SCRAPEOPS_ENDPOINT = "https://proxy.scrapeops.io/v1/"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+TIMEOUT_PROXY_MS = 180000
+
+
+def construir_url_scrapeops(target_url, api_key, residential=True, render_js=True, country="us", endpoint=SCRAPEOPS_ENDPOINT, timeout_ms=TIMEOUT_PROXY_MS):
+    """Arma la URL del proxy de ScrapeOps. Sin API key devuelve la URL original."""
+    if not api_key: return target_url
+    payload = { "api_key": api_key, "url": target_url, "country": country, "residential": residential, "render_js": render_js, "timeout": timeout_ms }
+    return endpoint + "?" + urlencode(payload)
+
+
+# --- Niveles del Proxy (escalada por costo) ---
+# De más barato y rápido a más caro: la mayoría de las páginas trae __NEXT_DATA__ ya en el HTML del servidor,
+# así que el render de JS residencial solo hace falta cuando los niveles anteriores fallan.
+NIVELES_PROXY = {
+    "datacenter": {"residential": False, "render_js": False},
+    "residencial": {"residential": True, "render_js": False},
+    "residencial_js": {"residential": True, "render_js": True},
+}
+
+
+class PaginaIncompleta(ValueError):
+    """La página llegó (status 200) pero sin los datos que se buscaban: falla de parseo que justifica subir de nivel."""
+
+
+class EscaladorNiveles:
+    """
+    Tasa de éxito reciente (ventana deslizante) de cada nivel del proxy por tipo de URL ("busqueda", "detalle").
+    orden(tipo) empieza por el nivel más barato cuya tasa sigue sobre `tasa_minima`: los que vienen fallando
+    se saltean, salvo una de cada `sondeo_cada` peticiones, que vuelve a probar desde el más barato. Si el
+    sondeo sale bien, el historial de ese nivel se reinicia para re-aprenderlo.
+    """
+
+    def __init__(self, niveles=tuple(NIVELES_PROXY), ventana=30, tasa_minima=0.5, minimo_muestras=5, sondeo_cada=25):
+        self.niveles = [nivel for nivel in niveles if nivel in NIVELES_PROXY] or list(NIVELES_PROXY)
+        self.ventana, self.tasa_minima, self.minimo_muestras, self.sondeo_cada = ventana, tasa_minima, minimo_muestras, sondeo_cada
+        self._historial = {}
+        self._peticiones = {}
+        self._lock = threading.Lock()
+
+    def _tasa(self, tipo, nivel):
+        historial = self._historial.get((tipo, nivel))
+        if not historial or len(historial) < self.minimo_muestras: return None
+        return sum(historial) / len(historial)
+
+    def orden(self, tipo):
+        """Niveles a intentar para `tipo`, del primero que conviene probar al más caro."""
+        with self._lock:
+            self._peticiones[tipo] = self._peticiones.get(tipo, 0) + 1
+            if self._peticiones[tipo] % self.sondeo_cada == 0: return list(self.niveles)
+            for i, nivel in enumerate(self.niveles):
+                tasa = self._tasa(tipo, nivel)
+                if tasa is None or tasa >= self.tasa_minima: return self.niveles[i:]
+            return self.niveles[-1:]
+
+    def registrar(self, tipo, nivel, exito):
+        with self._lock:
+            historial = self._historial.setdefault((tipo, nivel), deque(maxlen=self.ventana))
+            tasa = self._tasa(tipo, nivel)
+            if exito and tasa is not None and tasa < self.tasa_minima: historial.clear()  # Sondeo exitoso: el nivel vuelve a estar en juego
+            historial.append(bool(exito))
+        METRICAS.contar(f"http.niveles.{tipo}.{nivel}.{'exito' if exito else 'fallo'}")
+
+    def tasas(self):
+        """{(tipo, nivel): tasa} con las ventanas actuales, para reportes."""
+        with self._lock: return {clave: sum(h) / len(h) for clave, h in self._historial.items() if h}
+
+
+def timeout_proxy_ms(presupuesto_s):
+    """El proxy corta un poco antes que nosotros, así su respuesta de error llega dentro del presupuesto."""
+    return int(presupuesto_s * 900)
+
+
+def crear_sesion_http(tamano_pool=10):
+    """Crea una sesión de requests con conexiones keep-alive reutilizables."""
+    sesion = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=tamano_pool, pool_maxsize=tamano_pool, max_retries=0)
+    sesion.mount("http://", adaptador); sesion.mount("https://", adaptador)
+    sesion.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Connection": "keep-alive",
+    })
+    return sesion
+
+
+# --- Presupuestos, Cobertura (hedging) e Interruptor ---
+class HistorialLatencias:
+    """Ventana deslizante de latencias de descargas exitosas, para estimar percentiles (p95 de la cobertura)."""
+
+    def __init__(self, tamano=200):
+        self._muestras = deque(maxlen=tamano)
+        self._lock = threading.Lock()
+
+    def agregar(self, segundos):
+        with self._lock: self._muestras.append(segundos)
+
+    def percentil(self, p, minimo_muestras=20):
+        """Percentil p (0-100) o None si todavía no hay suficientes muestras."""
+        with self._lock: muestras = sorted(self._muestras)
+        if len(muestras) < minimo_muestras: return None
+        return muestras[min(len(muestras) - 1, int(len(muestras) * p / 100))]
+
+
+class InterruptorCircuito:
+    """
+    Deja de enviar peticiones al proxy después de `umbral_fallos` fallos seguidos (circuito abierto)
+    durante `enfriamiento_s` segundos. Pasado ese tiempo deja pasar una sola petición de prueba:
+    si sale bien el circuito se cierra, si falla vuelve a abrirse.
+    """
+
+    def __init__(self, umbral_fallos=5, enfriamiento_s=60):
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento_s = enfriamiento_s
+        self._lock = threading.Lock()
+        self._fallos_seguidos = 0
+        self._abierto_hasta = 0.0
+        self._prueba_en_curso = False
+
+    def permitir(self):
+        with self._lock:
+            if self._fallos_seguidos < self.umbral_fallos: return True
+            if time.monotonic() < self._abierto_hasta or self._prueba_en_curso: return False
+            self._prueba_en_curso = True  # Semi-abierto: una sola petición de prueba
+            return True
+
+    def registrar(self, exito):
+        with self._lock:
+            self._prueba_en_curso = False
+            if exito:
+                self._fallos_seguidos = 0
+                return
+            self._fallos_seguidos += 1
+            if self._fallos_seguidos >= self.umbral_fallos:
+                self._abierto_hasta = time.monotonic() + self.enfriamiento_s
+                print(f"    [Interruptor] {self._fallos_seguidos} fallos seguidos del proxy: pausa de {self.enfriamiento_s:.0f} s antes de volver a intentar.")
+
+    @contextmanager
+    def intento(self, descripcion=""):
+        """Bloque protegido: lanza RuntimeError si el circuito está abierto; cuenta como fallo si la señal no es "ok" o hay excepción."""
+        if not self.permitir(): raise RuntimeError(f"Circuito abierto: no se intenta {descripcion}")
+        medicion = Medicion()
+        try:
+            yield medicion
+        except Exception:
+            medicion.senal = "error"
+            raise
+        finally:
+            self.registrar(medicion.senal == "ok")
+
+
+_INTERRUPTOR_COMPARTIDO = None
+_NIVELES_COMPARTIDOS = None
+
+
+def opciones_proxy_desde_config(config):
+    """
+    Lee la sección opcional "proxy" de config.json y devuelve los argumentos de ClienteHTTP, ej.
+    {"proxy": {"presupuesto_s": 60, "cobertura": true, "retraso_cobertura_s": 20, "umbral_fallos": 5, "enfriamiento_s": 60,
+               "niveles": ["datacenter", "residencial", "residencial_js"]}}.
+    El interruptor y el escalador de niveles se comparten entre todos los clientes del proceso.
+    Con "niveles": false no se escala: el cliente HTTP pide siempre residencial sin render_js (sus valores
+    por defecto en obtener_html) y la carga inicial en Chrome, residencial con render_js.
+    """
+    global _INTERRUPTOR_COMPARTIDO, _NIVELES_COMPARTIDOS
+    opciones = config.get("proxy", {}) or {}
+    if _INTERRUPTOR_COMPARTIDO is None:
+        _INTERRUPTOR_COMPARTIDO = InterruptorCircuito(opciones.get("umbral_fallos", 5), opciones.get("enfriamiento_s", 60))
+    niveles = opciones.get("niveles", list(NIVELES_PROXY))
+    if _NIVELES_COMPARTIDOS is None and niveles:
+        _NIVELES_COMPARTIDOS = EscaladorNiveles(niveles, sondeo_cada=opciones.get("sondeo_niveles_cada", 25))
+    return {"presupuesto_s": opciones.get("presupuesto_s", 60), "cobertura": opciones.get("cobertura", False),
+            "retraso_cobertura_s": opciones.get("retraso_cobertura_s"), "interruptor": _INTERRUPTOR_COMPARTIDO,
+            "niveles": _NIVELES_COMPARTIDOS if niveles else None}
+
+
+def leer_con_limite(respuesta, limite, tamano_bloque=64 * 1024):
+    """Lee el cuerpo de una respuesta con stream=True; lanza requests.Timeout si pasa `limite` (time.monotonic)."""
+    bloques = []
+    # read1 (urllib3 >= 2) devuelve lo que ya llegó sin esperar a juntar el bloque entero: el límite se revisa a tiempo
+    leer = getattr(respuesta.raw, "read1", None)
+    for bloque in (iter(lambda: leer(tamano_bloque, decode_content=True), b"") if leer else respuesta.iter_content(8 * 1024)):
+        bloques.append(bloque)
+        if time.monotonic() > limite:
+            METRICAS.contar("http.presupuesto_agotado")
+            raise requests.Timeout("se agotó el presupuesto de la página mientras llegaba el cuerpo")
+    return b"".join(bloques)
+
+
+class ClienteHTTP:
+    """
+    Descarga páginas de Zillow a través de ScrapeOps usando una sesión HTTP compartida,
+    sin levantar Chrome. El endpoint es configurable para poder apuntarlo a un servidor local.
+    Con `cache` (CacheRespuestas) las páginas ya descargadas no vuelven a pasar por el proxy.
+    Con `limitador` (ControladorRitmo) solo las descargas reales esperan turno;
+    las respuestas de bloqueo (403/429/captcha) se le informan al controlador y no se cachean.
+    `presupuesto_s` es el tiempo máximo por página (también se le pasa al proxy como su timeout).
+    Con `cobertura`, si la descarga tarda más que el p95 observado (o `retraso_cobertura_s`) se lanza
+    una segunda petición idéntica y se usa la que termine primero. `interruptor` corta las peticiones
+    al proxy tras varios fallos seguidos. Con `niveles` (EscaladorNiveles), obtener_con_niveles() pide cada
+    página al nivel de proxy más barato que viene funcionando para su tipo.
+    """
+
+    def __init__(self, api_key, endpoint=SCRAPEOPS_ENDPOINT, tamano_pool=10, timeout=(10, 190), cache=None, limitador=None,
+                 presupuesto_s=None, cobertura=False, retraso_cobertura_s=None, interruptor=None, niveles=None):
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self.timeout = (timeout[0], presupuesto_s) if presupuesto_s else timeout
+        self.presupuesto_s = presupuesto_s or timeout[1]
+        self.cache = cache
+        self.limitador = limitador
+        self.cobertura = cobertura
+        self.retraso_cobertura_s = retraso_cobertura_s
+        self.interruptor = interruptor
+        self.niveles = niveles
+        self.latencias = HistorialLatencias()
+        self.sesion = crear_sesion_http(tamano_pool)
+        self._pool_cobertura = ThreadPoolExecutor(max_workers=tamano_pool) if cobertura else None
+
+    def obtener_html(self, target_url, residential=True, render_js=False):
+        """Devuelve el HTML de la página o None si la descarga falla."""
+        return self._obtener(target_url, residential, render_js)[0]
+
+    def obtener_con_niveles(self, target_url, tipo, parsear):
+        """
+        Descarga y parsea `target_url` empezando por el nivel de proxy más barato que viene funcionando para
+        `tipo`; sube de nivel solo si la respuesta es un bloqueo o parsear(html) lanza PaginaIncompleta.
+        Devuelve (resultado de parsear, True), o (None, False) si no se pudo. Sin escalador usa un solo nivel.
+        """
+        if not self.niveles:
+            html = self.obtener_html(target_url)
+            try: return (parsear(html), True) if html is not None else (None, False)
+            except PaginaIncompleta as e: print(f"    ERROR [HTTP]: {target_url} llegó incompleta ({e})"); return None, False
+        orden = self.niveles.orden(tipo)
+        for i, nivel in enumerate(orden):
+            html, senal = self._obtener(target_url, guardar=False, escalable=i + 1 < len(orden), **NIVELES_PROXY[nivel])
+            if senal not in ("ok", "cache", "bloqueo"): return None, False  # Timeout o error: no depende del nivel, no se escala
+            try:
+                if html is None: raise PaginaIncompleta("respuesta de bloqueo")
+                resultado = parsear(html)
+            except PaginaIncompleta as e:
+                self.niveles.registrar(tipo, nivel, False)
+                if i + 1 < len(orden):
+                    print(f"    [HTTP] Nivel '{nivel}' sin datos para {target_url} ({e}). Subiendo a '{orden[i + 1]}'...")
+                    METRICAS.contar(f"http.niveles.{tipo}.escaladas")
+                continue
+            self.niveles.registrar(tipo, nivel, True)
+            if self.cache and senal == "ok": self.cache.guardar(target_url, html, OPCIONES_CACHE)
+            return resultado, True
+        return None, False
+
+    def _obtener(self, target_url, residential=True, render_js=False, guardar=True, escalable=False):
+        """
+        (html o None, señal). Con guardar=False el llamador decide si la página va a la caché (ej. tras parsearla).
+        Con escalable=True un bloqueo se va a reintentar en un nivel más caro: no frena el ritmo ni abre el interruptor.
+        """
+        if self.cache:
+            html_cacheado = self.cache.obtener(target_url, OPCIONES_CACHE)
+            METRICAS.contar("cache.acierto" if html_cacheado is not None else "cache.fallo")
+            if html_cacheado is not None: return html_cacheado, "cache"
+        if self.interruptor and not self.interruptor.permitir():
+            print(f"    ERROR [HTTP]: Circuito abierto, no se descarga {target_url}")
+            METRICAS.contar("http.circuito_abierto")
+            return None, "circuito_abierto"
+        url = construir_url_scrapeops(target_url, self.api_key, residential=residential, render_js=render_js, endpoint=self.endpoint,
+                                      timeout_ms=timeout_proxy_ms(self.presupuesto_s))
+        # Un solo turno por página: la petición de cobertura es parte de la misma descarga lógica
+        with METRICAS.etapa("http.descarga"), (self.limitador.turno(target_url) if self.limitador else nullcontext()) as medicion:
+            html, senal = self._descargar_con_cobertura(url, target_url) if self.cobertura else self._descargar(url, target_url, self.timeout)
+            bloqueo_de_nivel = escalable and senal == "bloqueo"
+            if medicion is not None: medicion.senal = "bloqueo_nivel" if bloqueo_de_nivel else senal
+        if self.interruptor: self.interruptor.registrar(html is not None or bloqueo_de_nivel)
+        if html is not None and self.cache and guardar: self.cache.guardar(target_url, html, OPCIONES_CACHE)
+        return html, senal
+
+    def _descargar(self, url, target_url, timeout, resuelto=None, limite=None):
+        """
+        Una petición al proxy. Devuelve (html o None, señal). El cuerpo se lee por bloques y se corta en
+        `limite` (por defecto, ahora + presupuesto_s): el timeout de requests es por lectura, así que un
+        exit que gotea bytes podría pasarse del presupuesto. Si `resuelto` ya está marcado cuando esta
+        petición falla, otra ganó la carrera y el fallo se descarta en silencio.
+        """
+        inicio = time.monotonic()
+        limite = limite or inicio + self.presupuesto_s
+        try:
+            with self.sesion.get(url, timeout=timeout, stream=True) as respuesta:
+                cuerpo = leer_con_limite(respuesta, limite)
+        except requests.RequestException as e:
+            if resuelto is not None and resuelto.is_set(): return None, "cancelado"
+            print(f"    ERROR [HTTP]: Falló la descarga de {target_url}: {e}")
+            return None, "timeout" if isinstance(e, requests.Timeout) else "error"
+        html = cuerpo.decode(respuesta.encoding or "utf-8", errors="replace")
+        senal = senal_de_respuesta(respuesta.status_code, html)
+        if senal != "ok":
+            print(f"    ERROR [HTTP]: Respuesta {respuesta.status_code} ({senal}) para {target_url}")
+            return None, senal
+        METRICAS.observar("http.proxy", time.monotonic() - inicio)
+        METRICAS.contar("http.bytes", len(cuerpo))
+        self.latencias.agregar(time.monotonic() - inicio)
+        return html, "ok"
+
+    def _descargar_con_cobertura(self, url, target_url):
+        """Lanza la petición y, si tarda más que el p95, una segunda; gana la primera que termine bien dentro del presupuesto."""
+        limite = time.monotonic() + self.presupuesto_s
+        retraso = self.retraso_cobertura_s or self.latencias.percentil(95) or self.presupuesto_s / 3
+        resuelto = threading.Event()
+        senal = "timeout"
+        pendientes = {self._pool_cobertura.submit(self._descargar, url, target_url, self.timeout, resuelto, limite)}
+        try:
+            hecho, pendientes = wait(pendientes, timeout=retraso)
+            for futuro in hecho:
+                html, senal = futuro.result()
+                if html is not None or senal == "bloqueo": return html, senal  # Ante un bloqueo no se insiste
+            restante = limite - time.monotonic()
+            if restante > 1:
+                print(f"    [HTTP] Sin respuesta tras {retraso:.1f} s: lanzando petición de cobertura para {target_url}")
+                METRICAS.contar("http.cobertura")
+                pendientes.add(self._pool_cobertura.submit(self._descargar, url, target_url, (self.timeout[0], restante), resuelto, limite))
+            while pendientes and time.monotonic() < limite:
+                hecho, pendientes = wait(pendientes, timeout=limite - time.monotonic(), return_when=FIRST_COMPLETED)
+                for futuro in hecho:
+                    html, senal = futuro.result()
+                    if html is not None: return html, senal
+            if pendientes:
+                print(f"    ERROR [HTTP]: Se agotó el presupuesto de {self.presupuesto_s:.0f} s para {target_url}")
+                senal = "timeout"
+            return None, senal
+        finally:
+            resuelto.set()  # La petición que siga en vuelo ya no importa
+
+    def cerrar(self):
+        if self._pool_cobertura: self._pool_cobertura.shutdown(wait=False, cancel_futures=True)
+        self.sesion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cerrar()
@@ -0,0 +1,84 @@
+import time
+import sqlite3
+import threading
+from zillow_busqueda import RE_ZPID, zpid_de_resultado
+
+
+def zpid_de_link(link):
+    coincidencia = RE_ZPID.search(link or "")
+    return coincidencia.group(1) if coincidencia else link
+
+
+# --- Índice Persistente de Listados (crawl incremental) ---
+class IndiceListados:
+    """
+    Índice SQLite por zpid con el último precio y estado vistos en `listResults` y la fecha del
+    último scrapeo de detalles. Un listado queda pendiente si es nuevo, si cambió su precio o
+    estado desde el último scrapeo, o si nunca se scrapeó.
+    """
+
+    def __init__(self, ruta="zillow_indice.sqlite"):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=30)  # Los procesos de ejecutar_lote comparten el índice
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("""CREATE TABLE IF NOT EXISTS listados (
+            zpid TEXT PRIMARY KEY, url TEXT, precio TEXT, estado TEXT,
+            visto_en REAL, cambiado_en REAL, scrapeado_en REAL)""")
+        self._conexion.commit()
+
+    def registrar_resultados(self, list_results):
+        """Guarda precio y estado de cada resultado. Devuelve (nuevos, cambiados, sin_cambios)."""
+        nuevos = cambiados = sin_cambios = 0
+        ahora = time.time()
+        with self._lock:
+            for prop_item in list_results:
+                if not isinstance(prop_item, dict) or "detailUrl" not in prop_item: continue
+                zpid = zpid_de_resultado(prop_item)
+                precio = str(prop_item.get("unformattedPrice") or prop_item.get("price") or "")
+                estado = str(prop_item.get("statusType") or prop_item.get("statusText") or "")
+                previo = self._conexion.execute("SELECT precio, estado FROM listados WHERE zpid = ?", (zpid,)).fetchone()
+                if previo is None:
+                    nuevos += 1
+                    self._conexion.execute("INSERT INTO listados VALUES (?, ?, ?, ?, ?, ?, NULL)",
+                                           (zpid, prop_item["detailUrl"], precio, estado, ahora, ahora))
+                elif previo != (precio, estado):
+                    cambiados += 1
+                    self._conexion.execute("UPDATE listados SET precio = ?, estado = ?, visto_en = ?, cambiado_en = ? WHERE zpid = ?",
+                                           (precio, estado, ahora, ahora, zpid))
+                else:
+                    sin_cambios += 1
+                    self._conexion.execute("UPDATE listados SET visto_en = ? WHERE zpid = ?", (ahora, zpid))
+            self._conexion.commit()
+        print(f"Índice de listados: {nuevos} nuevos, {cambiados} con cambios, {sin_cambios} sin cambios.")
+        return nuevos, cambiados, sin_cambios
+
+    def filtrar_pendientes(self, links):
+        """Devuelve, en el mismo orden, los links que hay que (re)scrapear."""
+        pendientes = []
+        with self._lock:
+            for link in links:
+                fila = self._conexion.execute("SELECT cambiado_en, scrapeado_en FROM listados WHERE zpid = ?", (zpid_de_link(link),)).fetchone()
+                if fila is None or fila[1] is None or fila[0] > fila[1]: pendientes.append(link)
+        return pendientes
+
+    def marcar_scrapeado(self, link):
+        ahora = time.time()
+        with self._lock:
+            self._conexion.execute("INSERT INTO listados (zpid, url, visto_en, cambiado_en, scrapeado_en) VALUES (?, ?, ?, ?, ?) "
+                                   "ON CONFLICT(zpid) DO UPDATE SET scrapeado_en = excluded.scrapeado_en",
+                                   (zpid_de_link(link), link, ahora, ahora, ahora))
+            self._conexion.commit()
+
+    def cerrar(self):
+        with self._lock: self._conexion.close()
+
+
+def indice_desde_config(config):
+    """
+    Crea el índice a partir de la sección opcional "indice" de config.json, ej. {"indice": {"ruta": "zillow_indice.sqlite"}}.
+    Con {"indice": {"activo": false}} se desactiva y devuelve None.
+    """
+    opciones = config.get("indice", {}) or {}
+    if not opciones.get("activo", True): return None
+    return IndiceListados(opciones.get("ruta", "zillow_indice.sqlite"))
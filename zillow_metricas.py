@@ -0,0 +1,150 @@
+import os
+import io
+import json
+import time
+import pstats
+import functools
+import cProfile
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# --- Métricas por Etapa (timers, contadores e histogramas) ---
+PERCENTILES = (50, 90, 95, 99)
+MAX_MUESTRAS_POR_ETAPA = 10000
+
+
+def percentil(muestras_ordenadas, p):
+    if not muestras_ordenadas: return 0.0
+    return muestras_ordenadas[min(len(muestras_ordenadas) - 1, int(len(muestras_ordenadas) * p / 100))]
+
+
+class Metricas:
+    """
+    Registro en memoria, seguro entre hilos, de cuánto tarda cada etapa (descarga por el proxy, espera de
+    __NEXT_DATA__, filtros, parseo JSON, extracción del DOM, pausas del ritmo...) y de contadores de eventos.
+    Cada etapa guarda sus últimas MAX_MUESTRAS_POR_ETAPA duraciones para calcular percentiles.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.inicio = time.time()
+            self._duraciones = defaultdict(lambda: deque(maxlen=MAX_MUESTRAS_POR_ETAPA))
+            self._totales = defaultdict(float)
+            self._cantidades = defaultdict(int)
+            self.contadores = defaultdict(int)
+
+    def observar(self, etapa, segundos):
+        with self._lock:
+            self._duraciones[etapa].append(segundos)
+            self._totales[etapa] += segundos
+            self._cantidades[etapa] += 1
+
+    def contar(self, evento, cantidad=1):
+        with self._lock: self.contadores[evento] += cantidad
+
+    @contextmanager
+    def etapa(self, nombre):
+        """Mide el bloque como una muestra de `nombre`; si lanza una excepción suma también `nombre.errores`."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.contar(f"{nombre}.errores")
+            raise
+        finally:
+            self.observar(nombre, time.perf_counter() - inicio)
+
+    def medir(self, nombre):
+        """Decorador: cada llamada a la función es una muestra de la etapa `nombre`."""
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                with self.etapa(nombre): return funcion(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    def resumen(self):
+        with self._lock:
+            etapas = {}
+            for nombre, muestras in self._duraciones.items():
+                ordenadas = sorted(muestras)
+                etapas[nombre] = {"n": self._cantidades[nombre], "total_s": round(self._totales[nombre], 4),
+                                  "media_s": round(self._totales[nombre] / max(1, self._cantidades[nombre]), 4),
+                                  **{f"p{p}_s": round(percentil(ordenadas, p), 4) for p in PERCENTILES},
+                                  "max_s": round(ordenadas[-1], 4) if ordenadas else 0.0}
+            return {"inicio": self.inicio, "duracion_s": round(time.time() - self.inicio, 3),
+                    "etapas": dict(sorted(etapas.items())), "contadores": dict(sorted(self.contadores.items()))}
+
+    def guardar_reporte(self, ruta, extra=None):
+        """Escribe el resumen como JSON (con `extra`, ej. el estado del ritmo o los contadores del pipeline)."""
+        reporte = self.resumen()
+        if extra: reporte.update(extra)
+        with open(ruta, "w", encoding="utf-8") as f: json.dump(reporte, f, indent=4, ensure_ascii=False)
+        print(f"Reporte de métricas guardado en {ruta}")
+        return reporte
+
+    def exportar_prometheus(self, ruta, prefijo="zillow", etiquetas=None):
+        """
+        Formato textfile de node_exporter. Se escribe a un temporal y se renombra para que nunca se lea a medias.
+        `etiquetas` (ej. {"ciudad": "stamford-ct"}) se agregan a cada serie para que varios archivos no choquen.
+        """
+        resumen = self.resumen()
+        base = "".join(f',{clave}="{valor}"' for clave, valor in (etiquetas or {}).items())
+        lineas = [f"# TYPE {prefijo}_etapa_segundos summary"]
+        for nombre, datos in resumen["etapas"].items():
+            for p in PERCENTILES: lineas.append(f'{prefijo}_etapa_segundos{{etapa="{nombre}",quantile="{p / 100}"{base}}} {datos[f"p{p}_s"]}')
+            lineas.append(f'{prefijo}_etapa_segundos_sum{{etapa="{nombre}"{base}}} {datos["total_s"]}')
+            lineas.append(f'{prefijo}_etapa_segundos_count{{etapa="{nombre}"{base}}} {datos["n"]}')
+        lineas.append(f"# TYPE {prefijo}_eventos_total counter")
+        for evento, valor in resumen["contadores"].items(): lineas.append(f'{prefijo}_eventos_total{{evento="{evento}"{base}}} {valor}')
+        lineas.append(f"# TYPE {prefijo}_corrida_duracion_segundos gauge")
+        lineas.append(f"{prefijo}_corrida_duracion_segundos{'{' + base.lstrip(',') + '}' if base else ''} {resumen['duracion_s']}")
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f: f.write("\n".join(lineas) + "\n")
+        os.replace(temporal, ruta)
+        print(f"Métricas Prometheus exportadas en {ruta}")
+
+    def imprimir_tabla(self, max_filas=20):
+        """Las etapas que más tiempo total consumieron, con sus percentiles."""
+        etapas = sorted(self.resumen()["etapas"].items(), key=lambda item: item[1]["total_s"], reverse=True)[:max_filas]
+        if not etapas: return
+        print(f"\n{'Etapa':<32}{'n':>7}{'total s':>10}{'p50 s':>9}{'p95 s':>9}{'max s':>9}")
+        for nombre, d in etapas: print(f"{nombre:<32}{d['n']:>7}{d['total_s']:>10.2f}{d['p50_s']:>9.3f}{d['p95_s']:>9.3f}{d['max_s']:>9.3f}")
+
+
+# Un registro por proceso: crawler, scraper y los módulos de soporte miden sobre el mismo.
+METRICAS = Metricas()
+
+
+def finalizar_metricas(reporte=None, prometheus=None, extra=None, etiquetas=None):
+    """Escribe el reporte JSON y/o el textfile de Prometheus si se pidieron."""
+    if reporte: METRICAS.guardar_reporte(reporte, extra)
+    if prometheus: METRICAS.exportar_prometheus(prometheus, etiquetas=etiquetas)
+
+
+# --- Perfilado Opcional (cProfile) ---
+@contextmanager
+def perfilar(ruta=None, top=25):
+    """
+    Con `ruta`, corre el bloque bajo cProfile, guarda las estadísticas (para snakeviz/pstats) e imprime el top acumulado.
+    cProfile solo ve el hilo que entra al bloque: con un solo trabajador todo corre en ese hilo (procesar_en_paralelo no abre pool).
+    """
+    if not ruta:
+        yield
+        return
+    perfil = cProfile.Profile()
+    perfil.enable()
+    try:
+        yield
+    finally:
+        perfil.disable()
+        perfil.dump_stats(ruta)
+        salida = io.StringIO()
+        pstats.Stats(perfil, stream=salida).sort_stats("cumulative").print_stats(top)
+        print(salida.getvalue())
+        print(f"Perfil de cProfile guardado en {ruta}")
@@ -0,0 +1,217 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+try:
+    import psutil
+except ImportError:  # Opcional: sin psutil no se recicla por memoria
+    psutil = None
+
+
+# --- Perfiles de Chrome ---
+USER_AGENT_NAVEGADOR = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+# Solo leemos __NEXT_DATA__ y unos pocos nodos del DOM: imágenes, video, fuentes, mapas y trackers no hacen falta.
+URLS_BLOQUEADAS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.mp4", "*.webm", "*.m3u8", "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*maps.googleapis.com*", "*maps.gstatic.com*", "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*facebook.net*", "*connect.facebook*", "*bat.bing.com*", "*hotjar.com*", "*nr-data.net*",
+    "*newrelic.com*", "*optimizely.com*", "*pinimg.com*", "*tiktok.com*", "*quantserve.com*", "*scorecardresearch.com*",
+]
+PERFILES_NAVEGADOR = {
+    # El navegador de siempre: visible, maximizado y con todos los recursos (útil para depurar los clics).
+    "completo": {"headless": False, "carga": "normal", "ventana": None, "bloquear": False},
+    # Sin ventana, DOMContentLoaded en lugar de esperar cada recurso y sin imágenes/fuentes/trackers.
+    "ligero": {"headless": True, "carga": "eager", "ventana": "1280,800", "bloquear": True},
+}
+
+
+def construir_opciones(perfil="completo"):
+    """Options de Chrome para el perfil dado ("completo" o "ligero")."""
+    from selenium.webdriver.chrome.options import Options
+    config = PERFILES_NAVEGADOR[perfil]
+    options = Options()
+    if config["headless"]: options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox"); options.add_argument("--disable-dev-shm-usage"); options.add_argument("--disable-gpu")
+    options.add_argument(f"user-agent={USER_AGENT_NAVEGADOR}")
+    options.add_argument(f"--window-size={config['ventana']}" if config["ventana"] else "--start-maximized")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"]); options.add_experimental_option('useAutomationExtension', False)
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.page_load_strategy = config["carga"]
+    if config["bloquear"]:
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        options.add_argument("--disk-cache-size=104857600")  # Los bundles JS se reutilizan entre páginas de la misma sesión
+        options.add_argument("--disable-extensions"); options.add_argument("--mute-audio")
+    return options
+
+
+def aplicar_perfil(driver, perfil="completo"):
+    """Ajustes por CDP después de lanzar Chrome: oculta navigator.webdriver y, en el perfil ligero, bloquea recursos."""
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined});"})
+    if PERFILES_NAVEGADOR[perfil]["bloquear"]:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": URLS_BLOQUEADAS})
+        driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": False})
+
+
+def perfil_desde_config(config, etapa):
+    """
+    Perfil de navegador de una etapa ("crawler" o "scraper") según la sección opcional "navegador"
+    de config.json, ej. {"navegador": {"crawler": "completo", "scraper": "ligero"}}. Por defecto "ligero".
+    """
+    perfil = (config.get("navegador", {}) or {}).get(etapa, "ligero")
+    if perfil not in PERFILES_NAVEGADOR:
+        print(f"Advertencia: perfil de navegador '{perfil}' desconocido para '{etapa}'. Usando 'ligero'.")
+        perfil = "ligero"
+    return perfil
+
+
+# --- Selenium y chromedriver (importados recién cuando se usa Chrome) ---
+def modulos_selenium():
+    """(WebDriverWait, expected_conditions, By). Importar Selenium cuesta ~300 ms: el motor HTTP nunca lo paga."""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions
+    from selenium.webdriver.support.ui import WebDriverWait
+    return WebDriverWait, expected_conditions, By
+
+
+def chromedriver_desde_config(config):
+    """
+    chromedriver fijo según la sección opcional "navegador" de config.json, ej.
+    {"navegador": {"chromedriver": "/usr/local/bin/chromedriver"}} o {"navegador": {"version_chromedriver": "125.0.6422.141"}}.
+    Las variables de entorno CHROMEDRIVER_PATH y CHROMEDRIVER_VERSION tienen prioridad.
+    """
+    opciones = config.get("navegador", {}) or {}
+    return {"ruta": os.environ.get("CHROMEDRIVER_PATH") or opciones.get("chromedriver"),
+            "version": os.environ.get("CHROMEDRIVER_VERSION") or opciones.get("version_chromedriver")}
+
+
+@lru_cache(maxsize=None)
+def ruta_chromedriver(ruta=None, version=None):
+    """
+    Ruta del binario de chromedriver, resuelta una sola vez por proceso. Con `ruta` no se consulta nada;
+    con `version` webdriver_manager usa esa versión de su caché en disco sin preguntar por la última.
+    Sin webdriver_manager devuelve None y Selenium Manager (selenium >= 4.6) lo resuelve.
+    """
+    if ruta: return ruta
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+    except ImportError:
+        return None
+    return ChromeDriverManager(driver_version=version).install()
+
+
+def lanzar_chrome(perfil="ligero", timeout_carga_s=60, chromedriver=None):
+    """Chrome con el perfil dado y el chromedriver fijado (`chromedriver` es el dict de chromedriver_desde_config)."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    driver = webdriver.Chrome(service=ChromeService(ruta_chromedriver(**(chromedriver or {}))), options=construir_opciones(perfil))
+    aplicar_perfil(driver, perfil)
+    driver.set_page_load_timeout(timeout_carga_s)  # Un exit residencial lento no frena al trabajador más que el presupuesto
+    return driver
+
+
+def memoria_driver_mb(driver):
+    """RSS total de chromedriver y sus procesos hijos (Chrome) en MB. 0 si no se puede medir."""
+    if psutil is None: return 0
+    try:
+        proceso = psutil.Process(driver.service.process.pid)
+        procesos = [proceso] + proceso.children(recursive=True)
+        return sum(p.memory_info().rss for p in procesos) / (1024 * 1024)
+    except Exception:
+        return 0
+
+
+# --- Pool de Drivers Reutilizables ---
+class PoolDrivers:
+    """
+    Mantiene sesiones de Chrome ya lanzadas y configuradas, listas para ser prestadas.
+    Cada sesión se recicla (se cierra y se reemplaza) después de `max_paginas` préstamos,
+    cuando su memoria supera `max_memoria_mb`, o si el bloque que la usó lanzó una excepción.
+    `fabrica` es la función que crea un driver nuevo (ej. configurar_driver) y devuelve None si falla.
+    """
+
+    def __init__(self, fabrica, tamano=2, max_paginas=50, max_memoria_mb=1500):
+        self.fabrica = fabrica
+        self.tamano = tamano
+        self.max_paginas = max_paginas
+        self.max_memoria_mb = max_memoria_mb
+        self._libres = queue.LifoQueue()
+        self._paginas = {}
+        self._lock = threading.Lock()
+        self._creados = 0
+        self._cerrado = False
+
+    def _crear(self):
+        driver = self.fabrica()
+        if driver is None:
+            with self._lock: self._creados -= 1
+            raise RuntimeError("No se pudo iniciar el driver de Selenium.")
+        with self._lock: self._paginas[driver] = 0
+        return driver
+
+    def precalentar(self):
+        """Lanza en paralelo las sesiones que falten hasta completar el tamaño del pool."""
+        with self._lock:
+            faltantes = self.tamano - self._creados
+            self._creados += max(0, faltantes)
+        if faltantes <= 0: return
+        with ThreadPoolExecutor(max_workers=faltantes) as pool:
+            futuros = [pool.submit(self._crear) for _ in range(faltantes)]
+        errores = 0
+        for futuro in futuros:
+            try: self._libres.put(futuro.result())
+            except RuntimeError: errores += 1
+        print(f"Pool de drivers precalentado: {faltantes - errores}/{faltantes} sesiones listas.")
+        if errores == faltantes: raise RuntimeError("No se pudo iniciar ninguna sesión de Chrome para el pool.")
+
+    def _tomar(self):
+        espera = 0
+        while True:
+            try: return self._libres.get(timeout=espera)
+            except queue.Empty: pass
+            with self._lock:
+                puede_crear = self._creados < self.tamano
+                if puede_crear: self._creados += 1
+            if puede_crear: return self._crear()
+            espera = 1  # Si una sesión se recicla mientras esperamos, se vuelve a intentar crearla
+
+    def _debe_reciclar(self, driver):
+        if self._paginas.get(driver, 0) >= self.max_paginas: return "límite de páginas"
+        if self.max_memoria_mb and memoria_driver_mb(driver) > self.max_memoria_mb: return "límite de memoria"
+        return None
+
+    def _descartar(self, driver, motivo):
+        print(f"  [Pool] Cerrando sesión de Chrome ({motivo}).")
+        with self._lock:
+            self._paginas.pop(driver, None)
+            self._creados -= 1
+        try: driver.quit()
+        except Exception: pass
+
+    @contextmanager
+    def sesion(self):
+        """Presta un driver del pool y lo devuelve (o lo recicla) al salir del bloque."""
+        driver = self._tomar()
+        fallo = False
+        try:
+            yield driver
+        except Exception:
+            fallo = True
+            raise
+        finally:
+            with self._lock: self._paginas[driver] = self._paginas.get(driver, 0) + 1
+            motivo = "error durante su uso" if fallo else self._debe_reciclar(driver)
+            if motivo or self._cerrado: self._descartar(driver, motivo or "pool cerrado")
+            else: self._libres.put(driver)
+
+    def cerrar(self):
+        """Cierra todas las sesiones libres. Las prestadas se cierran al devolverse."""
+        self._cerrado = True
+        while True:
+            try: driver = self._libres.get_nowait()
+            except queue.Empty: break
+            self._descartar(driver, "pool cerrado")
@@ -0,0 +1,136 @@
+import time
+import random
+import threading
+from contextlib import contextmanager
+from zillow_metricas import METRICAS
+
+# --- Señales de Bloqueo ---
+ESTADOS_HTTP_BLOQUEO = (403, 429)
+MARCADORES_BLOQUEO = ("px-captcha", "Press & Hold", "Access to this page has been denied", "verify you are a human", "captcha-delivery")
+
+
+def senal_de_respuesta(status_code, html=""):
+    """Clasifica una respuesta: "ok", "bloqueo" (403/429 o página de captcha) o "error"."""
+    if status_code in ESTADOS_HTTP_BLOQUEO: return "bloqueo"
+    if status_code != 200: return "error"
+    if html and "__NEXT_DATA__" not in html and any(marcador in html for marcador in MARCADORES_BLOQUEO): return "bloqueo"
+    return "ok"
+
+
+class Medicion:
+    """Resultado de un turno. Quien hace la petición ajusta `senal` si detecta un bloqueo o error."""
+    __slots__ = ("senal",)
+
+    def __init__(self):
+        self.senal = "ok"
+
+
+# --- Controlador Adaptativo (AIMD + token bucket) ---
+class ControladorRitmo:
+    """
+    Reemplaza las pausas fijas: reparte turnos a `tasa` peticiones por segundo (token bucket con jitter)
+    y limita las peticiones simultáneas a `concurrencia`. Ambos se ajustan con AIMD según lo observado:
+    cada éxito rápido suma `incremento` a la tasa (y cada `exitos_por_hilo` éxitos, un hilo más);
+    un bloqueo o timeout la multiplica por `factor_bajada`, reduce la concurrencia a la mitad y
+    enfría `enfriamiento_s` segundos. Una latencia sobre `latencia_objetivo_s` frena suavemente.
+    Se pasa como `limitador` a ClienteHTTP y a los motores: turno() envuelve cada descarga real.
+    """
+
+    def __init__(self, tasa_inicial=0.5, tasa_min=0.05, tasa_max=4.0, incremento=0.1, factor_bajada=0.5,
+                 concurrencia_inicial=2, concurrencia_max=4, exitos_por_hilo=10, latencia_objetivo_s=30.0, enfriamiento_s=30.0):
+        self.tasa = tasa_inicial
+        self.tasa_min, self.tasa_max = tasa_min, tasa_max
+        self.incremento, self.factor_bajada = incremento, factor_bajada
+        self.concurrencia, self.concurrencia_max = concurrencia_inicial, concurrencia_max
+        self.exitos_por_hilo = exitos_por_hilo
+        self.latencia_objetivo_s = latencia_objetivo_s
+        self.enfriamiento_s = enfriamiento_s
+        self.contadores = {"ok": 0, "bloqueo": 0, "timeout": 0, "error": 0}
+        self._condicion = threading.Condition()
+        self._en_curso = 0
+        self._exitos_seguidos = 0
+        self._proximo_inicio = 0.0
+        self._pausa_hasta = 0.0
+
+    def tasa_actual(self):
+        return self.tasa
+
+    def estado(self):
+        with self._condicion:
+            return {"tasa_rps": round(self.tasa, 3), "concurrencia": self.concurrencia, "en_curso": self._en_curso, **self.contadores}
+
+    def _reservar_turno(self):
+        with self._condicion:
+            while self._en_curso >= self.concurrencia: self._condicion.wait()
+            self._en_curso += 1
+            ahora = time.monotonic()
+            inicio = max(ahora, self._proximo_inicio, self._pausa_hasta)
+            self._proximo_inicio = inicio + random.uniform(0.8, 1.2) / self.tasa
+            return inicio - ahora
+
+    def registrar(self, senal, latencia_s=None):
+        """
+        Aplica AIMD según la señal observada ("ok", "bloqueo", "timeout" o "error"). "bloqueo_nivel" (un nivel
+        barato del proxy bloqueado que se reintenta en uno más caro) solo se cuenta: no es señal de ir más lento.
+        """
+        METRICAS.contar(f"ritmo.senal.{senal}")
+        with self._condicion:
+            self.contadores[senal] = self.contadores.get(senal, 0) + 1
+            if senal in ("bloqueo", "timeout"):
+                self.tasa = max(self.tasa_min, self.tasa * self.factor_bajada)
+                self.concurrencia = max(1, self.concurrencia // 2)
+                self._pausa_hasta = time.monotonic() + self.enfriamiento_s
+                self._exitos_seguidos = 0
+                print(f"    [Ritmo] Señal de {senal}: bajando a {self.tasa:.2f} req/s y {self.concurrencia} en paralelo (pausa de {self.enfriamiento_s:.0f} s).")
+            elif senal == "ok" and latencia_s is not None and latencia_s > self.latencia_objetivo_s:
+                self.tasa = max(self.tasa_min, self.tasa * 0.9)
+                self._exitos_seguidos = 0
+            elif senal == "ok":
+                self.tasa = min(self.tasa_max, self.tasa + self.incremento)
+                self._exitos_seguidos += 1
+                if self._exitos_seguidos >= self.exitos_por_hilo and self.concurrencia < self.concurrencia_max:
+                    self.concurrencia += 1
+                    self._exitos_seguidos = 0
+            self._condicion.notify_all()
+
+    @contextmanager
+    def turno(self, url=None):
+        """Espera el turno, mide la petición del bloque y registra su señal (un timeout o error se detecta solo)."""
+        espera = self._reservar_turno()
+        if espera > 0: time.sleep(espera)
+        METRICAS.observar("ritmo.espera", max(0.0, espera))
+        medicion, inicio = Medicion(), time.monotonic()
+        try:
+            yield medicion
+        except Exception as e:
+            medicion.senal = "timeout" if "Timeout" in type(e).__name__ else "error"
+            raise
+        finally:
+            with self._condicion:
+                self._en_curso -= 1
+            self.registrar(medicion.senal, time.monotonic() - inicio)
+
+    def ejecutar(self, url, funcion, *args):
+        with self.turno(url):
+            return funcion(*args)
+
+    def esperar_reintento(self, intento):
+        """Backoff exponencial para reintentos, escalado por la tasa actual (más lento si venimos bloqueados)."""
+        espera = min(60.0, max(1.0, 1.0 / self.tasa) * (2 ** intento)) * random.uniform(0.8, 1.2)
+        print(f"    [Ritmo] Reintentando en {espera:.1f} s (tasa actual {self.tasa:.2f} req/s).")
+        time.sleep(espera)
+
+
+_COMPARTIDO = None
+_LOCK_COMPARTIDO = threading.Lock()
+
+
+def ritmo_desde_config(config):
+    """
+    Devuelve el controlador del proceso (compartido por crawler y scraper), creado con la sección
+    opcional "ritmo" de config.json, ej. {"ritmo": {"tasa_inicial": 0.5, "tasa_max": 4, "concurrencia_max": 4}}.
+    """
+    global _COMPARTIDO
+    with _LOCK_COMPARTIDO:
+        if _COMPARTIDO is None: _COMPARTIDO = ControladorRitmo(**(config.get("ritmo", {}) or {}))
+        return _COMPARTIDO
@@ -0,0 +1,219 @@
+import os
+import re
+import time
+import uuid
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from zillow_busqueda import RE_ZPID
+from zillow_diario import abrir_csv_salida
+from zillow_metricas import METRICAS
+
+# --- Registro Tipado ---
+RE_NUMERO = re.compile(r"\d[\d,]*(?:\.\d+)?")
+FORMATOS_FECHA = ("%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d")
+
+
+def precio_numerico(texto_precio):
+    """'$3,399' -> 3399.0 (el primer número si es un rango); None si no hay número."""
+    coincidencia = RE_NUMERO.search(texto_precio or "")
+    return float(coincidencia.group(0).replace(",", "")) if coincidencia else None
+
+
+def fecha_publicacion(texto_fecha):
+    """'10/1/2026' -> date(2026, 10, 1); None si no tiene un formato conocido."""
+    for formato in FORMATOS_FECHA:
+        try: return datetime.strptime((texto_fecha or "").strip(), formato).date()
+        except ValueError: continue
+    return None
+
+
+def registro_tipado(detalle, scrapeado_en=None):
+    """DetallePropiedad -> dict con columnas tipadas (precio numérico, fecha parseada) y el zpid como clave."""
+    coincidencia = RE_ZPID.search(detalle.url or "")
+    return {"zpid": coincidencia.group(1) if coincidencia else detalle.url, "url": detalle.url, "direccion": detalle.address,
+            "dueno": detalle.owner_name, "telefono": detalle.phone_number, "fecha_publicacion": fecha_publicacion(detalle.publication_date),
+            "precio": precio_numerico(detalle.price), "precio_texto": detalle.price, "scrapeado_en": scrapeado_en or time.time()}
+
+
+# --- Salidas ---
+class SalidaCSV:
+    """El CSV de siempre (mismas columnas, incluidas las vacías) para no romper el reporte existente."""
+
+    def __init__(self, ruta, reanudar=False):
+        self.ruta = ruta
+        self._archivo, self._writer = abrir_csv_salida(ruta, reanudar)
+
+    def escribir_lote(self, detalles, registros):
+        self._writer.writerows(detalle.a_fila_csv() for detalle in detalles)
+        self._archivo.flush()
+
+    def cerrar(self):
+        self._archivo.close()
+
+
+class SalidaSQLite:
+    """
+    Tabla `publicaciones` con upsert por zpid: re-scrapear un listado actualiza su fila en lugar de duplicarla,
+    así que una sola base acumula todas las corridas (y ciudades) y se consulta con SQL.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=30)  # Varios procesos del lote pueden compartir la base
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("""CREATE TABLE IF NOT EXISTS publicaciones (
+            zpid TEXT PRIMARY KEY, url TEXT NOT NULL, direccion TEXT, dueno TEXT, telefono TEXT,
+            fecha_publicacion TEXT, precio REAL, precio_texto TEXT, primera_vez REAL, scrapeado_en REAL)""")
+        self._conexion.execute("CREATE INDEX IF NOT EXISTS idx_publicaciones_scrapeado_en ON publicaciones (scrapeado_en)")
+        self._conexion.commit()
+
+    def escribir_lote(self, detalles, registros):
+        filas = [(r["zpid"], r["url"], r["direccion"], r["dueno"], r["telefono"],
+                  r["fecha_publicacion"].isoformat() if r["fecha_publicacion"] else None,
+                  r["precio"], r["precio_texto"], r["scrapeado_en"], r["scrapeado_en"]) for r in registros]
+        with self._conexion:  # Una transacción por lote
+            self._conexion.executemany(
+                "INSERT INTO publicaciones VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(zpid) DO UPDATE SET "
+                "url = excluded.url, direccion = excluded.direccion, dueno = excluded.dueno, telefono = excluded.telefono, "
+                "fecha_publicacion = excluded.fecha_publicacion, precio = excluded.precio, precio_texto = excluded.precio_texto, "
+                "scrapeado_en = excluded.scrapeado_en", filas)
+
+    def cerrar(self):
+        self._conexion.close()
+
+
+class SalidaParquet:
+    """
+    Dataset Parquet con columnas tipadas: cada lote es un archivo nuevo del directorio, escrito a un temporal
+    y renombrado, así que nunca queda un archivo a medias y varias corridas o procesos agregan sin pisarse.
+    Se lee entero con pyarrow.dataset, pandas o DuckDB; para quedarse con la última versión de cada listado,
+    ordenar por scrapeado_en y deduplicar por zpid.
+    """
+
+    def __init__(self, directorio):
+        try:  # Opcional y pesado (~30 MB de RSS): solo se importa si se configuró la salida Parquet
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("La salida Parquet requiere pyarrow (pip install pyarrow).")
+        self._pa, self._pq = pa, pq
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+        self.esquema = pa.schema([("zpid", pa.string()), ("url", pa.string()), ("direccion", pa.string()), ("dueno", pa.string()),
+                                  ("telefono", pa.string()), ("fecha_publicacion", pa.date32()), ("precio", pa.float64()),
+                                  ("precio_texto", pa.string()), ("scrapeado_en", pa.timestamp("ms", tz="UTC"))])
+        self._lotes = 0
+        self._prefijo = f"publicaciones-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"  # Único por corrida y proceso
+
+    def escribir_lote(self, detalles, registros):
+        unicos = list({r["zpid"]: r for r in registros}.values())  # Dentro del lote gana la última versión
+        pa, pq = self._pa, self._pq
+        columnas = {campo.name: [r[campo.name] for r in unicos] for campo in self.esquema}
+        columnas["scrapeado_en"] = [datetime.fromtimestamp(ts, timezone.utc) for ts in columnas["scrapeado_en"]]
+        self._lotes += 1
+        ruta = os.path.join(self.directorio, f"{self._prefijo}-{self._lotes:05d}.parquet")
+        pq.write_table(pa.table(columnas, schema=self.esquema), f"{ruta}.tmp", compression="zstd")
+        os.replace(f"{ruta}.tmp", ruta)
+
+    def cerrar(self):
+        pass
+
+
+class Salidas:
+    """
+    Reparte cada publicación a todas las salidas configuradas en lotes: acumula hasta `tamano_lote` filas
+    (o `intervalo_s` segundos) y las escribe juntas, una transacción por salida. al_confirmar(), si se pasa,
+    se llama recién cuando el lote de esa fila llegó a todas las salidas (ej. para anotarla en el diario).
+    Si una salida falla (ej. SQLite "database is locked"), el error se informa y el lote queda en curso
+    recordando qué salidas ya lo escribieron: el próximo confirmar() (a los `intervalo_s` segundos, o al
+    cerrar) lo escribe solo en las que faltan, sin duplicar filas en el CSV o en Parquet.
+    """
+
+    def __init__(self, salidas, tamano_lote=50, intervalo_s=5.0, reintentos_cierre=3):
+        self.salidas = salidas
+        self.tamano_lote, self.intervalo_s = max(1, tamano_lote), intervalo_s
+        self.reintentos_cierre = reintentos_cierre
+        self._pendientes = []
+        self._en_curso = None  # (lote, índices de las salidas que ya lo escribieron)
+        self._ultimo = time.monotonic()
+        self._reintentar_desde = 0.0
+        self._lock = threading.RLock()
+
+    def escribir(self, detalle, al_confirmar=None):
+        with self._lock:
+            self._pendientes.append((detalle, registro_tipado(detalle), al_confirmar))
+            ahora = time.monotonic()
+            if ahora < self._reintentar_desde: return  # Una salida acaba de fallar: no se la reintenta en cada fila
+            if len(self._pendientes) >= self.tamano_lote or ahora - self._ultimo >= self.intervalo_s: self.confirmar()
+
+    def confirmar(self):
+        """
+        Escribe lo acumulado en todas las salidas y avisa a cada fila cuyo lote llegó a todas.
+        Devuelve False si alguna salida falló (lo no escrito queda para el próximo intento).
+        """
+        confirmadas = []
+        try:
+            with self._lock:
+                self._ultimo = time.monotonic()
+                while self._en_curso or self._pendientes:
+                    if self._en_curso is None: self._en_curso, self._pendientes = (self._pendientes, set()), []
+                    lote, escritas = self._en_curso
+                    detalles, registros, _ = zip(*lote)
+                    for i, salida in enumerate(self.salidas):
+                        if i in escritas: continue
+                        try:
+                            salida.escribir_lote(detalles, registros)
+                        except Exception as e:
+                            print(f"    ERROR [Salidas]: {type(salida).__name__} no pudo escribir un lote de {len(lote)} filas: {e}. Se reintentará.")
+                            METRICAS.contar("salidas.lotes_fallidos")
+                            self._reintentar_desde = time.monotonic() + max(1.0, self.intervalo_s)
+                            return False
+                        escritas.add(i)
+                    self._en_curso = None
+                    confirmadas.extend(lote)
+                return True
+        finally:
+            # Aunque falle un lote posterior, los que ya llegaron a todas las salidas se avisan
+            for _, _, al_confirmar in confirmadas:
+                if al_confirmar: al_confirmar()
+
+    def cerrar(self):
+        try:
+            for intento in range(self.reintentos_cierre):
+                if self.confirmar(): break
+                time.sleep(2 ** intento)
+            else:
+                with self._lock: perdidas = len(self._en_curso[0] if self._en_curso else []) + len(self._pendientes)
+                if perdidas: print(f"    ERROR [Salidas]: {perdidas} filas no llegaron a todas las salidas; quedan pendientes en el diario para --reanudar.")
+        finally:
+            for salida in self.salidas: salida.cerrar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def opciones_salidas_desde_config(config):
+    """
+    Lee la sección opcional "salidas" de config.json, ej.
+    {"salidas": {"csv": true, "sqlite": "zillow_publicaciones.sqlite", "parquet": "publicaciones_parquet", "tamano_lote": 50, "intervalo_s": 5}}
+    Sin la sección solo se escribe el CSV, fila por fila como antes.
+    """
+    opciones = config.get("salidas", {}) or {}
+    return {"csv": opciones.get("csv", True), "sqlite": opciones.get("sqlite"), "parquet": opciones.get("parquet"),
+            "tamano_lote": int(opciones.get("tamano_lote", 1 if not opciones else 50)), "intervalo_s": float(opciones.get("intervalo_s", 5))}
+
+
+def abrir_salidas(archivo_csv_salida, reanudar=False, opciones=None):
+    """Crea las salidas de una corrida: el CSV (salvo "csv": false) más SQLite y/o Parquet si están configurados."""
+    opciones = opciones or opciones_salidas_desde_config({})
+    salidas = []
+    if opciones.get("csv", True): salidas.append(SalidaCSV(archivo_csv_salida, reanudar))
+    if opciones.get("sqlite"): salidas.append(SalidaSQLite(opciones["sqlite"]))
+    if opciones.get("parquet"):
+        try: salidas.append(SalidaParquet(opciones["parquet"]))
+        except RuntimeError as e: print(f"Advertencia: {e} Se omite la salida Parquet.")
+    return Salidas(salidas, tamano_lote=opciones.get("tamano_lote", 50), intervalo_s=opciones.get("intervalo_s", 5.0))